@@ -0,0 +1,96 @@
+"""Comprueba que verify_card_counts(repair=True) deja todo consistente.
+
+    python -m benchmarks.counts_check --db kpop_bot.db
+
+Sobre una copia de la base introduce a mano cada tipo de diferencia en
+las proyecciones que mantienen los triggers, repara y vuelve a verificar:
+después de reparar no debe quedar ninguna fila con diferencias. Incluye
+el caso de una fila faltante en user_card_counts con el progreso correcto,
+en el que los triggers de progreso disparados por la reparación dejaban
+user_set_progress por encima del total del set.
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from benchmarks.fakes import FakeUser
+from benchmarks.harness import BenchHarness
+from utils.card_counts import verify_card_counts
+
+
+async def seed(harness, user_id, card_ids):
+    """Usuario con una copia de cada carta, por el camino normal (triggers)"""
+    harness.guild.add_member(FakeUser(user_id=user_id))
+    await harness.bot.db.execute('INSERT OR IGNORE INTO users (user_id) VALUES (?)', (user_id,))
+    await harness.bot.db.executemany(
+        'INSERT INTO user_cards (user_id, card_id) VALUES (?, ?)',
+        [(user_id, card_id) for card_id in card_ids]
+    )
+    await harness.bot.db.commit()
+
+
+async def missing_count_row(db, user_id, card_ids):
+    # Borrar la fila dispara trg_set_progress_delete: se devuelve el progreso
+    # a su valor real para que sólo difiera user_card_counts
+    async with db.execute('SELECT kind, set_key, owned FROM user_set_progress WHERE user_id = ?', (user_id,)) as cursor:
+        progress = await cursor.fetchall()
+    await db.execute('DELETE FROM user_card_counts WHERE user_id = ? AND card_id = ?', (user_id, card_ids[0]))
+    await db.executemany(
+        'INSERT OR REPLACE INTO user_set_progress (user_id, kind, set_key, owned) VALUES (?, ?, ?, ?)',
+        [(user_id, *row) for row in progress]
+    )
+
+
+async def wrong_qty(db, user_id, card_ids):
+    await db.execute('UPDATE user_card_counts SET qty = qty + 2 WHERE user_id = ? AND card_id = ?', (user_id, card_ids[0]))
+
+
+async def wrong_card_count(db, user_id, card_ids):
+    await db.execute('UPDATE users SET card_count = card_count + 5 WHERE user_id = ?', (user_id,))
+
+
+async def wrong_progress(db, user_id, card_ids):
+    await db.execute('UPDATE user_set_progress SET owned = owned + 1 WHERE user_id = ?', (user_id,))
+
+
+async def missing_total(db, user_id, card_ids):
+    await db.execute("DELETE FROM set_totals WHERE kind = 'series'")
+
+
+CASES = [missing_count_row, wrong_qty, wrong_card_count, wrong_progress, missing_total]
+
+
+async def main(args):
+    failures = 0
+    for i, case in enumerate(CASES):
+        async with BenchHarness(args.db) as harness:
+            db = harness.bot.db
+            async with db.execute('SELECT card_id FROM photocards ORDER BY card_id LIMIT 3') as cursor:
+                card_ids = [row[0] for row in await cursor.fetchall()]
+            user_id = 900000 + i
+            await seed(harness, user_id, card_ids)
+
+            await case(db, user_id, card_ids)
+            await db.commit()
+            before = await verify_card_counts(db)
+            await verify_card_counts(db, repair=True)
+            await db.commit()
+            after = await verify_card_counts(db)
+
+        ok = any(before.values()) and not any(after.values())
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {case.__name__:<18} antes {before} · después {after}")
+
+    return 1 if failures else 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Verifica que la reparación de conteos converge")
+    parser.add_argument('--db', default='kpop_bot.db', help="base a copiar (no se modifica)")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main(parse_args())))
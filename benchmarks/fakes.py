@@ -0,0 +1,192 @@
+"""Objetos que imitan a los de discord.py para correr los cogs sin gateway.
+
+Sólo implementan lo que usan los cogs: enviar, editar y borrar mensajes,
+reacciones y miembros de un servidor. Cada llamada "de red" pasa por un
+FakeGateway que cuenta peticiones y bytes subidos y puede simular latencia.
+"""
+import asyncio
+import itertools
+import time
+import types
+from collections import Counter
+
+from discord.ext import commands
+
+_snowflakes = itertools.count(10 ** 17)
+
+
+def next_id():
+    return next(_snowflakes)
+
+
+class FakeGateway:
+    """Contabilidad de las peticiones salientes (y latencia simulada)"""
+    
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = Counter()
+        self.bytes_uploaded = 0
+    
+    async def call(self, route):
+        self.requests[route] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+
+class FakeUser:
+    def __init__(self, user_id=None, name=None, admin=False, bot=False):
+        self.id = user_id or next_id()
+        self.name = name or f"user{self.id % 100000}"
+        self.display_name = self.name
+        self.global_name = self.name
+        self.bot = bot
+        self.mention = f"<@{self.id}>"
+        self.display_avatar = types.SimpleNamespace(url=f"https://cdn.example/avatars/{self.id}.png")
+        self.guild_permissions = types.SimpleNamespace(administrator=admin)
+    
+    def __str__(self):
+        return self.name
+
+
+class FakeGuild:
+    def __init__(self, name='Bench'):
+        self.id = next_id()
+        self.name = name
+        self.chunked = True
+        self.members = {}
+    
+    def add_member(self, user):
+        self.members[user.id] = user
+        return user
+    
+    def get_member(self, user_id):
+        return self.members.get(user_id)
+
+
+class FakeAttachment:
+    def __init__(self, filename, size):
+        self.id = next_id()
+        self.filename = filename
+        self.size = size
+        # Igual que el CDN real: URL firmada que expira (`ex` en hex)
+        expires = int(time.time()) + 24 * 3600
+        self.url = f"https://cdn.example/attachments/{self.id}/{filename}?ex={expires:x}"
+
+
+class FakeMessage:
+    def __init__(self, channel, author, content=None, embeds=(), attachments=()):
+        self.id = next_id()
+        self.channel = channel
+        self.guild = channel.guild
+        self.author = author
+        self.content = content or ''
+        self.embeds = list(embeds)
+        self.attachments = list(attachments)
+        self.reactions = Counter()
+        self.deleted = False
+    
+    async def add_reaction(self, emoji, /):
+        await self.channel.gateway.call('add_reaction')
+        self.reactions[str(emoji)] += 1
+    
+    async def remove_reaction(self, emoji, member):
+        await self.channel.gateway.call('remove_reaction')
+        self.reactions[str(emoji)] -= 1
+    
+    async def clear_reactions(self):
+        await self.channel.gateway.call('clear_reactions')
+        self.reactions.clear()
+    
+    async def edit(self, **kwargs):
+        await self.channel.gateway.call('edit')
+        if 'content' in kwargs:
+            self.content = kwargs['content']
+        if 'embed' in kwargs:
+            self.embeds = [kwargs['embed']] if kwargs['embed'] else []
+        return self
+    
+    async def delete(self, *, delay=None):
+        await self.channel.gateway.call('delete')
+        self.deleted = True
+
+
+class FakeReaction:
+    def __init__(self, message, emoji):
+        self.message = message
+        self.emoji = emoji
+    
+    async def remove(self, user):
+        await self.message.remove_reaction(self.emoji, user)
+
+
+class _Typing:
+    def __await__(self):
+        return iter(())
+    
+    async def __aenter__(self):
+        return None
+    
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeChannel:
+    def __init__(self, guild, gateway, name=None):
+        self.id = next_id()
+        self.guild = guild
+        self.gateway = gateway
+        self.name = name or f"canal-{self.id % 1000}"
+        self.bot_user = None
+        self.messages = []
+        self.sent_at = []       # perf_counter() de cada envío, para medir latencias
+    
+    async def send(self, content=None, *, embed=None, embeds=None, file=None, files=None, view=None, **kwargs):
+        await self.gateway.call('send')
+        files = list(files or ([file] if file else []))
+        embeds = list(embeds or ([embed] if embed else []))
+        
+        attachments = []
+        for f in files:
+            data = f.fp.read()
+            self.gateway.bytes_uploaded += len(data)
+            attachments.append(FakeAttachment(f.filename, len(data)))
+        
+        # Discord sustituye attachment://nombre por la URL del CDN en el embed
+        by_name = {attachment.filename: attachment.url for attachment in attachments}
+        resolved = []
+        for e in embeds:
+            if e.image and e.image.url and e.image.url.startswith('attachment://'):
+                e = e.copy()
+                e.set_image(url=by_name.get(e.image.url[len('attachment://'):]))
+            resolved.append(e)
+        
+        # Las vistas de confirmación (ventas masivas) se aceptan al instante
+        if view is not None and hasattr(view, 'confirmed'):
+            view.confirmed = True
+            view.stop()
+
+        message = FakeMessage(self, self.bot_user, content, resolved, attachments)
+        self.messages.append(message)
+        self.sent_at.append(time.perf_counter())
+        return message
+    
+    def typing(self):
+        return _Typing()
+
+
+class FakeContext(commands.Context):
+    """Contexto de comando que responde por el FakeChannel en lugar de la API"""
+    
+    async def send(self, content=None, **kwargs):
+        kwargs.pop('ephemeral', None)
+        kwargs.pop('reference', None)
+        return await self.channel.send(content, **kwargs)
+    
+    async def reply(self, content=None, **kwargs):
+        return await self.send(content, **kwargs)
+    
+    def typing(self, *, ephemeral=False):
+        return _Typing()
+    
+    async def defer(self, *, ephemeral=False):
+        return None
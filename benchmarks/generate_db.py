@@ -0,0 +1,188 @@
+"""Genera una base de datos sintética a escala de producción.
+    
+    python -m benchmarks.generate_db --out bench_large.db --users 50000 --catalog 3000
+
+El esquema (tablas, triggers, índices, FTS) es el de KpopPhotocardBot.init_db,
+así que las proyecciones (user_card_counts, users.card_count) quedan
+consistentes exactamente como las mantendría el bot.
+
+Distribuciones:
+  - cartas por usuario: Pareto (--user-skew), pocos coleccionistas con miles
+    de cartas y una cola larga de usuarios casi vacíos
+  - carta obtenida: probabilidad del drop por rareza × Zipf por popularidad
+    (--card-skew), así que las Common populares acumulan muchos duplicados
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import aiosqlite
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+from bot import KpopPhotocardBot
+
+RARITY_SHARE = {'Common': 0.40, 'Uncommon': 0.25, 'Rare': 0.20, 'Epic': 0.10, 'Legendary': 0.05}
+DROP_CHANCE = {'Common': 0.50, 'Uncommon': 0.30, 'Rare': 0.15, 'Epic': 0.04, 'Legendary': 0.01}
+ERAS = ['Debut', 'Summer', 'Winter', 'Repackage', 'World Tour', 'Fanmeeting', 'Season Greetings']
+MEMBERS_PER_GROUP = 7
+BATCH = 50000
+
+
+def build_catalog(rng, size, groups):
+    """[(card_number, grupo, miembro, era, rareza, image_path, serie)]"""
+    photos = sorted(
+        os.path.join('data', 'photocards', 'TWICE', name)
+        for name in os.listdir(os.path.join(ROOT, 'data', 'photocards', 'TWICE'))
+    ) or [None]
+    rarities = list(RARITY_SHARE)
+    weights = list(RARITY_SHARE.values())
+    
+    cards = []
+    for i in range(size):
+        group = i % groups
+        member = (i // groups) % MEMBERS_PER_GROUP
+        cards.append((
+            f"G{group:03d}-{i:05d}",
+            f"Group {group:03d}",
+            f"Member {group:03d}-{member}",
+            rng.choice(ERAS),
+            rng.choices(rarities, weights)[0],
+            photos[i % len(photos)],
+            f"S{1 + i * 3 // size}"
+        ))
+    return cards
+
+
+def card_weights(rng, catalog, skew):
+    """Peso de cada carta: chance del drop repartida en su rareza × Zipf por popularidad"""
+    per_rarity = {rarity: 0 for rarity in RARITY_SHARE}
+    for card in catalog:
+        per_rarity[card[4]] += 1
+    
+    ranks = list(range(1, len(catalog) + 1))
+    rng.shuffle(ranks)
+    return [
+        DROP_CHANCE[card[4]] / per_rarity[card[4]] / rank ** skew
+        for card, rank in zip(catalog, ranks)
+    ]
+
+
+def cards_per_user(rng, mean, alpha, cap):
+    # Pareto(alpha) - 1 empieza en 0 y tiene media 1 / (alpha - 1)
+    return min(cap, int((rng.paretovariate(alpha) - 1) * mean * (alpha - 1)))
+
+
+async def generate(args):
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    
+    if os.path.exists(args.out):
+        if not args.force:
+            sys.exit(f"❌ {args.out} ya existe (usa --force para reemplazarla)")
+        os.remove(args.out)
+    
+    # El esquema sale del propio bot: mismo DDL, triggers e índices
+    bot = KpopPhotocardBot(db_path=args.out)
+    bot.db = await aiosqlite.connect(args.out)
+    try:
+        await bot.init_db()
+        db = bot.db
+        await db.execute('PRAGMA synchronous = OFF')
+        await db.execute('PRAGMA journal_mode = MEMORY')
+        
+        catalog = build_catalog(rng, args.catalog, args.groups)
+        await db.executemany('''
+            INSERT INTO photocards (card_number, group_name, member_name, era, rarity, image_path, series)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', catalog)
+        async with db.execute('SELECT card_id, card_number FROM photocards ORDER BY card_id') as cursor:
+            card_ids = [row[0] for row in await cursor.fetchall()]
+        card_numbers = [card[0] for card in catalog]
+        cum_weights = list(itertools.accumulate(card_weights(rng, catalog, args.card_skew)))
+        
+        now = datetime.utcnow()
+        user_ids = [10 ** 17 + i * 7919 for i in range(args.users)]
+        await db.executemany(
+            'INSERT INTO users (user_id, coins, drops_count, last_daily) VALUES (?, ?, 0, ?)',
+            [
+                (user_id, int(rng.lognormvariate(7, 1.5)),
+                 (now - timedelta(hours=rng.uniform(0, 24 * 30))).isoformat() if rng.random() < 0.6 else None)
+                for user_id in user_ids
+            ]
+        )
+        await db.executemany(
+            'INSERT INTO display_names (user_id, display_name, updated_at) VALUES (?, ?, ?)',
+            [(user_id, f"fan{i}", now.isoformat()) for i, user_id in enumerate(user_ids)]
+        )
+        
+        # user_cards en lotes: los triggers mantienen user_card_counts y card_count
+        total = 0
+        drops = {}
+        batch = []
+        for user_id in user_ids:
+            count = cards_per_user(rng, args.cards_per_user, args.user_skew, args.max_cards)
+            for index in rng.choices(range(len(card_ids)), cum_weights=cum_weights, k=count):
+                obtained = now - timedelta(seconds=rng.uniform(0, 365 * 24 * 3600))
+                serial = None
+                # Las de drops llevan serial; las de sobres no
+                if rng.random() < 0.6:
+                    serial = f"{card_numbers[index]}-{int(obtained.timestamp())}-{user_id % 1000}"
+                    drops[user_id] = drops.get(user_id, 0) + 1
+                batch.append((user_id, card_ids[index], obtained.strftime('%Y-%m-%d %H:%M:%S'), serial))
+            if len(batch) >= BATCH:
+                await db.executemany(
+                    'INSERT INTO user_cards (user_id, card_id, obtained_at, card_serial) VALUES (?, ?, ?, ?)', batch
+                )
+                total += len(batch)
+                batch = []
+                print(f"  {total:,} cartas...", end='\r')
+        if batch:
+            await db.executemany(
+                'INSERT INTO user_cards (user_id, card_id, obtained_at, card_serial) VALUES (?, ?, ?, ?)', batch
+            )
+            total += len(batch)
+        
+        await db.executemany(
+            'UPDATE users SET drops_count = ? WHERE user_id = ?',
+            [(count, user_id) for user_id, count in drops.items()]
+        )
+        await db.commit()
+        await db.execute('ANALYZE')
+        await db.commit()
+        
+        async with db.execute('SELECT COUNT(*), MAX(qty) FROM user_card_counts') as cursor:
+            pairs, max_qty = await cursor.fetchone()
+    finally:
+        await bot.db.close()
+    
+    size = os.path.getsize(args.out) / 1024 / 1024
+    print(
+        f"✅ {args.out}: {args.users:,} usuarios, {args.catalog:,} cartas en catálogo, "
+        f"{total:,} user_cards ({pairs:,} pares usuario-carta, hasta {max_qty:,} copias) · "
+        f"{size:.0f} MiB en {time.perf_counter() - started:.1f}s"
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Genera una base de datos sintética grande")
+    parser.add_argument('--out', default='bench_large.db')
+    parser.add_argument('--force', action='store_true', help="reemplaza --out si existe")
+    parser.add_argument('--users', type=int, default=50000)
+    parser.add_argument('--catalog', type=int, default=3000, help="cartas en el catálogo")
+    parser.add_argument('--groups', type=int, default=60)
+    parser.add_argument('--cards-per-user', type=float, default=20, help="media de cartas por usuario")
+    parser.add_argument('--max-cards', type=int, default=20000, help="tope de cartas de un usuario")
+    parser.add_argument('--user-skew', type=float, default=1.5, help="alpha de Pareto (menor = cola más pesada)")
+    parser.add_argument('--card-skew', type=float, default=1.0, help="exponente Zipf de popularidad")
+    parser.add_argument('--seed', type=int, default=1)
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    asyncio.run(generate(parse_args()))
@@ -0,0 +1,214 @@
+"""Arranca KpopPhotocardBot con sus cogs sobre una copia de la base de datos
+y objetos falsos de Discord, y mide fases de carga.
+
+Cada fase ejecuta trabajos concurrentes y reporta throughput, latencias
+p50/p99 y, restando las estadísticas del bot antes y después, el tiempo
+de SQL y de render que consumió.
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from bot import KpopPhotocardBot
+from utils import metrics
+from utils.image_processor import RENDER_SECONDS
+from benchmarks.fakes import FakeChannel, FakeContext, FakeGateway, FakeGuild, FakeMessage, FakeUser
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+class PhaseResult:
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.errors = 0
+        self.wall = 0.0
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.render_time = 0.0
+        self.renders = 0
+    
+    @property
+    def ops(self):
+        return len(self.latencies)
+    
+    def as_dict(self):
+        ops = self.ops or 1
+        return {
+            'name': self.name,
+            'ops': self.ops,
+            'errors': self.errors,
+            'throughput': self.ops / self.wall if self.wall else 0.0,
+            'p50_ms': percentile(self.latencies, 0.50) * 1000,
+            'p99_ms': percentile(self.latencies, 0.99) * 1000,
+            'db_ms_per_op': self.db_time / ops * 1000,
+            'queries_per_op': self.db_queries / ops,
+            'render_ms_per_op': self.render_time / ops * 1000,
+            'renders': self.renders
+        }
+
+
+class BenchHarness:
+    """Bot real, Discord falso.
+    
+    `db_path` es la base a copiar (la original nunca se modifica); sin ella
+    se parte de una base vacía con el esquema del bot.
+    """
+    
+    def __init__(self, db_path='kpop_bot.db', latency=0.0, lag_threshold=1.0):
+        self.source_db = db_path
+        self.gateway = FakeGateway(latency)
+        self.guild = FakeGuild()
+        self.lag_threshold = lag_threshold
+        self.bot = None
+        self.errors = []
+        self._tmpdir = None
+    
+    async def start(self):
+        self._tmpdir = tempfile.mkdtemp(prefix='kpc-bench-')
+        db_copy = os.path.join(self._tmpdir, 'bench.db')
+        if self.source_db and os.path.exists(self.source_db):
+            shutil.copy(self.source_db, db_copy)
+        
+        metrics.REGISTRY.enabled = True
+        self.bot = KpopPhotocardBot(db_path=db_copy)
+        # Sin login no hay usuario del bot; get_context lo necesita
+        self.bot._connection.user = FakeUser(name='KPC', bot=True)
+        self.bot.watchdog.threshold = self.lag_threshold
+        self.bot.add_listener(self._on_command_error, 'on_command_error')
+        
+        # Lo que haría login(): asociar el loop y dar el cliente por listo
+        await self.bot._async_setup_hook()
+        self.bot._ready.set()
+        await self.bot.setup_hook()
+        gacha = self.bot.get_cog('Gacha')
+        if gacha:
+            gacha.auto_spawn.cancel()
+        return self
+    
+    async def close(self):
+        await self.bot.close()
+        shutil.rmtree(self._tmpdir, ignore_errors=True)
+    
+    async def __aenter__(self):
+        return await self.start()
+    
+    async def __aexit__(self, *exc):
+        await self.close()
+    
+    def new_channel(self):
+        channel = FakeChannel(self.guild, self.gateway)
+        channel.bot_user = self.bot.user
+        return channel
+    
+    async def new_users(self, count, coins=0, admin=False):
+        """Crea `count` miembros del servidor con saldo inicial"""
+        users = [self.guild.add_member(FakeUser(admin=admin)) for _ in range(count)]
+        await self.bot.db.executemany(
+            'INSERT INTO users (user_id, coins) VALUES (?, ?) ON CONFLICT(user_id) DO UPDATE SET coins = excluded.coins',
+            [(user.id, coins) for user in users]
+        )
+        await self.bot.db.commit()
+        return users
+    
+    async def run_command(self, user, channel, text):
+        """Invoca un comando de prefijo como si `user` lo escribiera en `channel`"""
+        message = FakeMessage(channel, user, f"{self.bot.command_prefix}{text}")
+        message._state = self.bot._connection
+        ctx = await self.bot.get_context(message, cls=FakeContext)
+        await self.bot.invoke(ctx)
+        return ctx
+    
+    async def call_command(self, user, channel, name, *args):
+        """Llama al callback de un comando con argumentos ya convertidos.
+
+        Para comandos con parámetros que los fakes no pueden convertir
+        (discord.Member exige un miembro real del gateway).
+        """
+        message = FakeMessage(channel, user, f"{self.bot.command_prefix}{name}")
+        message._state = self.bot._connection
+        ctx = await self.bot.get_context(message, cls=FakeContext)
+        try:
+            await ctx.command.callback(ctx.cog, ctx, *args)
+        except Exception as e:
+            self.errors.append((name, e))
+        return ctx
+
+    async def phase(self, name, jobs, concurrency=10):
+        """Corre los trabajos (corrutinas que devuelven su latencia) con un límite de concurrencia"""
+        result = PhaseResult(name)
+        semaphore = asyncio.Semaphore(concurrency)
+        before = self.snapshot()
+        
+        async def run(job):
+            async with semaphore:
+                try:
+                    latency = await job
+                except Exception as e:
+                    self.errors.append((name, e))
+                    return
+                if latency is not None:
+                    result.latencies.append(latency)
+        
+        started = time.perf_counter()
+        await asyncio.gather(*(run(job) for job in jobs))
+        result.wall = time.perf_counter() - started
+        self.attribute(result, before)
+        return result
+    
+    def snapshot(self):
+        """Totales acumulados del bot, para restarlos al terminar una fase"""
+        return len(self.errors), self._db_totals(), self._render_totals()
+    
+    def attribute(self, result, before):
+        """Carga en `result` el SQL, los renders y los errores desde `before`"""
+        errors_before, db_before, render_before = before
+        db_after = self._db_totals()
+        render_after = self._render_totals()
+        result.db_time = db_after[0] - db_before[0]
+        result.db_queries = db_after[1] - db_before[1]
+        result.render_time = render_after[0] - render_before[0]
+        result.renders = render_after[1] - render_before[1]
+        result.errors = len(self.errors) - errors_before
+    
+    def timed_command(self, user, channel, text):
+        async def job():
+            started = time.perf_counter()
+            await self.run_command(user, channel, text)
+            return time.perf_counter() - started
+        return job()
+    
+    def _db_totals(self):
+        stats = self.bot.db.stats.values()
+        return sum(s.total for s in stats), sum(s.count for s in stats)
+    
+    def _render_totals(self):
+        totals = RENDER_SECONDS.totals()
+        total_time = sum(total for total, _ in totals.values())
+        # Cada render de carta pasa una vez por la etapa de codificación
+        renders = totals.get(('encode',), (0.0, 0))[1]
+        return total_time, renders
+    
+    async def _on_command_error(self, ctx, error):
+        self.errors.append((ctx.command.qualified_name if ctx.command else ctx.invoked_with, error))
+
+
+def print_table(results):
+    header = f"{'fase':<14}{'ops':>6}{'err':>5}{'ops/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'SQL ms/op':>11}{'q/op':>7}{'render ms/op':>14}"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        r = result.as_dict()
+        print(
+            f"{r['name']:<14}{r['ops']:>6}{r['errors']:>5}{r['throughput']:>9.1f}{r['p50_ms']:>9.1f}"
+            f"{r['p99_ms']:>9.1f}{r['db_ms_per_op']:>11.2f}{r['queries_per_op']:>7.1f}{r['render_ms_per_op']:>14.1f}"
+        )
@@ -0,0 +1,223 @@
+"""Micro-benchmarks de PhotocardProcessor con comparación contra una línea base.
+    
+    python -m benchmarks.image_bench                     # mide y compara
+    python -m benchmarks.image_bench --save-baseline     # guarda la línea base
+    python -m benchmarks.image_bench --only grid --repeat 5
+
+Casos:
+  card/<rareza>[/serial]   create_photocard completo (Epic y Legendary suman el brillo)
+  grid/<n>                 create_card_grid con n cartas ya renderizadas
+  binder/<n>               página del binder con n miniaturas ya cacheadas (sin caché de páginas)
+  stage/<etapa>            cada etapa interna por separado (photo_atlas: la foto desde el atlas)
+
+Cada caso reporta la mediana y el mínimo de `--repeat` corridas y, en una
+pasada aparte (tracemalloc frena lo que mide), el pico de memoria trazada:
+sólo ve asignaciones de Python (bytes codificados, buffers intermedios), no
+los píxeles que PIL reserva por su cuenta. Contra
+la línea base falla (código de salida 1) si la mediana o el pico empeoran
+más que `--threshold`.
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from PIL import ImageDraw
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+from utils.atlas import SpriteAtlas
+from utils.image_processor import BinderRenderer, PhotocardProcessor
+
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'image_baseline.json')
+PHOTOS = os.path.join(ROOT, 'data', 'photocards', 'TWICE')
+RARITIES = ['Common', 'Uncommon', 'Rare', 'Epic', 'Legendary']
+GRID_SIZES = [3, 5, 10]
+BINDER_SIZES = [12, 30]
+
+
+def card_data(rarity, serial=None):
+    return {
+        'rarity': rarity,
+        'card_number': 'TW-BENCH',
+        'member': 'Chaeyoung',
+        'group': 'TWICE',
+        'era': 'Formula of Love',
+        'series': 'S1',
+        'serial': serial
+    }
+
+
+def build_cases(processor, photos):
+    """Devuelve [(nombre, función sin argumentos)]"""
+    photo = photos[0]
+    cases = []
+    
+    for rarity in RARITIES:
+        cases.append((f"card/{rarity}", lambda r=rarity: processor.create_photocard(photo, card_data(r))))
+        cases.append((
+            f"card/{rarity}/serial",
+            lambda r=rarity: processor.create_photocard(photo, card_data(r, serial='TW-BENCH-1700000000-123'))
+        ))
+    
+    # Las cartas del grid se renderizan una vez; sólo se mide el ensamblado
+    rendered = [processor.create_photocard(photos[i % len(photos)], card_data(RARITIES[i % len(RARITIES)])).getvalue()
+                for i in range(max(GRID_SIZES))]
+    for size in GRID_SIZES:
+        cases.append((
+            f"grid/{size}",
+            lambda n=size: processor.create_card_grid([io.BytesIO(data) for data in rendered[:n]], cols=3)
+        ))
+    
+    # Las miniaturas se renderizan una vez; se mide componer y codificar la página
+    binder = BinderRenderer(processor)
+    entries = [
+        (photos[i % len(photos)], dict(card_data(RARITIES[i % len(RARITIES)]), card_number=f"TW-{i}"), i % 3)
+        for i in range(max(BINDER_SIZES))
+    ]
+    binder.render_page(entries)
+    
+    def binder_page(n):
+        binder._pages.clear()
+        return binder.render_page(entries[:n])
+    
+    for size in BINDER_SIZES:
+        cases.append((f"binder/{size}", lambda n=size: binder_page(n)))
+    
+    colors = processor.rarity_theme['Legendary']
+    width = processor.photo_width + processor.border_size * 2
+    height = processor.photo_height + processor.border_size + processor.info_height
+    background = processor._create_textured_background(width, height, colors[0], colors[1])
+    finished = background.copy()
+    processor._add_shine_overlay(finished)
+    
+    # La misma foto servida desde un atlas mapeado (utils/atlas.py)
+    atlas_path = os.path.join(tempfile.mkdtemp(prefix='kpc-atlas-'), 'atlas.bin')
+    SpriteAtlas.write(
+        atlas_path, processor.photo_width, processor.photo_height, processor.corner_radius,
+        [(1, photo)], [processor._load_photo(photo).tobytes()]
+    )
+    atlas = SpriteAtlas.open(atlas_path)
+
+    def text():
+        canvas = background.copy()
+        processor._draw_stylish_text(canvas, ImageDraw.Draw(canvas), card_data('Legendary'), width, height, colors[1])
+    
+    def encode():
+        out = io.BytesIO()
+        finished.save(out, format='PNG', quality=95)
+    
+    cases.extend([
+        ('stage/background', lambda: processor._create_textured_background(width, height, colors[0], colors[1])),
+        ('stage/photo', lambda: processor._load_photo(photo)),
+        ('stage/photo_atlas', lambda: atlas.photo(1, photo)),
+        ('stage/text', text),
+        ('stage/overlay', lambda: processor._add_shine_overlay(background.copy())),
+        ('stage/encode', encode),
+    ])
+    return cases
+
+
+def measure(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    
+    return {
+        'median_ms': statistics.median(timings) * 1000,
+        'min_ms': min(timings) * 1000,
+        'peak_kib': peak / 1024
+    }
+
+
+def compare(results, baseline, threshold):
+    """Lista de (caso, métrica, antes, ahora) que empeoraron más que `threshold`"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        for metric in ('median_ms', 'peak_kib'):
+            before = previous.get(metric)
+            if before and current[metric] > before * (1 + threshold):
+                regressions.append((name, metric, before, current[metric]))
+    return regressions
+
+
+def print_results(results, baseline):
+    print(f"{'caso':<26}{'mediana ms':>12}{'mín ms':>10}{'pico KiB':>11}{'vs base':>10}")
+    print('-' * 69)
+    for name, r in results.items():
+        previous = baseline.get(name, {}).get('median_ms')
+        delta = f"{(r['median_ms'] / previous - 1) * 100:+.0f}%" if previous else '-'
+        print(f"{name:<26}{r['median_ms']:>12.1f}{r['min_ms']:>10.1f}{r['peak_kib']:>11.0f}{delta:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks del render de photocards")
+    parser.add_argument('--repeat', type=int, default=5, help="corridas medidas por caso")
+    parser.add_argument('--only', help="sólo los casos cuyo nombre empieza así (card, grid, stage/text...)")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="archivo JSON de la línea base")
+    parser.add_argument('--threshold', type=float, default=0.15, help="empeoramiento tolerado (0.15 = 15%%)")
+    parser.add_argument('--save-baseline', action='store_true', help="guarda estos resultados como línea base")
+    args = parser.parse_args(argv)
+    
+    # PhotocardProcessor busca la fuente con rutas relativas a la raíz
+    os.chdir(ROOT)
+    photos = sorted(glob.glob(os.path.join(PHOTOS, '*.jpg')))
+    if not photos:
+        sys.exit(f"❌ No hay imágenes en {PHOTOS}")
+    
+    processor = PhotocardProcessor()
+    if not processor.font_path:
+        print("⚠️ Sin data/fonts/font.ttf: el texto se mide con la fuente por defecto")
+    
+    results = {}
+    for name, fn in build_cases(processor, photos):
+        if args.only and not name.startswith(args.only):
+            continue
+        results[name] = measure(fn, args.repeat)
+    
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f).get('cases', {})
+    
+    print_results(results, baseline)
+    
+    if args.save_baseline:
+        # Se conservan los casos no medidos en esta corrida (--only)
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump({'repeat': args.repeat, 'cases': baseline}, f, indent=2, sort_keys=True)
+        print(f"\n💾 Línea base guardada en {args.baseline}")
+        return 0
+    
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regresiones (umbral {args.threshold:.0%}):")
+        for name, metric, before, now in regressions:
+            print(f"  {name} {metric}: {before:.1f} → {now:.1f}")
+        return 1
+    if baseline:
+        print(f"\n✅ Sin regresiones respecto a la línea base (umbral {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
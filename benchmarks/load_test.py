@@ -0,0 +1,170 @@
+"""Prueba de carga offline de los cogs.
+    
+    python -m benchmarks.load_test --drops 20 --claimers 10 --users 50 --ops 200
+
+Fases:
+  drop      N drops simultáneos en canales distintos (latencia hasta que el drop es visible)
+  claim     M usuarios compitiendo por reclamar cada drop (latencia de on_reaction_add)
+  buy, sell, collection, view, inventory, leaderboard
+            flujo de comandos de prefijo repartidos entre los usuarios
+
+Al final se imprime una tabla por fase y, con --json, se guarda el detalle.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from benchmarks.fakes import FakeReaction, FakeUser
+from benchmarks.harness import BenchHarness, PhaseResult, print_table
+
+CLAIM_EMOJIS = ['1️⃣', '2️⃣', '3️⃣']
+
+
+async def drop_phase(harness, drops, expire):
+    gacha = harness.bot.get_cog('Gacha')
+    gacha.DROP_EXPIRE_TIME = expire
+    channels = [harness.new_channel() for _ in range(drops)]
+    
+    result = PhaseResult('drop')
+    before = harness.snapshot()
+    started = time.perf_counter()
+    # spawn_card duerme hasta que el drop expira: se lanza en segundo plano
+    # y se espera a que cada drop esté publicado y aceptando reclamos
+    tasks = [asyncio.create_task(gacha.spawn_card(channel)) for channel in channels]
+    while not all(channel.id in gacha.active_drops or task.done() for channel, task in zip(channels, tasks)):
+        await asyncio.sleep(0.001)
+    result.wall = time.perf_counter() - started
+    result.latencies = [channel.sent_at[0] - started for channel in channels if channel.sent_at]
+    harness.attribute(result, before)
+    return result, channels, tasks
+
+
+async def claim_phase(harness, channels, claimers):
+    gacha = harness.bot.get_cog('Gacha')
+    drops = [gacha.active_drops.get(channel.id) for channel in channels]
+    
+    jobs = []
+    for drop in drops:
+        if not drop:
+            continue
+        message = drop['message']
+        for _ in range(claimers):
+            user = harness.guild.add_member(FakeUser())
+            reaction = FakeReaction(message, random.choice(CLAIM_EMOJIS))
+            jobs.append(_timed(gacha.on_reaction_add(reaction, user)))
+    
+    result = await harness.phase('claim', jobs, concurrency=len(jobs) or 1)
+    winners = sum(
+        1 for channel in channels for message in channel.messages if message.content.startswith('🎉')
+    )
+    return result, winners
+
+
+async def _timed(coro):
+    started = time.perf_counter()
+    await coro
+    return time.perf_counter() - started
+
+
+async def owned_card(harness, user):
+    async with harness.bot.db.execute(
+        'SELECT card_id FROM user_card_counts WHERE user_id = ? LIMIT 1', (user.id,)
+    ) as cursor:
+        row = await cursor.fetchone()
+    return row[0] if row else None
+
+
+async def command_phases(harness, users, ops, concurrency):
+    channel = harness.new_channel()
+    card_numbers = [card.card_number for card in harness.bot.catalog] or ['X']
+    results = []
+    
+    def spread(make_text):
+        return [harness.timed_command(users[i % len(users)], channel, make_text(i)) for i in range(ops)]
+    
+    results.append(await harness.phase('buy', spread(lambda i: 'buy basic'), concurrency))
+    
+    sells = []
+    for i in range(ops):
+        user = users[i % len(users)]
+        card_id = await owned_card(harness, user)
+        if card_id:
+            sells.append(harness.timed_command(user, channel, f'sell {card_id}'))
+    results.append(await harness.phase('sell', sells, concurrency))
+    
+    results.append(await harness.phase('collection', spread(lambda i: 'collection'), concurrency))
+    results.append(await harness.phase(
+        'view', spread(lambda i: f'view {random.choice(card_numbers)}'), concurrency
+    ))
+    results.append(await harness.phase('inventory', spread(lambda i: 'inventory'), concurrency))
+    results.append(await harness.phase('leaderboard', spread(lambda i: 'leaderboard coins'), concurrency))
+    return results
+
+
+async def main(args):
+    random.seed(args.seed)
+    async with BenchHarness(args.db, latency=args.latency / 1000, lag_threshold=args.lag_threshold) as harness:
+        results = []
+        
+        drop_result, channels, drop_tasks = await drop_phase(harness, args.drops, args.drop_expire)
+        results.append(drop_result)
+        claim_result, winners = await claim_phase(harness, channels, args.claimers)
+        results.append(claim_result)
+        
+        users = await harness.new_users(args.users, coins=args.coins)
+        results.extend(await command_phases(harness, users, args.ops, args.concurrency))
+        
+        # Los drops ya reclamados sólo esperan su expiración
+        for task in drop_tasks:
+            task.cancel()
+        await asyncio.gather(*drop_tasks, return_exceptions=True)
+        
+        print_table(results)
+        print()
+        print(f"Drops reclamados: {winners}/{len(channels)} (debe haber un ganador por drop)")
+        print(f"Peticiones a Discord: {dict(harness.gateway.requests)}")
+        print(f"Subido: {harness.gateway.bytes_uploaded / 1024 / 1024:.1f} MiB")
+        lag = harness.bot.watchdog.percentiles()
+        if lag:
+            print(f"Retraso del loop: p50 {lag['p50'] * 1000:.1f} ms · p99 {lag['p99'] * 1000:.1f} ms · máx {lag['max'] * 1000:.1f} ms")
+        if harness.errors:
+            print(f"Errores ({len(harness.errors)}):")
+            for phase, error in harness.errors[:10]:
+                print(f"  [{phase}] {type(error).__name__}: {error}")
+        
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump({
+                    'args': vars(args),
+                    'phases': [result.as_dict() for result in results],
+                    'winners': winners,
+                    'requests': dict(harness.gateway.requests),
+                    'bytes_uploaded': harness.gateway.bytes_uploaded,
+                    'loop_lag': lag
+                }, f, indent=2)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga offline de KpopPhotocardBot")
+    parser.add_argument('--db', default='kpop_bot.db', help="base a copiar (no se modifica)")
+    parser.add_argument('--drops', type=int, default=10, help="drops simultáneos")
+    parser.add_argument('--claimers', type=int, default=5, help="usuarios compitiendo por cada drop")
+    parser.add_argument('--drop-expire', type=float, default=60.0, help="segundos hasta que expira un drop")
+    parser.add_argument('--users', type=int, default=20, help="usuarios del flujo de comandos")
+    parser.add_argument('--coins', type=int, default=100000, help="saldo inicial de cada usuario")
+    parser.add_argument('--ops', type=int, default=100, help="comandos por fase")
+    parser.add_argument('--concurrency', type=int, default=10, help="comandos en vuelo a la vez")
+    parser.add_argument('--latency', type=float, default=0.0, help="latencia simulada de Discord en ms")
+    parser.add_argument('--lag-threshold', type=float, default=1.0, help="umbral del watchdog en segundos")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help="guarda los resultados en este archivo")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    asyncio.run(main(parse_args()))
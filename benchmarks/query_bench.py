@@ -0,0 +1,174 @@
+"""Latencia de cada consulta de los cogs sobre una base grande.
+    
+    python -m benchmarks.generate_db --out bench_large.db
+    python -m benchmarks.query_bench --db bench_large.db --users 30
+
+Corre los comandos de economy, collection y gacha (con su SQL real, sobre
+una copia de la base) para usuarios elegidos por tamaño de colección:
+los más grandes, el percentil 90 y la mediana. Al final lista cada
+sentencia normalizada con sus ejecuciones, media, máximo y total, tomados
+de las estadísticas de InstrumentedConnection. Las que superan --slow-ms
+se imprimen además con su EXPLAIN QUERY PLAN.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import types
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from benchmarks.fakes import FakeReaction, FakeUser
+from benchmarks.harness import BenchHarness
+from cogs.collection import COLLECTION_SORTS
+
+
+async def pick_users(harness, per_tier):
+    """Usuarios reales de la base, agrupados por tamaño de colección"""
+    async with harness.bot.db.execute(
+        'SELECT user_id, card_count FROM users WHERE card_count > 0 ORDER BY card_count DESC'
+    ) as cursor:
+        rows = await cursor.fetchall()
+    if not rows:
+        return {}
+    
+    tiers = {
+        'top': rows[:per_tier],
+        'p90': rows[len(rows) // 10:len(rows) // 10 + per_tier],
+        'p50': rows[len(rows) // 2:len(rows) // 2 + per_tier]
+    }
+    return {
+        tier: [harness.guild.add_member(FakeUser(user_id=user_id)) for user_id, _ in members]
+        for tier, members in tiers.items()
+    }
+
+
+async def owned(harness, user, limit=1):
+    async with harness.bot.db.execute(
+        'SELECT card_id FROM user_card_counts WHERE user_id = ? LIMIT ?', (user.id, limit)
+    ) as cursor:
+        return [row[0] for row in await cursor.fetchall()]
+
+
+async def read_commands(harness, user, channel):
+    """Comandos de sólo lectura; se pueden repetir sin alterar la base"""
+    run = harness.run_command
+    collection = harness.bot.get_cog('Collection')
+    
+    for sort in COLLECTION_SORTS:
+        await run(user, channel, f'collection sort:{sort}')
+    await run(user, channel, 'collection dupes:true')
+    await run(user, channel, 'collection rarity:Legendary')
+    
+    # Segunda página: la consulta por keyset que ejecuta el botón "siguiente"
+    flags = types.SimpleNamespace(group=None, rarity=None, era=None, dupes=False, sort='qty')
+    rows = await collection._fetch_collection_page(user.id, flags, None)
+    if rows:
+        await collection._fetch_collection_page(user.id, flags, tuple(rows[-1][6:]))
+    
+    await run(user, channel, 'inventory')
+    await run(user, channel, 'balance')
+    for category in ('coins', 'cards', 'drops'):
+        await run(user, channel, f'leaderboard {category}')
+
+
+async def write_commands(harness, user, other, channel):
+    """Comandos que modifican la colección; cada uno se ejecuta una vez por usuario"""
+    run = harness.run_command
+    cards = await owned(harness, user, 3)
+    if cards:
+        await run(user, channel, f'sell {cards[0]}')
+    if len(cards) > 1:
+        await harness.call_command(user, channel, 'gift', other, cards[1])
+    await run(user, channel, 'buy basic')
+    await run(user, channel, 'daily')
+    await run(user, channel, 'sell rarity Common')
+    await run(user, channel, 'sell dupes')
+    group = harness.bot.catalog.get(cards[-1]).group if cards else None
+    if group:
+        await run(user, channel, f'sell group {group}')
+
+
+async def claim(harness, user, channel):
+    """Reclamo de un drop: se inyecta el drop sin renderizar el grid"""
+    gacha = harness.bot.get_cog('Gacha')
+    cards = await gacha.get_random_cards(3)
+    message = await channel.send('drop')
+    gacha.active_drops[channel.id] = {
+        'cards': cards, 'message_id': message.id, 'message': message,
+        'expires_at': datetime.utcnow() + timedelta(seconds=60), 'claimed': False
+    }
+    gacha.grab_cooldowns.pop(user.id, None)
+    await gacha.on_reaction_add(FakeReaction(message, '1️⃣'), user)
+
+
+async def main(args):
+    async with BenchHarness(args.db, lag_threshold=10.0) as harness:
+        bot = harness.bot
+        bot.db.slow_threshold = args.slow_ms / 1000
+        # Sin caché del ranking: cada k!lb llega a la base
+        bot.get_cog('Economy').LEADERBOARD_TTL = 0
+        
+        tiers = await pick_users(harness, args.users // 3 or 1)
+        if not tiers:
+            sys.exit("❌ La base no tiene usuarios con cartas (genera una con benchmarks.generate_db)")
+        channel = harness.new_channel()
+        # Lo que tarden la carga del catálogo y el esquema no cuenta
+        bot.db.reset_stats()
+        
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            for users in tiers.values():
+                for user in users:
+                    await read_commands(harness, user, channel)
+        # k!view renderiza la carta: pocas búsquedas bastan para medir su SQL
+        everyone = [user for users in tiers.values() for user in users]
+        for i, card in zip(range(args.views), bot.catalog):
+            await harness.run_command(everyone[i % len(everyone)], channel, f'view {card.card_number}')
+        
+        for i, user in enumerate(everyone):
+            await claim(harness, user, channel)
+            await write_commands(harness, user, everyone[(i + 1) % len(everyone)], channel)
+        wall = time.perf_counter() - started
+        
+        stats = sorted(bot.db.stats.items(), key=lambda item: item[1].total, reverse=True)
+        width = args.width
+        print(f"{'ejec':>6}{'media ms':>10}{'máx ms':>9}{'total ms':>10}  sentencia")
+        print('-' * (37 + width))
+        for sql, s in stats:
+            text = sql if len(sql) <= width else sql[:width - 1] + '…'
+            print(f"{s.count:>6}{s.total / s.count * 1000:>10.2f}{s.max * 1000:>9.1f}{s.total * 1000:>10.1f}  {text}")
+        
+        print()
+        print(f"{sum(len(users) for users in tiers.values())} usuarios · {wall:.1f}s · "
+              f"{sum(s.count for _, s in stats):,} sentencias · "
+              f"{sum(s.total for _, s in stats) * 1000:.0f} ms en SQL")
+        if harness.errors:
+            print(f"Errores ({len(harness.errors)}):")
+            for phase, error in harness.errors[:10]:
+                print(f"  [{phase}] {type(error).__name__}: {error}")
+        
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump({
+                    sql: {'count': s.count, 'mean_ms': s.total / s.count * 1000, 'max_ms': s.max * 1000}
+                    for sql, s in stats
+                }, f, indent=2)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Latencia por consulta de los cogs sobre una base grande")
+    parser.add_argument('--db', default='bench_large.db', help="base a copiar (no se modifica)")
+    parser.add_argument('--users', type=int, default=30, help="usuarios a repartir entre top, p90 y p50")
+    parser.add_argument('--rounds', type=int, default=3, help="repeticiones de los comandos de lectura")
+    parser.add_argument('--views', type=int, default=5, help="búsquedas con k!view (cada una renderiza)")
+    parser.add_argument('--slow-ms', type=float, default=50.0, help="umbral para imprimir el plan de consulta")
+    parser.add_argument('--width', type=int, default=110, help="ancho de la columna de SQL")
+    parser.add_argument('--json', help="guarda las estadísticas por sentencia en este archivo")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,67 @@
+"""Comprueba que el render acepta fotos en cualquier modo de color.
+
+    python -m benchmarks.render_check
+
+Renderiza una foto de color liso en cada modo de Pillow que puede traer
+un original o un master (paleta, grises, 16 bits, CMYK...), tanto con la
+geometría exacta del hueco de la foto como con otra que hay que recortar.
+La foto pegada debe conservar su color: si _load_photo falla cae en el
+fondo blanco de respaldo y la carta sale en blanco.
+"""
+import os
+import sys
+import tempfile
+
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from utils.image_processor import PhotocardProcessor
+
+COLOR = (200, 40, 90)
+MODES = ['RGBA', 'RGB', 'P', 'L', 'LA', 'I;16', 'CMYK']
+
+
+def source_image(mode, size):
+    img = Image.new('RGB', size, COLOR)
+    if mode == 'P':
+        return img.quantize(colors=4)
+    if mode == 'I;16':
+        # Valores bajos: al pasar a 8 bits Pillow recorta, no escala
+        return img.convert('L').convert('I').convert('I;16')
+    return img.convert(mode)
+
+
+def main():
+    processor = PhotocardProcessor()
+    exact = (processor.photo_width, processor.photo_height)
+    center = (processor.border_size + exact[0] // 2, processor.border_size + exact[1] // 2)
+    failures = 0
+    
+    with tempfile.TemporaryDirectory(prefix='kpc-render-') as tmpdir:
+        for mode in MODES:
+            for label, size in (('exacta', exact), ('recorte', (800, 1000))):
+                # PNG no guarda CMYK: va en JPEG, como suele llegar
+                ext = 'jpg' if mode == 'CMYK' else 'png'
+                path = os.path.join(tmpdir, f"{mode.replace(';', '_')}-{label}.{ext}")
+                source_image(mode, size).save(path)
+                # El color que debe aparecer en la carta, tal como Pillow lee el archivo
+                with Image.open(path) as saved:
+                    expected = saved.convert('RGB').getpixel((size[0] // 2, size[1] // 2))
+                
+                try:
+                    canvas = processor.render_card(path, {'rarity': 'Common', 'member': 'Test', 'group': 'Test'})
+                    pixel = canvas.convert('RGB').getpixel(center)
+                    ok = pixel == expected
+                    detail = f"{pixel} (esperado {expected})"
+                except Exception as e:
+                    ok = False
+                    detail = f"{type(e).__name__}: {e}"
+                
+                failures += not ok
+                print(f"{'✅' if ok else '❌'} {mode:<5} {label:<8} {detail}")
+    
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
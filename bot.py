@@ -3,35 +3,103 @@ from discord.ext import commands
 import os
 from dotenv import load_dotenv
 import asyncio
+import time
 import aiosqlite
+from datetime import datetime
+
+from utils.names import NameResolver
+from utils.card_search import CardSearch
+from utils.catalog import Catalog
+from utils.upload_cache import UploadCache
+from utils.wishlist import Wishlist
+from utils.dispatcher import OutboundDispatcher
+from utils.db import InstrumentedConnection
+from utils.watchdog import LoopWatchdog
+from utils.atlas import SpriteAtlas
+from utils.card_counts import card_sets_sql, set_rows_sql
+from utils import metrics
 
 load_dotenv()
 
+COMMAND_SECONDS = metrics.histogram(
+    'kpc_command_seconds', 'Duración de cada comando', ('command', 'status')
+)
+
 # Configuración de intents
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
 class KpopPhotocardBot(commands.Bot):
-    def __init__(self):
+    def __init__(self, db_path=None):
         super().__init__(
             command_prefix=os.getenv('PREFIX', 'k!'),
             intents=intents,
-            help_command=None
+            help_command=None,
+            # Esperas largas por rate limit lanzan RateLimited en lugar de
+            # dormir dentro de discord.py; el dispatcher reprograma la operación
+            max_ratelimit_timeout=30.0
         )
         self.db = None
+        self.db_path = db_path or os.getenv('DB_PATH', 'kpop_bot.db')
+        # Serializa las transacciones de escritura sobre la conexión compartida
+        self.db_lock = asyncio.Lock()
+        self.names = NameResolver(self)
+        self.catalog = None
+        self.card_search = None
+        self.atlas = None
+        self.upload_cache = UploadCache(self)
+        self.wishlist = Wishlist(self)
+        self.dispatcher = OutboundDispatcher()
+        self.metrics_server = None
+        self.watchdog = LoopWatchdog(threshold=float(os.getenv('LOOP_LAG_THRESHOLD', '0.25')))
         
     async def setup_hook(self):
+        self.watchdog.start()
+        
         # Inicializar base de datos
-        self.db = await aiosqlite.connect('kpop_bot.db')
+        self.db = InstrumentedConnection(
+            await aiosqlite.connect(self.db_path),
+            slow_threshold=float(os.getenv('SLOW_QUERY_MS', '100')) / 1000,
+            lock=self.db_lock
+        )
         await self.init_db()
+        self.names.start()
+        
+        # Catálogo en memoria; el índice de prefijos se rehace en cada recarga
+        self.catalog = Catalog(self.db)
+        self.card_search = CardSearch(self.db, self.catalog)
+        self.catalog.on_reload.append(self.card_search.refresh)
+        await self.catalog.reload()
+        self.catalog.start()
+        
+        # Atlas de fotos (build_assets.py --atlas); si build_assets lo
+        # regenera, se vuelve a mapear con la siguiente recarga del catálogo
+        self.atlas = SpriteAtlas.open(os.getenv('ATLAS_PATH', 'data/assets/atlas.bin'))
+        if self.atlas is not None:
+            self.catalog.on_reload.append(self.atlas.refresh)
+        await self.upload_cache.load()
+        await self.wishlist.load()
+        
+        # Exportador de métricas (Prometheus) sólo si se pidió un puerto;
+        # sin él la instrumentación queda apagada y no cuesta nada
+        if os.getenv('METRICS_PORT'):
+            self.metrics_server = metrics.MetricsServer(
+                host=os.getenv('METRICS_HOST', '127.0.0.1'),
+                port=int(os.getenv('METRICS_PORT'))
+            )
+            await self.metrics_server.start()
         
         # Cargar cogs
         await self.load_extension('cogs.gacha')
         await self.load_extension('cogs.collection')
         await self.load_extension('cogs.economy')
+        await self.load_extension('cogs.progress')
+        await self.load_extension('cogs.wishlist')
+        await self.load_extension('cogs.trade')
         # CORRECCIÓN: Se agrega la carga del comando de ayuda
         await self.load_extension('cogs.help_command')
+        await self.load_extension('cogs.admin')
         
         print("Bot inicializado correctamente")
     
@@ -58,6 +126,15 @@ class KpopPhotocardBot(commands.Bot):
                 series TEXT DEFAULT 'S1'
             )
         ''')
+        # Hash del archivo de imagen que validó ingest_cards.py
+        await self._add_column('photocards', 'image_hash', 'TEXT')
+        # Original de la imagen cuando image_path apunta al master de build_assets.py
+        await self._add_column('photocards', 'source_path', 'TEXT')
+        # Rareza como entero (Legendary primero). Columna generada: siempre al
+        # día sin triggers ni cambios en ingest, e indexable para k!collection
+        await self._add_column('photocards', 'rarity_rank', '''INTEGER GENERATED ALWAYS AS (CASE rarity
+            WHEN 'Legendary' THEN 0 WHEN 'Epic' THEN 1 WHEN 'Rare' THEN 2
+            WHEN 'Uncommon' THEN 3 WHEN 'Common' THEN 4 ELSE 5 END) VIRTUAL''')
         
         await self.db.execute('''
             CREATE TABLE IF NOT EXISTS user_cards (
@@ -71,8 +148,351 @@ class KpopPhotocardBot(commands.Bot):
             )
         ''')
         
+        # Versión del catálogo: cualquier cambio en photocards la incrementa,
+        # así el bot detecta cambios hechos por otros procesos y recarga
+        await self.db.execute('''
+            CREATE TABLE IF NOT EXISTS catalog_meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        ''')
+        await self.db.execute(
+            "INSERT OR IGNORE INTO catalog_meta (key, value) VALUES ('catalog_version', 0)"
+        )
+        
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            await self.db.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_photocards_version_{event.lower()}
+                AFTER {event} ON photocards
+                BEGIN
+                    UPDATE catalog_meta SET value = value + 1 WHERE key = 'catalog_version';
+                END
+            ''')
+        
+        # Índice de búsqueda full-text (trigram) sobre el catálogo,
+        # sincronizado con photocards mediante triggers
+        if not await self._table_exists('photocards_fts'):
+            await self.db.execute('''
+                CREATE VIRTUAL TABLE photocards_fts USING fts5(
+                    card_number, group_name, member_name, era, series,
+                    content='photocards', content_rowid='card_id',
+                    tokenize='trigram'
+                )
+            ''')
+            await self.db.execute("INSERT INTO photocards_fts(photocards_fts) VALUES ('rebuild')")
+        
+        await self.db.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_photocards_fts_insert
+            AFTER INSERT ON photocards
+            BEGIN
+                INSERT INTO photocards_fts (rowid, card_number, group_name, member_name, era, series)
+                VALUES (NEW.card_id, NEW.card_number, NEW.group_name, NEW.member_name, NEW.era, NEW.series);
+            END
+        ''')
+        
+        await self.db.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_photocards_fts_delete
+            AFTER DELETE ON photocards
+            BEGIN
+                INSERT INTO photocards_fts (photocards_fts, rowid, card_number, group_name, member_name, era, series)
+                VALUES ('delete', OLD.card_id, OLD.card_number, OLD.group_name, OLD.member_name, OLD.era, OLD.series);
+            END
+        ''')
+        
+        await self.db.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_photocards_fts_update
+            AFTER UPDATE ON photocards
+            BEGIN
+                INSERT INTO photocards_fts (photocards_fts, rowid, card_number, group_name, member_name, era, series)
+                VALUES ('delete', OLD.card_id, OLD.card_number, OLD.group_name, OLD.member_name, OLD.era, OLD.series);
+                INSERT INTO photocards_fts (rowid, card_number, group_name, member_name, era, series)
+                VALUES (NEW.card_id, NEW.card_number, NEW.group_name, NEW.member_name, NEW.era, NEW.series);
+            END
+        ''')
+        
+        # Catálogo en el orden de `sort: rarity`, cubriendo toda la clave:
+        # las colecciones grandes se paginan recorriéndolo sin ordenar
+        await self.db.execute('''
+            CREATE INDEX IF NOT EXISTS idx_photocards_rarity_order
+            ON photocards (rarity_rank, group_name, member_name, card_id)
+        ''')
+        
+        # Compras, ventas y regalos buscan siempre por (user_id, card_id)
+        await self.db.execute('''
+            CREATE INDEX IF NOT EXISTS idx_user_cards_user_card
+            ON user_cards (user_id, card_id)
+        ''')
+        
+        # Proyección compacta (usuario, carta) -> cantidad para colección e
+        # inventario; los triggers la mantienen dentro de la misma transacción
+        # que modifica user_cards
+        if not await self._table_exists('user_card_counts'):
+            await self.db.execute('''
+                CREATE TABLE user_card_counts (
+                    user_id INTEGER NOT NULL,
+                    card_id INTEGER NOT NULL,
+                    qty INTEGER NOT NULL,
+                    PRIMARY KEY (user_id, card_id)
+                ) WITHOUT ROWID
+            ''')
+            await self.db.execute('''
+                INSERT INTO user_card_counts (user_id, card_id, qty)
+                SELECT user_id, card_id, COUNT(*) FROM user_cards GROUP BY user_id, card_id
+            ''')
+        
+        await self.db.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_user_card_counts_insert
+            AFTER INSERT ON user_cards
+            BEGIN
+                INSERT INTO user_card_counts (user_id, card_id, qty) VALUES (NEW.user_id, NEW.card_id, 1)
+                ON CONFLICT(user_id, card_id) DO UPDATE SET qty = qty + 1;
+            END
+        ''')
+        
+        await self.db.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_user_card_counts_delete
+            AFTER DELETE ON user_cards
+            BEGIN
+                UPDATE user_card_counts SET qty = qty - 1
+                WHERE user_id = OLD.user_id AND card_id = OLD.card_id;
+                DELETE FROM user_card_counts
+                WHERE user_id = OLD.user_id AND card_id = OLD.card_id AND qty <= 0;
+            END
+        ''')
+        
+        # Regalos e intercambios mueven la fila (conserva serial y fecha)
+        # cambiando user_id: la copia sale de un dueño y entra en el otro
+        await self.db.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_user_card_counts_move
+            AFTER UPDATE OF user_id ON user_cards
+            WHEN OLD.user_id IS NOT NEW.user_id
+            BEGIN
+                UPDATE user_card_counts SET qty = qty - 1
+                WHERE user_id = OLD.user_id AND card_id = OLD.card_id;
+                DELETE FROM user_card_counts
+                WHERE user_id = OLD.user_id AND card_id = OLD.card_id AND qty <= 0;
+                INSERT INTO user_card_counts (user_id, card_id, qty) VALUES (NEW.user_id, NEW.card_id, 1)
+                ON CONFLICT(user_id, card_id) DO UPDATE SET qty = qty + 1;
+            END
+        ''')
+        
+        # Contador materializado de cartas por usuario para el ranking;
+        # los triggers lo mantienen en cualquier camino que inserte o borre
+        if await self._add_column('users', 'card_count', 'INTEGER DEFAULT 0'):
+            await self.db.execute('''
+                UPDATE users SET card_count = (
+                    SELECT COUNT(*) FROM user_cards WHERE user_cards.user_id = users.user_id
+                )
+            ''')
+        
+        await self.db.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_user_cards_count_insert
+            AFTER INSERT ON user_cards
+            BEGIN
+                INSERT INTO users (user_id, card_count) VALUES (NEW.user_id, 1)
+                ON CONFLICT(user_id) DO UPDATE SET card_count = card_count + 1;
+            END
+        ''')
+        
+        await self.db.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_user_cards_count_delete
+            AFTER DELETE ON user_cards
+            BEGIN
+                UPDATE users SET card_count = card_count - 1 WHERE user_id = OLD.user_id;
+            END
+        ''')
+        
+        await self.db.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_user_cards_count_move
+            AFTER UPDATE OF user_id ON user_cards
+            WHEN OLD.user_id IS NOT NEW.user_id
+            BEGIN
+                UPDATE users SET card_count = card_count - 1 WHERE user_id = OLD.user_id;
+                INSERT INTO users (user_id, card_count) VALUES (NEW.user_id, 1)
+                ON CONFLICT(user_id) DO UPDATE SET card_count = card_count + 1;
+            END
+        ''')
+        
+        # Progreso de colección por set (grupo, era y serie): cartas del
+        # catálogo en cada set y cartas distintas que tiene cada usuario.
+        # Los triggers los mantienen al entrar o salir una carta de
+        # user_card_counts y al cambiar el catálogo
+        if not await self._table_exists('set_totals'):
+            await self.db.execute('''
+                CREATE TABLE set_totals (
+                    kind TEXT NOT NULL,
+                    set_key TEXT NOT NULL,
+                    total INTEGER NOT NULL,
+                    PRIMARY KEY (kind, set_key)
+                ) WITHOUT ROWID
+            ''')
+            await self.db.execute(f'''
+                INSERT INTO set_totals (kind, set_key, total)
+                SELECT kind, set_key, COUNT(*) FROM ({card_sets_sql()}) GROUP BY kind, set_key
+            ''')
+        
+        if not await self._table_exists('user_set_progress'):
+            await self.db.execute('''
+                CREATE TABLE user_set_progress (
+                    user_id INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    set_key TEXT NOT NULL,
+                    owned INTEGER NOT NULL,
+                    PRIMARY KEY (user_id, kind, set_key)
+                ) WITHOUT ROWID
+            ''')
+            await self.db.execute(f'''
+                INSERT INTO user_set_progress (user_id, kind, set_key, owned)
+                SELECT c.user_id, s.kind, s.set_key, COUNT(*)
+                FROM user_card_counts c
+                JOIN ({card_sets_sql()}) s ON s.card_id = c.card_id
+                GROUP BY c.user_id, s.kind, s.set_key
+            ''')
+        
+        # Ranking de "más cerca de completar" un set: recorre el índice de mayor a menor
+        await self.db.execute('''
+            CREATE INDEX IF NOT EXISTS idx_user_set_progress_ranking
+            ON user_set_progress (kind, set_key, owned)
+        ''')
+        
+        await self.db.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_set_progress_insert
+            AFTER INSERT ON user_card_counts
+            BEGIN
+                INSERT INTO user_set_progress (user_id, kind, set_key, owned)
+                SELECT NEW.user_id, kind, set_key, 1 FROM ({card_sets_sql('p.card_id = NEW.card_id')}) WHERE true
+                ON CONFLICT(user_id, kind, set_key) DO UPDATE SET owned = owned + 1;
+            END
+        ''')
+        
+        await self.db.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_set_progress_delete
+            AFTER DELETE ON user_card_counts
+            BEGIN
+                UPDATE user_set_progress SET owned = owned - 1
+                WHERE user_id = OLD.user_id
+                AND (kind, set_key) IN (SELECT kind, set_key FROM ({card_sets_sql('p.card_id = OLD.card_id')}));
+                DELETE FROM user_set_progress WHERE user_id = OLD.user_id AND owned <= 0;
+            END
+        ''')
+        
+        await self.db.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_set_totals_insert
+            AFTER INSERT ON photocards
+            BEGIN
+                INSERT INTO set_totals (kind, set_key, total)
+                SELECT kind, set_key, 1 FROM ({set_rows_sql('NEW')}) WHERE true
+                ON CONFLICT(kind, set_key) DO UPDATE SET total = total + 1;
+            END
+        ''')
+        
+        # ingest_cards.py --prune nunca borra cartas que alguien tiene,
+        # así que al borrar sólo cambian los totales
+        await self.db.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_set_totals_delete
+            AFTER DELETE ON photocards
+            BEGIN
+                UPDATE set_totals SET total = total - 1
+                WHERE (kind, set_key) IN (SELECT kind, set_key FROM ({set_rows_sql('OLD')}));
+                DELETE FROM set_totals WHERE total <= 0;
+            END
+        ''')
+        
+        # Una carta que cambia de grupo, era o serie se mueve de set en los
+        # totales y en el progreso de quienes la tienen (raro: recorre
+        # user_card_counts buscando sus dueños)
+        await self.db.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_set_progress_catalog_update
+            AFTER UPDATE OF group_name, era, series ON photocards
+            WHEN OLD.group_name IS NOT NEW.group_name OR OLD.era IS NOT NEW.era OR OLD.series IS NOT NEW.series
+            BEGIN
+                UPDATE set_totals SET total = total - 1
+                WHERE (kind, set_key) IN (SELECT kind, set_key FROM ({set_rows_sql('OLD')}));
+                INSERT INTO set_totals (kind, set_key, total)
+                SELECT kind, set_key, 1 FROM ({set_rows_sql('NEW')}) WHERE true
+                ON CONFLICT(kind, set_key) DO UPDATE SET total = total + 1;
+                DELETE FROM set_totals WHERE total <= 0;
+                
+                UPDATE user_set_progress SET owned = owned - 1
+                WHERE (user_id, kind, set_key) IN (
+                    SELECT c.user_id, s.kind, s.set_key
+                    FROM user_card_counts c, ({set_rows_sql('OLD')}) s
+                    WHERE c.card_id = OLD.card_id
+                );
+                INSERT INTO user_set_progress (user_id, kind, set_key, owned)
+                SELECT c.user_id, s.kind, s.set_key, 1
+                FROM user_card_counts c, ({set_rows_sql('NEW')}) s
+                WHERE c.card_id = NEW.card_id
+                ON CONFLICT(user_id, kind, set_key) DO UPDATE SET owned = owned + 1;
+                DELETE FROM user_set_progress
+                WHERE owned <= 0 AND user_id IN (SELECT user_id FROM user_card_counts WHERE card_id = NEW.card_id);
+            END
+        ''')
+        
+        # Caché persistente de nombres visibles para los rankings
+        await self.db.execute('''
+            CREATE TABLE IF NOT EXISTS display_names (
+                user_id INTEGER PRIMARY KEY,
+                display_name TEXT NOT NULL,
+                updated_at TIMESTAMP NOT NULL
+            )
+        ''')
+        
+        # URLs de CDN de imágenes ya subidas (renders sin serial y grids)
+        await self.db.execute('''
+            CREATE TABLE IF NOT EXISTS upload_cache (
+                cache_key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                message_id INTEGER NOT NULL,
+                expires_at TIMESTAMP NOT NULL
+            )
+        ''')
+        await self.db.execute(
+            'CREATE INDEX IF NOT EXISTS idx_upload_cache_message ON upload_cache (message_id)'
+        )
+        await self.db.execute(
+            'DELETE FROM upload_cache WHERE expires_at <= ?',
+            (datetime.utcnow().isoformat(),)
+        )
+        
+        # Wishlists por servidor; la clave primaria es el índice invertido
+        # (servidor, carta) -> usuarios que Wishlist carga en memoria
+        await self.db.execute('''
+            CREATE TABLE IF NOT EXISTS wishlist (
+                guild_id INTEGER NOT NULL,
+                card_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (guild_id, card_id, user_id)
+            ) WITHOUT ROWID
+        ''')
+        
+        # Índices para las columnas del ranking
+        for column in ('coins', 'drops_count', 'card_count'):
+            await self.db.execute(
+                f'CREATE INDEX IF NOT EXISTS idx_users_{column} ON users ({column})'
+            )
+        
         await self.db.commit()
     
+    async def _table_exists(self, table):
+        async with self.db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (table,)
+        ) as cursor:
+            return await cursor.fetchone() is not None
+    
+    async def _add_column(self, table, column, definition):
+        """Agrega una columna si la tabla todavía no la tiene (migración)"""
+        async with self.db.execute(f'PRAGMA table_info({table})') as cursor:
+            columns = [row[1] for row in await cursor.fetchall()]
+        
+        if column in columns:
+            return False
+        
+        await self.db.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+        return True
+    
     async def on_ready(self):
         print(f'{self.user} ha iniciado sesión')
         print(f'ID: {self.user.id}')
@@ -80,7 +500,43 @@ class KpopPhotocardBot(commands.Bot):
             activity=discord.Game(name=f"{self.command_prefix}help | Colecciona photocards!")
         )
     
+    async def on_command(self, ctx):
+        # Cada comando nos da gratis el nombre actual de su autor
+        self.names.remember(ctx.author.id, ctx.author.display_name)
+    
+    async def get_context(self, origin, *, cls=commands.Context):
+        # Se marca al crear el contexto (prefijo o slash) para medir el comando completo
+        ctx = await super().get_context(origin, cls=cls)
+        ctx.started_at = time.perf_counter()
+        if ctx.command:
+            self.watchdog.track(ctx)
+        return ctx
+    
+    async def on_command_completion(self, ctx):
+        self._observe_command(ctx, 'ok')
+    
+    async def on_command_error(self, ctx, error):
+        self._observe_command(ctx, 'error')
+        await super().on_command_error(ctx, error)
+    
+    def _observe_command(self, ctx, status):
+        started_at = getattr(ctx, 'started_at', None)
+        if ctx.command and started_at is not None:
+            COMMAND_SECONDS.observe(
+                time.perf_counter() - started_at, command=ctx.command.qualified_name, status=status
+            )
+    
+    async def on_raw_message_delete(self, payload):
+        # Si se borra un mensaje con un adjunto cacheado, su URL deja de servir
+        await self.upload_cache.forget_message(payload.message_id)
+    
     async def close(self):
+        self.watchdog.stop()
+        self.names.stop()
+        self.catalog.stop()
+        await self.dispatcher.close()
+        if self.metrics_server:
+            await self.metrics_server.close()
         await self.db.close()
         await super().close()
 
@@ -0,0 +1,238 @@
+"""Genera los masters normalizados de las fotos del catálogo.
+    
+    python build_assets.py                  # WebP sin pérdida en data/assets
+    python build_assets.py --format png
+    python build_assets.py --gc             # además borra masters que ya nadie usa
+    python build_assets.py --atlas          # además empaqueta las fotos en data/assets/atlas.bin
+
+Cada foto original se recorta y escala una sola vez a la geometría exacta
+del hueco de la carta (PhotocardProcessor.photo_width x photo_height) y se
+guarda con nombre por contenido: data/assets/<ab>/<sha256>.<ext>. En
+tiempo de render el master se decodifica y se pega sin convertir ni
+remuestrear. Con formatos sin pérdida el resultado es idéntico píxel a
+píxel al de recortar el original, así que no hace falta invalidar los
+renders ya subidos.
+
+photocards.image_path pasa a apuntar al master, el original queda en
+photocards.source_path para volver a procesarlo y su hash en image_hash. data/assets/manifest.json
+recuerda qué master salió de qué original (y de qué hash): si el original
+no cambió no se vuelve a procesar.
+
+Con --atlas las fotos, ya recortadas y redondeadas, se empaquetan como RGBA
+crudo en un archivo que el bot mapea en memoria (utils/atlas.py): ocupa
+~2 MiB por carta, a cambio de no decodificar nada al renderizar.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import aiosqlite
+from PIL import Image
+
+from bot import KpopPhotocardBot
+from utils.atlas import SpriteAtlas
+from utils.image_processor import PhotocardProcessor
+
+# Incrementar si cambia cómo se genera un master (recorte, modo de color...)
+PIPELINE_VERSION = 1
+FORMATS = {
+    'webp': ('webp', {'format': 'WEBP', 'lossless': True, 'method': 4}),
+    'png': ('png', {'format': 'PNG', 'optimize': True}),
+    # Decodifica más rápido, pero con pérdida: los renders cambian levemente
+    'jpeg': ('jpg', {'format': 'JPEG', 'quality': 92}),
+}
+
+
+def file_hash(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def build_master(source, out_dir, fmt):
+    """Corre en un proceso aparte: (source_hash, ruta del master, bytes, error)"""
+    try:
+        source_hash = file_hash(source)
+        processor = PhotocardProcessor()
+        with Image.open(source) as img:
+            has_alpha = 'A' in img.getbands() or 'transparency' in img.info
+            # Mismo camino que el render en tiempo real: RGBA y después recorte
+            master = processor.fit_photo(img.convert('RGBA'))
+        if not has_alpha or fmt == 'jpeg':
+            master = master.convert('RGB')
+        
+        ext, options = FORMATS[fmt]
+        tmp_path = os.path.join(out_dir, f".tmp-{os.getpid()}.{ext}")
+        master.save(tmp_path, **options)
+        digest = file_hash(tmp_path)
+        
+        path = os.path.join(out_dir, digest[:2], f"{digest}.{ext}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        return source_hash, path.replace(os.sep, '/'), os.path.getsize(path), None
+    except Exception as e:
+        return None, None, None, str(e)
+
+
+def atlas_tile(path):
+    """Foto lista para pegar (recortada y redondeada) como bytes RGBA"""
+    return PhotocardProcessor()._load_photo(path).tobytes()
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f).get('sources', {})
+
+
+def save_manifest(path, sources, fmt, geometry):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'pipeline': PIPELINE_VERSION,
+            'format': fmt,
+            'geometry': geometry,
+            'sources': dict(sorted(sources.items()))
+        }, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def garbage_collect(out_dir, sources):
+    """Borra los masters que no figuran en el manifiesto"""
+    referenced = {os.path.normpath(entry['master']) for entry in sources.values()}
+    removed = 0
+    for dirpath, _, filenames in os.walk(out_dir):
+        # Los masters viven en subcarpetas; arriba están el manifiesto y el atlas
+        if os.path.normpath(dirpath) == os.path.normpath(out_dir):
+            continue
+        for filename in filenames:
+            path = os.path.normpath(os.path.join(dirpath, filename))
+            if path not in referenced:
+                os.remove(path)
+                removed += 1
+    return removed
+
+
+async def build(args):
+    processor = PhotocardProcessor()
+    geometry = f"{processor.photo_width}x{processor.photo_height}"
+    manifest_path = os.path.join(args.out, 'manifest.json')
+    os.makedirs(args.out, exist_ok=True)
+    
+    bot = KpopPhotocardBot(db_path=args.db)
+    bot.db = await aiosqlite.connect(args.db)
+    try:
+        await bot.init_db()
+        db = bot.db
+        async with db.execute('''
+            SELECT card_id, card_number, COALESCE(source_path, image_path), image_path, image_hash
+            FROM photocards WHERE image_path IS NOT NULL
+        ''') as cursor:
+            cards = await cursor.fetchall()
+        
+        sources = load_manifest(manifest_path)
+        source_paths = sorted({source for _, _, source, _, _ in cards})
+        
+        def up_to_date(source):
+            entry = sources.get(source)
+            return (
+                entry is not None and not args.force
+                and entry.get('pipeline') == PIPELINE_VERSION and entry.get('format') == args.format
+                and entry.get('geometry') == geometry and os.path.exists(entry['master'])
+                and file_hash(source) == entry['source_hash']
+            )
+        
+        # Un original ya procesado con el mismo hash no se vuelve a procesar
+        pending, errors = [], []
+        for source in source_paths:
+            if not os.path.exists(source):
+                errors.append(f"{source}: no existe")
+            elif not up_to_date(source):
+                pending.append(source)
+        
+        built = 0
+        if pending:
+            with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+                results = pool.map(build_master, pending, [args.out] * len(pending), [args.format] * len(pending))
+                for source, (source_hash, master, size, error) in zip(pending, results):
+                    if error:
+                        errors.append(f"{source}: {error}")
+                        continue
+                    built += 1
+                    sources[source] = {
+                        'source_hash': source_hash, 'master': master, 'bytes': size,
+                        'format': args.format, 'geometry': geometry, 'pipeline': PIPELINE_VERSION
+                    }
+        save_manifest(manifest_path, sources, args.format, geometry)
+        
+        # image_path -> master; el original queda en source_path y su hash en
+        # image_hash, que ingest_cards.py compara para saber si el master sigue valiendo
+        updates = [
+            (source, sources[source]['master'], sources[source]['source_hash'], card_id)
+            for card_id, _, source, image_path, image_hash in cards
+            if source in sources and (
+                image_path != sources[source]['master'] or image_hash != sources[source]['source_hash']
+            )
+        ]
+        async with bot.db_lock:
+            await db.executemany(
+                'UPDATE photocards SET source_path = ?, image_path = ?, image_hash = ? WHERE card_id = ?', updates
+            )
+            await db.commit()
+        
+        atlas_entries = [
+            (card_id, sources[source]['master']) for card_id, _, source, _, _ in cards if source in sources
+        ]
+        if args.atlas:
+            with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+                SpriteAtlas.write(
+                    os.path.join(args.out, 'atlas.bin'),
+                    processor.photo_width, processor.photo_height, processor.corner_radius,
+                    atlas_entries, pool.map(atlas_tile, [master for _, master in atlas_entries], chunksize=4)
+                )
+            # Avisa a los bots en marcha para que recarguen el catálogo y remapeen el atlas
+            await db.execute("UPDATE catalog_meta SET value = value + 1 WHERE key = 'catalog_version'")
+            await db.commit()
+    finally:
+        await bot.db.close()
+    
+    removed = garbage_collect(args.out, sources) if args.gc else 0
+    used = {sources[source]['master'] for source in source_paths if source in sources}
+    source_bytes = sum(os.path.getsize(source) for source in source_paths if os.path.exists(source))
+    master_bytes = sum(os.path.getsize(master) for master in used)
+    
+    print(f"✅ {built} masters generados, {len(used)} en uso ({geometry}, {args.format}) · "
+          f"{len(updates)} cartas actualizadas")
+    print(f"   originales {source_bytes / 1024 / 1024:.1f} MiB → masters {master_bytes / 1024 / 1024:.1f} MiB")
+    if args.atlas:
+        size = os.path.getsize(os.path.join(args.out, 'atlas.bin'))
+        print(f"   🗺️  atlas con {len(atlas_entries)} fotos ({size / 1024 / 1024:.0f} MiB sin comprimir)")
+    if removed:
+        print(f"   🗑️  {removed} masters sin uso borrados")
+    if errors:
+        print(f"❌ {len(errors)} problemas:")
+        for error in errors:
+            print(f"  {error}")
+        return 1
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Genera los masters normalizados de las fotos")
+    parser.add_argument('--db', default=os.getenv('DB_PATH', 'kpop_bot.db'))
+    parser.add_argument('--out', default='data/assets', help="carpeta de masters y manifiesto")
+    parser.add_argument('--format', choices=sorted(FORMATS), default='webp')
+    parser.add_argument('--force', action='store_true', help="regenera aunque el original no haya cambiado")
+    parser.add_argument('--atlas', action='store_true', help="genera además el atlas mapeable (atlas.bin)")
+    parser.add_argument('--gc', action='store_true', help="borra los masters que ya no se usan")
+    parser.add_argument('--jobs', type=int, default=None, help="procesos para generar masters")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    print("🖼️  Generando masters de las photocards...\n")
+    sys.exit(asyncio.run(build(parse_args())))
@@ -0,0 +1,163 @@
+import discord
+from discord.ext import commands
+import asyncio
+import copy
+import io
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from utils.db import transaction
+from utils.card_counts import verify_card_counts
+from utils.profiling import profile
+
+class Admin(commands.Cog):
+    """Comandos de mantenimiento, sólo para el dueño del bot"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self.profile_lock = asyncio.Lock()
+    
+    async def cog_check(self, ctx):
+        return await self.bot.is_owner(ctx.author)
+    
+    @commands.command(name='verifycounts')
+    async def verify_counts(self, ctx, mode: str = None):
+        """Verifica (y con `repair` reconstruye) las tablas de conteos"""
+        repair = mode == 'repair'
+        
+        async with transaction(self.bot) as db:
+            drift = await verify_card_counts(db, repair=repair)
+        
+        ok = not any(drift.values())
+        embed = discord.Embed(
+            title="✅ Conteos consistentes" if ok else "⚠️ Conteos con diferencias",
+            color=discord.Color.green() if ok else discord.Color.orange()
+        )
+        
+        for name, rows in drift.items():
+            embed.add_field(name=name, value=f"{rows} filas con diferencias", inline=False)
+        
+        if not ok:
+            embed.set_footer(text="Reparado" if repair else "Usa k!verifycounts repair para reconstruir")
+        
+        await ctx.send(embed=embed)
+    
+    @commands.command(name='reloadcatalog')
+    async def reload_catalog(self, ctx):
+        """Recarga el catálogo de photocards en memoria"""
+        await self.bot.catalog.reload()
+        await ctx.send(
+            f"✅ Catálogo recargado: {len(self.bot.catalog)} cartas "
+            f"(versión {self.bot.catalog.version})"
+        )
+    
+    @commands.command(name='sync')
+    async def sync_commands(self, ctx, scope: str = None):
+        """Publica los comandos de barra (`guild` para sólo este servidor, al instante)"""
+        if scope == 'guild' and ctx.guild:
+            self.bot.tree.copy_global_to(guild=ctx.guild)
+            synced = await self.bot.tree.sync(guild=ctx.guild)
+        else:
+            synced = await self.bot.tree.sync()
+        
+        await ctx.send(f"✅ {len(synced)} comandos de barra sincronizados")
+    
+    @commands.command(name='profile')
+    async def profile_command(self, ctx, *, command_line: str):
+        """Ejecuta un comando con cProfile y tracemalloc y adjunta el informe"""
+        if self.profile_lock.locked():
+            return await ctx.send("❌ Ya hay un perfilado en curso.")
+        
+        # Mismo mensaje con otro contenido: el comando corre como si lo
+        # hubiera escrito el dueño en este canal
+        message = copy.copy(ctx.message)
+        message.content = f"{ctx.prefix}{command_line}"
+        target = await self.bot.get_context(message)
+        if not target.valid:
+            return await ctx.send(f"❌ Comando desconocido: `{command_line.split()[0]}`")
+        
+        async with self.profile_lock:
+            report = await profile(target.command.invoke(target))
+        
+        name = target.command.qualified_name
+        status = f"❌ {type(report.error).__name__}" if report.error else "✅"
+        await ctx.send(
+            f"{status} `{name}` perfilado en {report.wall_time * 1000:.0f} ms "
+            f"(pico de memoria {report.peak_memory / 1024:.0f} KiB)",
+            file=discord.File(io.BytesIO(report.render().encode()), filename=f"profile_{name.replace(' ', '_')}.txt")
+        )
+    
+    @commands.command(name='dbstats')
+    async def db_stats(self, ctx, arg: str = '10'):
+        """Sentencias SQL con más tiempo acumulado (`reset` para reiniciar)"""
+        if arg == 'reset':
+            self.bot.db.reset_stats()
+            return await ctx.send("✅ Estadísticas de consultas reiniciadas.")
+        
+        limit = int(arg) if arg.isdigit() else 10
+        top = self.bot.db.top(limit)
+        if not top:
+            return await ctx.send("Todavía no hay consultas registradas.")
+        
+        embed = discord.Embed(title="🗄️ Consultas por tiempo total", color=discord.Color.blurple())
+        for sql, stats in top:
+            embed.add_field(
+                name=f"{stats.total * 1000:,.0f} ms · {stats.count:,}× · media {stats.total / stats.count * 1000:.2f} ms · máx {stats.max * 1000:.1f} ms",
+                value=f"```sql\n{sql[:900]}```",
+                inline=False
+            )
+        
+        embed.set_footer(text=f"Umbral de consulta lenta: {self.bot.db.slow_threshold * 1000:.0f} ms")
+        await ctx.send(embed=embed)
+    
+    @commands.command(name='lag')
+    async def loop_lag(self, ctx):
+        """Percentiles del retraso del event loop y el último bloqueo detectado"""
+        watchdog = self.bot.watchdog
+        percentiles = watchdog.percentiles()
+        
+        embed = discord.Embed(title="⏱️ Retraso del event loop", color=discord.Color.blurple())
+        embed.description = " · ".join(
+            f"{name}: {value * 1000:.1f} ms" for name, value in percentiles.items()
+        ) or "Sin datos todavía"
+        
+        if watchdog.last_stall:
+            stalled_for, running, stack = watchdog.last_stall
+            # Las últimas líneas de la pila son las que estaban bloqueando
+            embed.add_field(
+                name=f"Último bloqueo: {stalled_for:.2f}s",
+                value=f"{running}\n```{stack[-900:]}```",
+                inline=False
+            )
+        
+        embed.set_footer(text=f"Umbral: {watchdog.threshold * 1000:.0f} ms")
+        await ctx.send(embed=embed)
+    
+    @commands.command(name='queuestats')
+    async def queue_stats(self, ctx):
+        """Profundidad y latencia de las colas de salida"""
+        stats = self.bot.dispatcher.stats()
+        
+        embed = discord.Embed(title="📤 Colas de salida", color=discord.Color.blurple())
+        embed.add_field(
+            name="En cola",
+            value="\n".join(f"{name}: {count}" for name, count in stats['depth'].items()),
+            inline=True
+        )
+        embed.add_field(
+            name="Latencia (p50 / p95 / máx)",
+            value="\n".join(
+                f"{name}: {lat['p50'] * 1000:.0f} / {lat['p95'] * 1000:.0f} / {lat['max'] * 1000:.0f} ms"
+                for name, lat in stats['latency'].items()
+            ) or "Sin datos",
+            inline=True
+        )
+        embed.set_footer(
+            text=f"Canales activos: {stats['active_channels']} · Fusionadas: {stats['coalesced']} · "
+                 f"429: {stats['rate_limited']} · Fallidas: {stats['failed']}"
+        )
+        await ctx.send(embed=embed)
+
+async def setup(bot):
+    await bot.add_cog(Admin(bot))
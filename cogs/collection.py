@@ -1,100 +1,381 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
-from collections import defaultdict
+from typing import Optional
+import asyncio
 import sys
 import os
 
 # Agregamos la ruta para poder importar utils
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-from utils.image_processor import PhotocardProcessor
+from utils.image_processor import BinderRenderer, PhotocardProcessor
+from utils.db import transaction
+
+RARITY_EMOJIS = {
+    'Common': '⚪', 'Uncommon': '🟢', 'Rare': '🔵', 
+    'Epic': '🟣', 'Legendary': '🟡'
+}
+
+# Orden de rareza como valor ascendente (Legendary primero): columna
+# generada de photocards, indexada junto con el resto de la clave `rarity`
+RARITY_ORDER_SQL = 'p.rarity_rank'
+RARITY_RANKS = {'Legendary': 0, 'Epic': 1, 'Rare': 2, 'Uncommon': 3, 'Common': 4}
+
+# Claves de orden de la colección; todas terminan en card_id para que la
+# clave sea única y la paginación por keyset no repita ni salte filas
+COLLECTION_SORTS = {
+    'rarity': [RARITY_ORDER_SQL, 'p.group_name', 'p.member_name', 'p.card_id'],
+    'group': ['p.group_name', 'p.member_name', RARITY_ORDER_SQL, 'p.card_id'],
+    'member': ['p.member_name', 'p.group_name', RARITY_ORDER_SQL, 'p.card_id'],
+    'qty': ['-c.qty', RARITY_ORDER_SQL, 'p.group_name', 'p.card_id']
+}
+
+COLLECTION_PAGE_SIZE = 12
+# Con `sort: rarity`, a partir de una carta cada tantas del catálogo conviene
+# recorrer idx_photocards_rarity_order y probar cada carta contra la colección
+# (~PAGE * N filas por página) en vez de ordenar la colección entera
+CATALOG_WALK_RATIO = 10
+
+def binder_order(card):
+    return (card.group.lower(), card.member.lower(), card.card_number)
+
+class CollectionFlags(commands.FlagConverter, delimiter=':', prefix=''):
+    group: Optional[str] = None
+    rarity: Optional[str] = None
+    era: Optional[str] = None
+    dupes: bool = False
+    sort: str = 'rarity'
+
+class CollectionView(discord.ui.View):
+    """Paginador de la colección: cada página se consulta al pulsar"""
+    
+    def __init__(self, cog, ctx, target, flags, first_page):
+        super().__init__(timeout=120)
+        self.cog = cog
+        self.ctx = ctx
+        self.target = target
+        self.flags = flags
+        # cursors[i] es la clave de la última fila antes de la página i
+        self.cursors = [None]
+        self.rows = first_page
+        self.message = None
+        self._update_buttons()
+    
+    @property
+    def page(self):
+        return len(self.cursors)
+    
+    def _update_buttons(self):
+        self.previous_page.disabled = self.page == 1
+        self.next_page.disabled = len(self.rows) <= COLLECTION_PAGE_SIZE
+    
+    async def interaction_check(self, interaction):
+        return interaction.user.id == self.ctx.author.id
+    
+    async def _show(self, interaction):
+        self._update_buttons()
+        embed = await self.cog._collection_embed(self.target, self.flags, self.rows, self.page)
+        await interaction.response.edit_message(embed=embed, view=self)
+    
+    @discord.ui.button(label='◀', style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction, button):
+        self.cursors.pop()
+        self.rows = await self.cog._fetch_collection_page(self.target.id, self.flags, self.cursors[-1])
+        await self._show(interaction)
+    
+    @discord.ui.button(label='▶', style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction, button):
+        # La clave de orden va al final de cada fila
+        self.cursors.append(self.rows[COLLECTION_PAGE_SIZE - 1][-4:])
+        self.rows = await self.cog._fetch_collection_page(self.target.id, self.flags, self.cursors[-1])
+        await self._show(interaction)
+    
+    async def on_timeout(self):
+        self.previous_page.disabled = True
+        self.next_page.disabled = True
+        if self.message:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+class BinderView(discord.ui.View):
+    """Paginador del binder: las cartas y copias se leen una vez al abrirlo"""
+    
+    def __init__(self, cog, ctx, target, group, cards, owned):
+        super().__init__(timeout=120)
+        self.cog = cog
+        self.ctx = ctx
+        self.target = target
+        self.group = group
+        self.cards = cards
+        self.owned = owned
+        self.page = 0
+        self.pages = (len(cards) + BinderRenderer.PAGE_SIZE - 1) // BinderRenderer.PAGE_SIZE
+        self.message = None
+        self._update_buttons()
+    
+    def _update_buttons(self):
+        self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.page >= self.pages - 1
+    
+    async def interaction_check(self, interaction):
+        return interaction.user.id == self.ctx.author.id
+    
+    async def render(self):
+        """Embed y archivo de la página actual"""
+        start = self.page * BinderRenderer.PAGE_SIZE
+        cards = self.cards[start:start + BinderRenderer.PAGE_SIZE]
+        entries = [(card.image_path, card.render_data(), self.owned.get(card.card_id, 0)) for card in cards]
+        # Componer la página (y las miniaturas que falten) no debe frenar el event loop
+        img_bytes = await asyncio.to_thread(self.cog.binder.render_page, entries)
+        
+        embed = discord.Embed(
+            title=f"📒 Binder de {self.target.display_name}" + (f" · {self.cards[0].group}" if self.group else ""),
+            color=discord.Color.blue()
+        )
+        embed.set_image(url="attachment://binder.jpg")
+        
+        footer = f"Página {self.page + 1}/{self.pages}"
+        if self.group:
+            have = sum(1 for card in self.cards if self.owned.get(card.card_id))
+            footer += f" · {have}/{len(self.cards)} cartas del set"
+        embed.set_footer(text=footer)
+        return embed, discord.File(img_bytes, filename="binder.jpg")
+    
+    async def _show(self, interaction):
+        self._update_buttons()
+        # Una página con miniaturas nuevas puede tardar más que el plazo de la interacción
+        await interaction.response.defer()
+        embed, file = await self.render()
+        await interaction.edit_original_response(embed=embed, attachments=[file], view=self)
+    
+    @discord.ui.button(label='◀', style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction, button):
+        self.page -= 1
+        await self._show(interaction)
+    
+    @discord.ui.button(label='▶', style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction, button):
+        self.page += 1
+        await self._show(interaction)
+    
+    async def on_timeout(self):
+        self.previous_page.disabled = True
+        self.next_page.disabled = True
+        if self.message:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+class CardPickerView(discord.ui.View):
+    """Selector para desambiguar una búsqueda con varios resultados"""
+    
+    def __init__(self, author_id, results):
+        super().__init__(timeout=30)
+        self.author_id = author_id
+        self.results = {str(card.card_id): card for card in results}
+        self.selected = None
+        
+        options = [
+            discord.SelectOption(
+                label=f"{card.member} - {card.group}"[:100],
+                description=f"{card.era or 'N/A'} · {card.rarity} · {card.card_number}"[:100],
+                value=str(card.card_id),
+                emoji=RARITY_EMOJIS.get(card.rarity, '⚪')
+            )
+            for card in results[:25]
+        ]
+        self.picker.options = options
+    
+    async def interaction_check(self, interaction):
+        return interaction.user.id == self.author_id
+    
+    @discord.ui.select(placeholder='Elige una photocard...')
+    async def picker(self, interaction, select):
+        self.selected = self.results[select.values[0]]
+        await interaction.response.defer()
+        self.stop()
 
 class Collection(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         # Inicializamos el procesador de imágenes
-        self.image_processor = PhotocardProcessor()
+        self.image_processor = PhotocardProcessor(atlas=bot.atlas)
+        # Miniaturas y páginas del binder cacheadas en memoria
+        self.binder = BinderRenderer(self.image_processor)
     
-    @commands.command(name='collection', aliases=['col', 'c'])
-    async def view_collection(self, ctx, user: discord.Member = None):
-        """Muestra la colección de photocards de un usuario"""
+    @commands.hybrid_command(name='collection', aliases=['col', 'c'])
+    async def view_collection(self, ctx, user: Optional[discord.Member] = None, *, flags: CollectionFlags):
+        """Muestra la colección de photocards de un usuario
+        
+        Filtros opcionales: group: <grupo> rarity: <rareza> era: <era>
+        dupes: yes sort: rarity|group|member|qty
+        """
         target = user or ctx.author
+        self.bot.names.remember(target.id, target.display_name)
         
-        async with self.bot.db.execute('''
-            SELECT p.group_name, p.member_name, p.era, p.rarity, COUNT(*) as quantity
-            FROM user_cards uc
-            JOIN photocards p ON uc.card_id = p.card_id
-            WHERE uc.user_id = ?
-            GROUP BY p.card_id
-            ORDER BY p.rarity DESC, p.group_name, p.member_name
-        ''', (target.id,)) as cursor:
-            cards = await cursor.fetchall()
-        
-        if not cards:
+        if flags.sort not in COLLECTION_SORTS:
+            return await ctx.send(f"❌ Orden inválido. Usa: {', '.join(COLLECTION_SORTS)}")
+        
+        rows = await self._fetch_collection_page(target.id, flags, None)
+        
+        if not rows:
+            if any((flags.group, flags.rarity, flags.era, flags.dupes)):
+                return await ctx.send("❌ No hay cartas que coincidan con esos filtros.")
             return await ctx.send(f"{'Tu' if target == ctx.author else f'{target.display_name}'} no tiene photocards todavía.")
         
-        groups = defaultdict(list)
-        total_cards = 0
-        
-        for group, member, era, rarity, qty in cards:
-            groups[group].append({
-                'member': member,
-                'era': era or 'N/A',
-                'rarity': rarity,
-                'quantity': qty
-            })
-            total_cards += qty
-        
-        embeds = []
-        rarity_emojis = {
-            'Common': '⚪', 'Uncommon': '🟢', 'Rare': '🔵', 
-            'Epic': '🟣', 'Legendary': '🟡'
-        }
+        view = CollectionView(self, ctx, target, flags, rows)
+        embed = await self._collection_embed(target, flags, rows, 1)
+        view.message = await ctx.send(embed=embed, view=view)
+    
+    async def _fetch_collection_page(self, user_id, flags, after):
+        """Trae una página (+1 fila para saber si hay siguiente) por keyset
         
-        for group_name, members in groups.items():
-            embed = discord.Embed(
-                title=f"📸 Colección de {target.display_name}",
-                description=f"**{group_name}**",
-                color=discord.Color.blue()
-            )
-            
-            for card in members[:10]:
-                rarity_emoji = rarity_emojis.get(card['rarity'], '⚪')
-                embed.add_field(
-                    name=f"{rarity_emoji} {card['member']}",
-                    value=f"Era: {card['era']}\nCantidad: {card['quantity']}",
-                    inline=True
+        Cada fila es (card_id, grupo, miembro, era, rareza, cantidad, *clave).
+        Las claves salen de photocards, así que en general SQLite ordena las
+        cartas del usuario en cada página (O(n log n)). Con `sort: rarity` y
+        una colección grande se recorre el catálogo por su índice en ese
+        orden y cada página cuesta lo mismo sin importar el tamaño.
+        """
+        sort_key = COLLECTION_SORTS[flags.sort]
+        conditions = ['c.user_id = ?']
+        params = [user_id]
+        source = 'user_card_counts c JOIN photocards p ON c.card_id = p.card_id'
+        
+        if flags.sort == 'rarity' and not (flags.group or flags.era):
+            async with self.bot.db.execute('SELECT card_count FROM users WHERE user_id = ?', (user_id,)) as cursor:
+                row = await cursor.fetchone()
+            # card_count cuenta copias: es una cota de las cartas distintas
+            if row and row[0] * CATALOG_WALK_RATIO >= len(self.bot.catalog):
+                source = (
+                    'photocards p INDEXED BY idx_photocards_rarity_order '
+                    'CROSS JOIN user_card_counts c ON c.card_id = p.card_id'
                 )
-            
-            embed.set_footer(text=f"Total de cartas: {total_cards}")
-            embeds.append(embed)
         
-        if embeds:
-            await ctx.send(embed=embeds[0])
+        if flags.group:
+            conditions.append('LOWER(p.group_name) = LOWER(?)')
+            params.append(flags.group)
+        if flags.rarity:
+            rarity = flags.rarity.capitalize()
+            conditions.append('p.rarity = ?')
+            params.append(rarity)
+            # Acota el rango del índice de rareza
+            if rarity in RARITY_RANKS:
+                conditions.append('p.rarity_rank = ?')
+                params.append(RARITY_RANKS[rarity])
+        if flags.era:
+            conditions.append('LOWER(p.era) = LOWER(?)')
+            params.append(flags.era)
+        if flags.dupes:
+            conditions.append('c.qty > 1')
+        if after is not None:
+            conditions.append(f"({', '.join(sort_key)}) > ({', '.join('?' * len(after))})")
+            params.extend(after)
+        
+        async with self.bot.db.execute(f'''
+            SELECT p.card_id, p.group_name, p.member_name, p.era, p.rarity, c.qty, {', '.join(sort_key)}
+            FROM {source}
+            WHERE {' AND '.join(conditions)}
+            ORDER BY {', '.join(sort_key)}
+            LIMIT ?
+        ''', (*params, COLLECTION_PAGE_SIZE + 1)) as cursor:
+            return await cursor.fetchall()
+    
+    async def _collection_embed(self, target, flags, rows, page):
+        filters = [
+            f"{name}: **{value}**"
+            for name, value in (('Grupo', flags.group), ('Rareza', flags.rarity), ('Era', flags.era))
+            if value
+        ]
+        if flags.dupes:
+            filters.append("sólo duplicados")
+        
+        embed = discord.Embed(
+            title=f"📸 Colección de {target.display_name}",
+            description=" · ".join(filters) or None,
+            color=discord.Color.blue()
+        )
+        
+        for card_id, group, member, era, rarity, qty, *_ in rows[:COLLECTION_PAGE_SIZE]:
+            rarity_emoji = RARITY_EMOJIS.get(rarity, '⚪')
+            embed.add_field(
+                name=f"{rarity_emoji} {member}",
+                value=f"{group} · {era or 'N/A'}\nCantidad: {qty}\nID: `{card_id}`",
+                inline=True
+            )
+        
+        # El total sale del contador materializado, sin recorrer la colección
+        async with self.bot.db.execute(
+            'SELECT card_count FROM users WHERE user_id = ?',
+            (target.id,)
+        ) as cursor:
+            total = await cursor.fetchone()
+        
+        embed.set_footer(text=f"Página {page} · Total de cartas: {total[0] if total else 0}")
+        return embed
+    
+    @commands.hybrid_command(name='binder', aliases=['album'])
+    async def view_binder(self, ctx, user: Optional[discord.Member] = None, *, group: Optional[str] = None):
+        """Muestra la colección como un álbum de miniaturas
+        
+        Con un grupo muestra el set completo y las cartas que faltan en gris.
+        """
+        target = user or ctx.author
+        self.bot.names.remember(target.id, target.display_name)
+        
+        async with self.bot.db.execute(
+            'SELECT card_id, qty FROM user_card_counts WHERE user_id = ?',
+            (target.id,)
+        ) as cursor:
+            owned = dict(await cursor.fetchall())
+        
+        if group:
+            cards = self.bot.catalog.by_group(group)
+            if not cards:
+                return await ctx.send(f"❌ No hay photocards del grupo '{group}'.")
+        else:
+            cards = [card for card in map(self.bot.catalog.get, owned) if card]
+            if not cards:
+                return await ctx.send(f"{'Tu' if target == ctx.author else f'{target.display_name}'} no tiene photocards todavía.")
+        
+        view = BinderView(self, ctx, target, group, sorted(cards, key=binder_order), owned)
+        async with ctx.typing():
+            try:
+                embed, file = await view.render()
+            except Exception as e:
+                print(f"Error generando el binder: {e}")
+                return await ctx.send("❌ Error generando el binder.")
+        view.message = await ctx.send(embed=embed, file=file, view=view)
     
-    @commands.command(name='inventory', aliases=['inv'])
+    @commands.hybrid_command(name='inventory', aliases=['inv'])
     async def inventory(self, ctx):
         """Muestra un resumen de tu inventario"""
-        async with self.bot.db.execute('''
-            SELECT COUNT(DISTINCT uc.card_id), COUNT(*), u.coins, u.drops_count
-            FROM users u
-            LEFT JOIN user_cards uc ON u.user_id = uc.user_id
-            WHERE u.user_id = ?
-        ''', (ctx.author.id,)) as cursor:
+        async with self.bot.db.execute(
+            'SELECT coins, drops_count FROM users WHERE user_id = ?',
+            (ctx.author.id,)
+        ) as cursor:
             data = await cursor.fetchone()
         
         if not data:
             return await ctx.send("No tienes un inventario todavía.")
         
-        unique, total, coins, drops = data
+        coins, drops = data
         
+        # Una sola agregación sobre la proyección: cartas únicas y copias por rareza
         async with self.bot.db.execute('''
-            SELECT p.rarity, COUNT(*) as count
-            FROM user_cards uc
-            JOIN photocards p ON uc.card_id = p.card_id
-            WHERE uc.user_id = ?
+            SELECT p.rarity, COUNT(*), SUM(c.qty)
+            FROM user_card_counts c
+            JOIN photocards p ON c.card_id = p.card_id
+            WHERE c.user_id = ?
             GROUP BY p.rarity
         ''', (ctx.author.id,)) as cursor:
-            rarity_counts = await cursor.fetchall()
+            rarity_rows = await cursor.fetchall()
+        
+        unique = sum(row[1] for row in rarity_rows)
+        total = sum(row[2] for row in rarity_rows)
+        rarity_counts = [(rarity, count) for rarity, _, count in rarity_rows]
         
         embed = discord.Embed(
             title=f"🎒 Inventario de {ctx.author.display_name}",
@@ -114,52 +395,39 @@ class Collection(commands.Cog):
         
         await ctx.send(embed=embed)
     
-    @commands.command(name='view', aliases=['v', 'show'])
+    @commands.hybrid_command(name='view', aliases=['v', 'show'])
     async def view_card(self, ctx, *, search: str):
         """Busca y muestra la imagen de una photocard específica"""
+        # Acuse inmediato: en slash difiere la respuesta, con prefijo muestra "escribiendo..."
+        await ctx.typing()
         
-        # 1. Buscamos la carta con todos los datos necesarios para dibujarla
-        # Agregamos 'card_number' y 'series' a la consulta
-        async with self.bot.db.execute('''
-            SELECT card_id, card_number, group_name, member_name, era, rarity, image_path, series
-            FROM photocards
-            WHERE LOWER(member_name) LIKE ? OR LOWER(group_name) LIKE ?
-            LIMIT 1
-        ''', (f'%{search.lower()}%', f'%{search.lower()}%')) as cursor:
-            result = await cursor.fetchone()
-        
-        if not result:
+        # 1. Buscamos la carta en el índice full-text (con tolerancia a errores)
+        results = await self.bot.card_search.search(search)
+        
+        if not results:
             return await ctx.send(f"❌ No se encontraron photocards con '{search}'")
         
-        # Desempaquetamos los datos
-        card_id, card_number, group, member, era, rarity, img_path, series = result
+        # Si hay varias candidatas y ninguna es una coincidencia exacta única,
+        # dejamos que el usuario elija
+        exact = [card for card in results if self.bot.card_search.is_exact(card, search)]
+        if len(results) == 1:
+            card = results[0]
+        elif len(exact) == 1:
+            card = exact[0]
+        else:
+            card = await self._pick_card(ctx, results)
+            if card is None:
+                return
         
         # 2. Verificamos si el usuario la tiene (para mostrar info de posesión)
         async with self.bot.db.execute('''
-            SELECT COUNT(*) FROM user_cards
+            SELECT qty FROM user_card_counts
             WHERE user_id = ? AND card_id = ?
-        ''', (ctx.author.id, card_id)) as cursor:
-            owned_count = (await cursor.fetchone())[0]
+        ''', (ctx.author.id, card.card_id)) as cursor:
+            owned = await cursor.fetchone()
+        owned_count = owned[0] if owned else 0
         
-        # 3. Generamos la imagen
-        try:
-            img_bytes = self.image_processor.create_photocard(
-                img_path,
-                {
-                    'rarity': rarity,
-                    'card_number': card_number,
-                    'member': member,
-                    'group': group,
-                    'era': era,
-                    'series': series if series else 'S1',
-                    'serial': None # No mostramos serial en una vista genérica
-                }
-            )
-        except Exception as e:
-            print(f"Error generando imagen en view: {e}")
-            return await ctx.send("❌ Error generando la imagen de la carta.")
-
-        # 4. Creamos el Embed y enviamos la imagen
+        # 3. Creamos el Embed
         rarity_colors = {
             'Common': discord.Color.light_gray(), 'Uncommon': discord.Color.green(),
             'Rare': discord.Color.blue(), 'Epic': discord.Color.purple(),
@@ -167,9 +435,9 @@ class Collection(commands.Cog):
         }
         
         embed = discord.Embed(
-            title=f"{member} - {group}",
-            description=f"**Era:** {era or 'N/A'}\n**Rareza:** {rarity}",
-            color=rarity_colors.get(rarity, discord.Color.default())
+            title=f"{card.member} - {card.group}",
+            description=f"**Era:** {card.era or 'N/A'}\n**Rareza:** {card.rarity}",
+            color=rarity_colors.get(card.rarity, discord.Color.default())
         )
         
         if owned_count > 0:
@@ -177,43 +445,86 @@ class Collection(commands.Cog):
         else:
             embed.add_field(name="📦 En inventario", value="No tienes esta carta")
             
-        embed.set_footer(text=f"ID: {card_number} | Serie: {series or 'S1'}")
+        embed.set_footer(text=f"ID: {card.card_number} | Serie: {card.series}")
+        
+        # 4. Si la imagen ya está en el CDN de Discord, reutilizamos su URL
+        upload_cache = self.bot.upload_cache
+        cache_key = upload_cache.card_key(card, PhotocardProcessor.RENDER_VERSION)
+        cached_url = upload_cache.get(cache_key)
+        if cached_url:
+            embed.set_image(url=cached_url)
+            try:
+                return await ctx.send(embed=embed)
+            except discord.HTTPException:
+                await upload_cache.forget(cache_key)
+        
+        # 5. Generamos la imagen y la subimos
+        async with ctx.typing():
+            try:
+                # No mostramos serial en una vista genérica; el render va en
+                # un hilo para no frenar el loop (heartbeat y demás comandos)
+                img_bytes = await asyncio.to_thread(
+                    self.image_processor.create_photocard, card.image_path, card.render_data()
+                )
+            except Exception as e:
+                print(f"Error generando imagen en view: {e}")
+                return await ctx.send("❌ Error generando la imagen de la carta.")
         
-        # Adjuntamos el archivo
         filename = "card_view.png"
         file = discord.File(img_bytes, filename=filename)
         embed.set_image(url=f"attachment://{filename}")
         
-        await ctx.send(embed=embed, file=file)
+        message = await ctx.send(embed=embed, file=file)
+        await upload_cache.store(cache_key, message)
+    
+    @view_card.autocomplete('search')
+    async def view_card_autocomplete(self, interaction, current):
+        # El valor es el número de carta: coincide exacto y evita el selector
+        choices = []
+        for card_id, label in self.bot.card_search.autocomplete(current):
+            card = self.bot.catalog.get(card_id)
+            if card:
+                choices.append(app_commands.Choice(name=label[:100], value=card.card_number))
+        return choices
     
-    @commands.command(name='gift')
+    async def _pick_card(self, ctx, results):
+        view = CardPickerView(ctx.author.id, results)
+        message = await ctx.send(f"🔎 Hay {len(results)} photocards que coinciden, elige una:", view=view)
+        await view.wait()
+        
+        try:
+            await message.delete()
+        except discord.HTTPException:
+            pass
+        
+        return view.selected
+    
+    @commands.hybrid_command(name='gift')
     async def gift_card(self, ctx, user: discord.Member, card_id: int):
         """Regala una photocard a otro usuario"""
         if user.bot or user == ctx.author:
             return await ctx.send("❌ Destinatario inválido.")
         
-        async with self.bot.db.execute('''
-            SELECT uc.id, p.group_name, p.member_name, p.rarity
-            FROM user_cards uc
-            JOIN photocards p ON uc.card_id = p.card_id
-            WHERE uc.user_id = ? AND uc.card_id = ?
-            LIMIT 1
-        ''', (ctx.author.id, card_id)) as cursor:
-            card_data = await cursor.fetchone()
-        
-        if not card_data:
+        card = self.bot.catalog.get(card_id)
+        if not card:
             return await ctx.send("❌ No tienes esta carta (o el ID es incorrecto).")
         
-        user_card_id, group, member, rarity = card_data
+        # La copia cambia de dueño conservando serial y fecha; los triggers
+        # mueven los conteos y crean la fila de users del destinatario
+        async with transaction(self.bot) as db:
+            async with db.execute('''
+                UPDATE user_cards SET user_id = ?
+                WHERE id = (SELECT id FROM user_cards WHERE user_id = ? AND card_id = ? LIMIT 1)
+                RETURNING id
+            ''', (user.id, ctx.author.id, card_id)) as cursor:
+                moved = await cursor.fetchone()
         
-        await self.bot.db.execute('DELETE FROM user_cards WHERE id = ?', (user_card_id,))
-        await self.bot.db.execute('INSERT OR IGNORE INTO users (user_id) VALUES (?)', (user.id,))
-        await self.bot.db.execute('INSERT INTO user_cards (user_id, card_id) VALUES (?, ?)', (user.id, card_id))
-        await self.bot.db.commit()
+        if not moved:
+            return await ctx.send("❌ No tienes esta carta (o el ID es incorrecto).")
         
         embed = discord.Embed(
             title="🎁 Regalo enviado!",
-            description=f"{ctx.author.mention} le regaló **{member}** ({group}) a {user.mention}",
+            description=f"{ctx.author.mention} le regaló **{card.member}** ({card.group}) a {user.mention}",
             color=discord.Color.green()
         )
         await ctx.send(embed=embed)
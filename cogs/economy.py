@@ -1,13 +1,92 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
 from datetime import datetime, timedelta
 import random
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from utils.db import transaction
+from utils.metrics import CACHE_REQUESTS
+
+# Precio de venta según rareza
+SELL_PRICES = {
+    'Common': 10,
+    'Uncommon': 25,
+    'Rare': 75,
+    'Epic': 200,
+    'Legendary': 500
+}
+
+# Misma tabla de precios como expresión SQL sobre photocards (alias p)
+SELL_PRICE_SQL = 'CASE p.rarity {} ELSE 10 END'.format(
+    ' '.join(f"WHEN '{rarity}' THEN {price}" for rarity, price in SELL_PRICES.items())
+)
+
+RARITY_EMOJIS = {
+    'Common': '⚪',
+    'Uncommon': '🟢',
+    'Rare': '🔵',
+    'Epic': '🟣',
+    'Legendary': '🟡'
+}
+
+# Categoría del ranking -> (columna de users, título)
+LEADERBOARDS = {
+    'coins': ('coins', "💰 Top 10 - Monedas"),
+    'cards': ('card_count', "📸 Top 10 - Colección"),
+    'drops': ('drops_count', "🎯 Top 10 - Drops")
+}
+
+def _choices(values, current):
+    """Opciones de autocompletado que contienen el texto escrito"""
+    current = current.lower()
+    return [
+        app_commands.Choice(name=value, value=value)
+        for value in values if current in value.lower()
+    ][:25]
+
+class CardIds(commands.Converter):
+    """Lista de IDs de carta separados por espacios o comas"""
+    
+    async def convert(self, ctx, argument):
+        try:
+            return [int(part) for part in argument.replace(',', ' ').split()]
+        except ValueError:
+            raise commands.BadArgument("Los IDs de carta deben ser números")
+
+class ConfirmView(discord.ui.View):
+    """Botones de confirmar/cancelar que sólo puede pulsar el autor"""
+    
+    def __init__(self, author_id, timeout=30):
+        super().__init__(timeout=timeout)
+        self.author_id = author_id
+        self.confirmed = False
+    
+    async def interaction_check(self, interaction):
+        return interaction.user.id == self.author_id
+    
+    @discord.ui.button(label='Confirmar', style=discord.ButtonStyle.danger)
+    async def confirm(self, interaction, button):
+        self.confirmed = True
+        await interaction.response.defer()
+        self.stop()
+    
+    @discord.ui.button(label='Cancelar', style=discord.ButtonStyle.secondary)
+    async def cancel(self, interaction, button):
+        await interaction.response.defer()
+        self.stop()
 
 class Economy(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.leaderboard_cache = {}
+        
+        self.LEADERBOARD_TTL = 30
     
-    @commands.command(name='daily')
+    @commands.hybrid_command(name='daily')
     async def daily_reward(self, ctx):
         """Reclama tu recompensa diaria de monedas"""
         async with self.bot.db.execute(
@@ -35,16 +114,16 @@ class Economy(commands.Cog):
         bonus = random.randint(0, 50) if random.random() < 0.3 else 0  # 30% de bonus
         total = reward + bonus
         
-        await self.bot.db.execute(
-            '''INSERT INTO users (user_id, coins, last_daily) 
-               VALUES (?, ?, ?)
-               ON CONFLICT(user_id) DO UPDATE SET 
-               coins = coins + ?,
-               last_daily = ?''',
-            (ctx.author.id, total, datetime.utcnow().isoformat(),
-             total, datetime.utcnow().isoformat())
-        )
-        await self.bot.db.commit()
+        async with transaction(self.bot) as db:
+            await db.execute(
+                '''INSERT INTO users (user_id, coins, last_daily)
+                   VALUES (?, ?, ?)
+                   ON CONFLICT(user_id) DO UPDATE SET
+                   coins = coins + ?,
+                   last_daily = ?''',
+                (ctx.author.id, total, datetime.utcnow().isoformat(),
+                 total, datetime.utcnow().isoformat())
+            )
         
         embed = discord.Embed(
             title="🎁 Recompensa Diaria",
@@ -61,7 +140,7 @@ class Economy(commands.Cog):
         
         await ctx.send(embed=embed)
     
-    @commands.command(name='balance', aliases=['bal'])
+    @commands.hybrid_command(name='balance', aliases=['bal'])
     async def check_balance(self, ctx, user: discord.Member = None):
         """Verifica el balance de monedas"""
         target = user or ctx.author
@@ -83,7 +162,7 @@ class Economy(commands.Cog):
         
         await ctx.send(embed=embed)
     
-    @commands.command(name='buy')
+    @commands.hybrid_command(name='buy')
     async def buy_pack(self, ctx, pack_type: str = 'basic'):
         """Compra un pack de photocards
         
@@ -117,27 +196,7 @@ class Economy(commands.Cog):
         
         pack = packs[pack_type]
         
-        # Verificar balance
-        async with self.bot.db.execute(
-            'SELECT coins FROM users WHERE user_id = ?',
-            (ctx.author.id,)
-        ) as cursor:
-            result = await cursor.fetchone()
-        
-        if not result or result[0] < pack['cost']:
-            return await ctx.send(
-                f"❌ No tienes suficientes monedas. Necesitas {pack['cost']}, "
-                f"tienes {result[0] if result else 0}"
-            )
-        
-        # Deducir monedas
-        await self.bot.db.execute(
-            'UPDATE users SET coins = coins - ? WHERE user_id = ?',
-            (pack['cost'], ctx.author.id)
-        )
-        
         # Generar cartas
-        obtained_cards = []
         rarities = ['Common', 'Uncommon', 'Rare', 'Epic', 'Legendary']
         rarity_chances = [0.50, 0.30, 0.15, 0.04, 0.01]
         
@@ -149,31 +208,39 @@ class Economy(commands.Cog):
             rarity_chances[3] += boost * 0.3  # Aumentar Epic
             rarity_chances[4] += boost * 0.2  # Aumentar Legendary
         
-        for _ in range(pack['cards']):
-            rarity = random.choices(rarities, weights=rarity_chances)[0]
-            
-            async with self.bot.db.execute(
-                'SELECT card_id, group_name, member_name FROM photocards WHERE rarity = ? ORDER BY RANDOM() LIMIT 1',
-                (rarity,)
+        # Sorteamos todas las cartas en memoria antes de tocar la base de datos
+        obtained_cards = []
+        for rarity in random.choices(rarities, weights=rarity_chances, k=pack['cards']):
+            card = self.bot.catalog.random_card(rarity)
+            if card:
+                obtained_cards.append(card)
+        
+        async with transaction(self.bot) as db:
+            # Cobro condicional: si otro comando gastó las monedas entre
+            # medias, el UPDATE no afecta ninguna fila y no se entrega nada
+            async with db.execute(
+                'UPDATE users SET coins = coins - ? WHERE user_id = ? AND coins >= ? RETURNING coins',
+                (pack['cost'], ctx.author.id, pack['cost'])
             ) as cursor:
-                card = await cursor.fetchone()
+                charged = await cursor.fetchone()
             
-            if card:
-                card_id, group, member = card
-                
-                # Agregar a la colección del usuario
-                await self.bot.db.execute(
+            if charged:
+                await db.executemany(
                     'INSERT INTO user_cards (user_id, card_id) VALUES (?, ?)',
-                    (ctx.author.id, card_id)
+                    [(ctx.author.id, card.card_id) for card in obtained_cards]
                 )
-                
-                obtained_cards.append({
-                    'group': group,
-                    'member': member,
-                    'rarity': rarity
-                })
         
-        await self.bot.db.commit()
+        if not charged:
+            async with self.bot.db.execute(
+                'SELECT coins FROM users WHERE user_id = ?',
+                (ctx.author.id,)
+            ) as cursor:
+                result = await cursor.fetchone()
+            
+            return await ctx.send(
+                f"❌ No tienes suficientes monedas. Necesitas {pack['cost']}, "
+                f"tienes {result[0] if result else 0}"
+            )
         
         # Mostrar resultados
         embed = discord.Embed(
@@ -191,91 +258,252 @@ class Economy(commands.Cog):
         }
         
         for i, card in enumerate(obtained_cards, 1):
-            emoji = rarity_emojis.get(card['rarity'], '⚪')
+            emoji = rarity_emojis.get(card.rarity, '⚪')
             embed.add_field(
-                name=f"{emoji} {card['member']}",
-                value=f"{card['group']}\n{card['rarity']}",
+                name=f"{emoji} {card.member}",
+                value=f"{card.group}\n{card.rarity}",
                 inline=True
             )
         
+        embed.set_footer(text=f"Balance restante: {charged[0]:,} monedas")
+        
         await ctx.send(embed=embed)
     
-    @commands.command(name='sell')
-    async def sell_card(self, ctx, card_id: int):
-        """Vende una photocard por monedas"""
-        # Verificar que el usuario tiene la carta
-        async with self.bot.db.execute('''
-            SELECT uc.id, p.member_name, p.group_name, p.rarity
-            FROM user_cards uc
-            JOIN photocards p ON uc.card_id = p.card_id
-            WHERE uc.user_id = ? AND uc.card_id = ?
-            LIMIT 1
-        ''', (ctx.author.id, card_id)) as cursor:
-            card_data = await cursor.fetchone()
+    @commands.hybrid_group(name='sell', fallback='cards', invoke_without_command=True)
+    async def sell_card(self, ctx, *, card_ids: CardIds = None):
+        """Vende photocards por monedas
+        
+        - k!sell <card_id> - vende una copia
+        - k!sell <card_id> <card_id> ... - vende una copia de cada una
+        - k!sell dupes [conservar] - vende los duplicados
+        - k!sell rarity <rareza> - vende todas las cartas de una rareza
+        - k!sell group <grupo> - vende todas las cartas de un grupo
+        """
+        if not card_ids:
+            return await ctx.send(
+                "❌ Usa `k!sell <card_id>`, `k!sell dupes`, `k!sell rarity <rareza>` o `k!sell group <grupo>`"
+            )
         
-        if not card_data:
+        if len(card_ids) > 1:
+            unique_ids = sorted(set(card_ids))
+            placeholders = ', '.join('?' * len(unique_ids))
+            selection = f'''
+                SELECT MIN(id) FROM user_cards
+                WHERE user_id = ? AND card_id IN ({placeholders})
+                GROUP BY card_id
+            '''
+            return await self._bulk_sell(
+                ctx, selection, (ctx.author.id, *unique_ids),
+                f"una copia de {len(unique_ids)} cartas"
+            )
+        
+        card_id = card_ids[0]
+        card = self.bot.catalog.get(card_id)
+        if not card:
             return await ctx.send("❌ No tienes esta carta.")
         
-        user_card_id, member, group, rarity = card_data
+        price = SELL_PRICES.get(card.rarity, 10)
+        
+        async with transaction(self.bot) as db:
+            # El propio DELETE verifica la posesión: si no borra ninguna fila,
+            # el usuario no tenía la carta (o ya la vendió en otro comando)
+            async with db.execute('''
+                DELETE FROM user_cards
+                WHERE id = (
+                    SELECT id FROM user_cards
+                    WHERE user_id = ? AND card_id = ?
+                    LIMIT 1
+                )
+                RETURNING id
+            ''', (ctx.author.id, card_id)) as cursor:
+                sold = await cursor.fetchone()
+            
+            if sold:
+                async with db.execute(
+                    '''INSERT INTO users (user_id, coins) VALUES (?, ?)
+                       ON CONFLICT(user_id) DO UPDATE SET coins = coins + excluded.coins
+                       RETURNING coins''',
+                    (ctx.author.id, price)
+                ) as cursor:
+                    balance = (await cursor.fetchone())[0]
+        
+        if not sold:
+            return await ctx.send("❌ No tienes esta carta.")
         
-        # Calcular precio según rareza
-        prices = {
-            'Common': 10,
-            'Uncommon': 25,
-            'Rare': 75,
-            'Epic': 200,
-            'Legendary': 500
-        }
+        embed = discord.Embed(
+            title="💵 Carta vendida!",
+            description=f"Has vendido **{card.member}** ({card.group}) por **{price}** monedas",
+            color=discord.Color.green()
+        )
+        embed.set_footer(text=f"Balance: {balance:,} monedas")
+        
+        await ctx.send(embed=embed)
+    
+    @sell_card.command(name='dupes', aliases=['duplicates'])
+    async def sell_duplicates(self, ctx, keep: int = 1):
+        """Vende todas las copias por encima de `keep` de cada carta"""
+        if keep < 1:
+            return await ctx.send("❌ Debes conservar al menos 1 copia de cada carta.")
+        
+        # Se conservan las copias más antiguas de cada carta
+        selection = '''
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (PARTITION BY card_id ORDER BY id) AS copy
+                FROM user_cards
+                WHERE user_id = ?
+            )
+            WHERE copy > ?
+        '''
+        await self._bulk_sell(
+            ctx, selection, (ctx.author.id, keep),
+            f"los duplicados (conservando {keep} de cada carta)"
+        )
+    
+    @sell_card.command(name='rarity')
+    async def sell_rarity(self, ctx, rarity: str):
+        """Vende todas tus cartas de una rareza"""
+        rarity = rarity.capitalize()
+        if rarity not in SELL_PRICES:
+            return await ctx.send(f"❌ Rareza inválida. Usa: {', '.join(SELL_PRICES)}")
+        
+        selection = '''
+            SELECT uc.id FROM user_cards uc
+            JOIN photocards p ON uc.card_id = p.card_id
+            WHERE uc.user_id = ? AND p.rarity = ?
+        '''
+        await self._bulk_sell(ctx, selection, (ctx.author.id, rarity), f"todas tus cartas {rarity}")
+    
+    @sell_card.command(name='group')
+    async def sell_group(self, ctx, *, group: str):
+        """Vende todas tus cartas de un grupo"""
+        selection = '''
+            SELECT uc.id FROM user_cards uc
+            JOIN photocards p ON uc.card_id = p.card_id
+            WHERE uc.user_id = ? AND LOWER(p.group_name) = LOWER(?)
+        '''
+        await self._bulk_sell(ctx, selection, (ctx.author.id, group), f"todas tus cartas de {group}")
+    
+    @sell_rarity.autocomplete('rarity')
+    async def sell_rarity_autocomplete(self, interaction, current):
+        return _choices(SELL_PRICES, current)
+    
+    @sell_group.autocomplete('group')
+    async def sell_group_autocomplete(self, interaction, current):
+        return _choices(self.bot.catalog.groups(), current)
+    
+    async def _sale_summary(self, db, selection, params):
+        """Totales por rareza de las filas seleccionadas, calculados en SQL"""
+        async with db.execute(f'''
+            SELECT p.rarity, COUNT(*), SUM({SELL_PRICE_SQL})
+            FROM user_cards uc
+            JOIN photocards p ON uc.card_id = p.card_id
+            WHERE uc.id IN ({selection})
+            GROUP BY p.rarity
+        ''', params) as cursor:
+            return await cursor.fetchall()
+    
+    def _summary_embed(self, title, description, summary, color):
+        embed = discord.Embed(title=title, description=description, color=color)
         
-        price = prices.get(rarity, 10)
+        for rarity, count, subtotal in sorted(summary, key=lambda row: SELL_PRICES.get(row[0], 0)):
+            embed.add_field(
+                name=f"{RARITY_EMOJIS.get(rarity, '⚪')} {rarity}",
+                value=f"{count:,} cartas · {subtotal:,} monedas",
+                inline=True
+            )
         
-        # Eliminar carta y dar monedas
-        await self.bot.db.execute(
-            'DELETE FROM user_cards WHERE id = ?',
-            (user_card_id,)
+        total_cards = sum(row[1] for row in summary)
+        total_coins = sum(row[2] for row in summary)
+        embed.add_field(
+            name="💰 Total",
+            value=f"**{total_cards:,}** cartas por **{total_coins:,}** monedas",
+            inline=False
         )
+        return embed
+    
+    async def _bulk_sell(self, ctx, selection, params, label):
+        """Vende en bloque las filas de user_cards que devuelve `selection`
         
-        await self.bot.db.execute(
-            'UPDATE users SET coins = coins + ? WHERE user_id = ?',
-            (price, ctx.author.id)
+        `selection` es un SELECT de ids de user_cards; se usa tanto para la
+        vista previa como para el DELETE, que se re-evalúa al confirmar.
+        """
+        summary = await self._sale_summary(self.bot.db, selection, params)
+        if not summary:
+            return await ctx.send("❌ No tienes cartas que coincidan.")
+        
+        preview = self._summary_embed(
+            "💵 Venta masiva",
+            f"Vas a vender {label}:",
+            summary,
+            discord.Color.orange()
         )
+        preview.set_footer(text="Confirma en los próximos 30 segundos")
         
-        await self.bot.db.commit()
+        view = ConfirmView(ctx.author.id)
+        message = await ctx.send(embed=preview, view=view)
+        await view.wait()
         
-        embed = discord.Embed(
-            title="💵 Carta vendida!",
-            description=f"Has vendido **{member}** ({group}) por **{price}** monedas",
-            color=discord.Color.green()
-        )
+        if not view.confirmed:
+            return await message.edit(
+                embed=discord.Embed(title="❌ Venta cancelada", color=discord.Color.dark_gray()),
+                view=None
+            )
         
-        await ctx.send(embed=embed)
+        async with transaction(self.bot) as db:
+            # Se recalcula dentro de la transacción: la colección pudo cambiar
+            # mientras se esperaba la confirmación
+            summary = await self._sale_summary(db, selection, params)
+            total_coins = sum(row[2] for row in summary)
+            
+            if summary:
+                await db.execute(f'DELETE FROM user_cards WHERE id IN ({selection})', params)
+                async with db.execute(
+                    '''INSERT INTO users (user_id, coins) VALUES (?, ?)
+                       ON CONFLICT(user_id) DO UPDATE SET coins = coins + excluded.coins
+                       RETURNING coins''',
+                    (ctx.author.id, total_coins)
+                ) as cursor:
+                    balance = (await cursor.fetchone())[0]
+        
+        if not summary:
+            return await message.edit(
+                embed=discord.Embed(title="❌ Ya no tienes cartas que coincidan", color=discord.Color.red()),
+                view=None
+            )
+        
+        result = self._summary_embed(
+            "💵 Cartas vendidas!",
+            f"Has vendido {label}:",
+            summary,
+            discord.Color.green()
+        )
+        result.set_footer(text=f"Balance: {balance:,} monedas")
+        await message.edit(embed=result, view=None)
     
-    @commands.command(name='leaderboard', aliases=['lb', 'top'])
+    @commands.hybrid_command(name='leaderboard', aliases=['lb', 'top'])
     async def leaderboard(self, ctx, category: str = 'coins'):
         """Muestra el ranking de usuarios
         
         Categorías: coins, cards, drops
         """
-        if category == 'coins':
-            query = 'SELECT user_id, coins FROM users ORDER BY coins DESC LIMIT 10'
-            title = "💰 Top 10 - Monedas"
-        elif category == 'cards':
-            query = '''
-                SELECT user_id, COUNT(*) as count 
-                FROM user_cards 
-                GROUP BY user_id 
-                ORDER BY count DESC 
-                LIMIT 10
-            '''
-            title = "📸 Top 10 - Colección"
-        elif category == 'drops':
-            query = 'SELECT user_id, drops_count FROM users ORDER BY drops_count DESC LIMIT 10'
-            title = "🎯 Top 10 - Drops"
-        else:
+        if category not in LEADERBOARDS:
             return await ctx.send("❌ Categoría inválida. Usa: coins, cards, o drops")
         
-        async with self.bot.db.execute(query) as cursor:
-            results = await cursor.fetchall()
+        column, title = LEADERBOARDS[category]
+        
+        # Top 10 cacheado unos segundos: el ranking no necesita ser exacto
+        # al instante y así ráfagas de k!lb no vuelven a la base de datos
+        cached = self.leaderboard_cache.get(category)
+        hit = cached is not None and cached[0] > time.monotonic()
+        CACHE_REQUESTS.inc(cache='leaderboard', result='hit' if hit else 'miss')
+        if hit:
+            results = cached[1]
+        else:
+            async with self.bot.db.execute(
+                f'SELECT user_id, {column} FROM users WHERE {column} > 0 ORDER BY {column} DESC LIMIT 10'
+            ) as cursor:
+                results = await cursor.fetchall()
+            self.leaderboard_cache[category] = (time.monotonic() + self.LEADERBOARD_TTL, results)
         
         if not results:
             return await ctx.send("No hay datos suficientes para el ranking.")
@@ -286,10 +514,10 @@ class Economy(commands.Cog):
         )
         
         medals = ['🥇', '🥈', '🥉']
+        names = await self.bot.names.resolve([user_id for user_id, _ in results], ctx.guild)
         
         for i, (user_id, value) in enumerate(results, 1):
-            user = self.bot.get_user(user_id)
-            name = user.display_name if user else f"Usuario {user_id}"
+            name = names[user_id]
             medal = medals[i-1] if i <= 3 else f"#{i}"
             
             embed.add_field(
@@ -298,7 +526,25 @@ class Economy(commands.Cog):
                 inline=False
             )
         
+        # Posición propia: lectura puntual por clave primaria + conteo sobre
+        # el índice de la columna, sin ordenar la tabla completa
+        async with self.bot.db.execute(f'''
+            SELECT u.{column}, (SELECT COUNT(*) FROM users WHERE {column} > u.{column}) + 1
+            FROM users u
+            WHERE u.user_id = ?
+        ''', (ctx.author.id,)) as cursor:
+            own = await cursor.fetchone()
+        
+        if own and own[0]:
+            embed.set_footer(text=f"Tu posición: #{own[1]:,} ({own[0]:,})")
+        else:
+            embed.set_footer(text="Todavía no apareces en este ranking")
+        
         await ctx.send(embed=embed)
 
+    @leaderboard.autocomplete('category')
+    async def leaderboard_autocomplete(self, interaction, current):
+        return _choices(LEADERBOARDS, current)
+
 async def setup(bot):
     await bot.add_cog(Economy(bot))
\ No newline at end of file
@@ -9,7 +9,12 @@ import os
 
 # Agregar path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-from utils.image_processor import PhotocardProcessor
+from utils.image_processor import PhotocardProcessor, RENDER_SECONDS
+from utils import metrics
+from utils.db import transaction
+from utils.dispatcher import REPLY, INTERACTIVE, CLEANUP
+
+DROP_EVENTS = metrics.counter('kpc_drops_total', 'Drops por evento (spawned/claimed/expired)', ('event',))
 
 class Gacha(commands.Cog):
     def __init__(self, bot):
@@ -19,7 +24,7 @@ class Gacha(commands.Cog):
         self.grab_cooldowns = defaultdict(datetime)
         self.drop_cooldowns = defaultdict(datetime)
         self.auto_spawn.start()
-        self.image_processor = PhotocardProcessor()
+        self.image_processor = PhotocardProcessor(atlas=bot.atlas)
         
         self.rarities = {
             'Common': 0.50, 'Uncommon': 0.30, 'Rare': 0.15, 'Epic': 0.04, 'Legendary': 0.01
@@ -66,47 +71,25 @@ class Gacha(commands.Cog):
                 if rand <= cumulative:
                     selected_rarity = rarity
                     break
-            async with self.bot.db.execute('SELECT * FROM photocards WHERE rarity = ? ORDER BY RANDOM() LIMIT 1', (selected_rarity,)) as cursor:
-                row = await cursor.fetchone()
-            if row:
-                cards.append({
-                    'card_id': row[0], 'card_number': row[1], 'group': row[2],
-                    'member': row[3], 'era': row[4], 'rarity': row[5],
-                    'image_path': row[6], 'series': row[7] if len(row) > 7 else 'S1'
-                })
+            card = self.bot.catalog.random_card(selected_rarity)
+            if card:
+                cards.append(card)
         return cards
 
-    async def spawn_card(self, channel):
+    async def spawn_card(self, channel, ctx=None):
+        """Lanza un drop; con `ctx` de un slash command se envía como respuesta a la interacción"""
         cards = await self.get_random_cards(3)
-        if not cards or len(cards) < 3: return
+        if not cards or len(cards) < 3:
+            if ctx: await ctx.send("❌ No hay suficientes cartas en el catálogo para un drop.")
+            return
         
         self.drop_cooldowns[channel.id] = datetime.utcnow()
         
-        card_images = []
-        for card in cards:
-            try:
-                # Pasamos los datos para generar la imagen
-                img_bytes = self.image_processor.create_photocard(
-                    card['image_path'],
-                    {
-                        'rarity': card['rarity'],
-                        'card_number': card['card_number'],
-                        'member': card['member'],
-                        'group': card['group'],
-                        'era': card['era'],
-                        'serial': None # Drop genérico, sin serial aún
-                    }
-                )
-                card_images.append(img_bytes)
-            except Exception as e:
-                print(f"Error generando imagen: {e}")
-                card_images.append(None)
-        
         # ... [Resto del código de spawn_card igual: Crear embeds, enviar archivos, reacciones] ...
         # (Lógica original de embed)
         rarity_colors = {'Common': discord.Color.light_gray(), 'Uncommon': discord.Color.green(), 'Rare': discord.Color.blue(), 'Epic': discord.Color.purple(), 'Legendary': discord.Color.gold()}
         rarity_order = ['Common', 'Uncommon', 'Rare', 'Epic', 'Legendary']
-        highest_rarity = max(cards, key=lambda c: rarity_order.index(c['rarity']))['rarity']
+        highest_rarity = max(cards, key=lambda c: rarity_order.index(c.rarity)).rarity
         
         embed = discord.Embed(title="✨ 3 Photocards han aparecido! ✨", description=f"Reacciona con 1️⃣, 2️⃣ o 3️⃣ para elegir una carta!\n⏰ Tienes {self.DROP_EXPIRE_TIME} segundos", color=rarity_colors.get(highest_rarity, discord.Color.default()))
         
@@ -114,35 +97,108 @@ class Gacha(commands.Cog):
         rarity_emojis = {'Common': '⚪', 'Uncommon': '🟢', 'Rare': '🔵', 'Epic': '🟣', 'Legendary': '🟡'}
         
         for i, card in enumerate(cards):
-            rarity_emoji = rarity_emojis.get(card['rarity'], '⚪')
-            embed.add_field(name=f"{number_emojis[i]} {rarity_emoji} {card['member']}", value=f"**{card['group']}**\n{card['era'] or 'N/A'}\n`{card['rarity']}`", inline=True)
+            rarity_emoji = rarity_emojis.get(card.rarity, '⚪')
+            embed.add_field(name=f"{number_emojis[i]} {rarity_emoji} {card.member}", value=f"**{card.group}**\n{card.era or 'N/A'}\n`{card.rarity}`", inline=True)
             
         embed.timestamp = datetime.utcnow()
         
-        files = []
-        if all(card_images):
+        # La misma combinación de cartas produce el mismo grid: si ya está en
+        # el CDN de Discord se reutiliza su URL en lugar de renderizar y subir
+        upload_cache = self.bot.upload_cache
+        grid_key = upload_cache.grid_key(cards, PhotocardProcessor.RENDER_VERSION)
+        msg = None
+        cached_url = upload_cache.get(grid_key)
+        if cached_url:
+            embed.set_image(url=cached_url)
             try:
-                grid = self.image_processor.create_card_grid(card_images, cols=3)
-                if grid:
-                    files.append(discord.File(grid, filename='photocards.png'))
-                    embed.set_image(url='attachment://photocards.png')
-            except Exception as e:
-                print(f"Error creando grid: {e}")
+                msg = await self._send_drop(channel, ctx, embed=embed)
+            except discord.HTTPException:
+                await upload_cache.forget(grid_key)
+        
+        if msg is None:
+            # Render en un hilo: el loop sigue atendiendo reclamos y comandos
+            files = await asyncio.to_thread(self._render_grid, cards)
+            if files:
+                embed.set_image(url='attachment://photocards.png')
+                msg = await self._send_drop(channel, ctx, embed=embed, files=files)
+                await upload_cache.store(grid_key, msg)
+            else:
+                embed.set_image(url=None)
+                msg = await self._send_drop(channel, ctx, embed=embed)
         
-        if files: msg = await channel.send(embed=embed, files=files)
-        else: msg = await channel.send(embed=embed)
+        DROP_EVENTS.inc(event='spawned')
         
-        for emoji in number_emojis: await msg.add_reaction(emoji)
+        # Las reacciones salen en segundo plano; un reclamo temprano las descarta
+        self.bot.dispatcher.add_reactions(msg, number_emojis)
         
         self.active_drops[channel.id] = {'cards': cards, 'message_id': msg.id, 'message': msg, 'expires_at': datetime.utcnow() + timedelta(seconds=self.DROP_EXPIRE_TIME), 'claimed': False}
         
+        # Sin esperar: un envío lento o fallido no debe retrasar ni impedir la expiración
+        if channel.guild:
+            self._ping_wishlists(channel, cards)
+        
         await asyncio.sleep(self.DROP_EXPIRE_TIME)
         if channel.id in self.active_drops and not self.active_drops[channel.id]['claimed']:
             del self.active_drops[channel.id]
+            DROP_EVENTS.inc(event='expired')
+            self.bot.dispatcher.clear_reactions(msg)
+            self.bot.dispatcher.edit(msg, embed=discord.Embed(title="⏰ Expirado", description="Nadie reclamó a tiempo.", color=discord.Color.dark_gray()))
+    
+    def _ping_wishlists(self, channel, cards):
+        """Menciona en un solo mensaje a quienes tienen alguna carta del drop en su wishlist"""
+        watchers = self.bot.wishlist.watchers(channel.guild.id, [card.card_id for card in cards])
+        if not watchers:
+            return
+        
+        members = {card.card_id: card.member for card in cards}
+        mentions = [
+            f"<@{user_id}> ({', '.join(members[card_id] for card_id in card_ids)})"
+            for user_id, card_ids in watchers.items()
+        ]
+        
+        # Un mensaje salvo que las menciones no entren en el límite de 2000 caracteres
+        header = "💖 **Wishlist:** "
+        messages = [header]
+        for mention in mentions:
+            if len(messages[-1]) + len(mention) + 3 > 2000:
+                messages.append(header)
+            messages[-1] += mention if messages[-1] == header else f" · {mention}"
+        
+        for content in messages:
+            self.bot.dispatcher.post(
+                channel, priority=INTERACTIVE, content=content,
+                allowed_mentions=discord.AllowedMentions(everyone=False, roles=False, users=True)
+            )
+    
+    async def _send_drop(self, channel, ctx, **kwargs):
+        # La respuesta a una interacción va por su webhook, fuera de los límites del canal
+        if ctx and ctx.interaction:
+            return await ctx.send(**kwargs)
+        return await self.bot.dispatcher.send(channel, **kwargs)
+
+    def _render_grid(self, cards):
+        """Renderiza el grid del drop; corre en un hilo (asyncio.to_thread)"""
+        card_images = []
+        for card in cards:
             try:
-                await msg.clear_reactions()
-                await msg.edit(embed=discord.Embed(title="⏰ Expirado", description="Nadie reclamó a tiempo.", color=discord.Color.dark_gray()))
-            except: pass
+                # Pasamos los datos para generar la imagen
+                # Drop genérico, sin serial aún
+                img_bytes = self.image_processor.create_photocard(card.image_path, card.render_data())
+                card_images.append(img_bytes)
+            except Exception as e:
+                print(f"Error generando imagen: {e}")
+                card_images.append(None)
+        
+        files = []
+        if all(card_images):
+            try:
+                with RENDER_SECONDS.time(stage='grid'):
+                    grid = self.image_processor.create_card_grid(card_images, cols=3)
+                if grid:
+                    files.append(discord.File(grid, filename='photocards.png'))
+            except Exception as e:
+                print(f"Error creando grid: {e}")
+        return files
 
     # ... [Método on_reaction_add igual que el original] ...
     # Asegúrate de mantenerlo para que funcione el grab
@@ -160,12 +216,12 @@ class Gacha(commands.Cog):
         if user.id in self.grab_cooldowns:
             time_since_grab = (datetime.utcnow() - self.grab_cooldowns[user.id]).total_seconds()
             if time_since_grab < self.GRAB_COOLDOWN:
-                try: await reaction.remove(user)
-                except: pass
+                self.bot.dispatcher.remove_reaction(reaction.message, reaction.emoji, user)
                 return
                 
         if datetime.utcnow() > drop_data['expires_at']:
             del self.active_drops[reaction.message.channel.id]
+            DROP_EVENTS.inc(event='expired')
             return
             
         emoji_to_index = {'1️⃣': 0, '2️⃣': 1, '3️⃣': 2}
@@ -178,46 +234,52 @@ class Gacha(commands.Cog):
         self.grab_cooldowns[user.id] = datetime.utcnow()
         
         # DB Logic
-        await self.bot.db.execute('INSERT OR IGNORE INTO users (user_id, coins, drops_count) VALUES (?, 0, 0)', (user.id,))
-        card_serial = f"{selected_card['card_number']}-{int(datetime.utcnow().timestamp())}-{user.id % 1000}"
-        await self.bot.db.execute('INSERT INTO user_cards (user_id, card_id, card_serial) VALUES (?, ?, ?)', (user.id, selected_card['card_id'], card_serial))
-        await self.bot.db.execute('UPDATE users SET drops_count = drops_count + 1 WHERE user_id = ?', (user.id,))
-        await self.bot.db.commit()
+        card_serial = f"{selected_card.card_number}-{int(datetime.utcnow().timestamp())}-{user.id % 1000}"
+        async with transaction(self.bot) as db:
+            await db.execute('INSERT INTO users (user_id, coins, drops_count) VALUES (?, 0, 1) ON CONFLICT(user_id) DO UPDATE SET drops_count = drops_count + 1', (user.id,))
+            await db.execute('INSERT INTO user_cards (user_id, card_id, card_serial) VALUES (?, ?, ?)', (user.id, selected_card.card_id, card_serial))
         
         del self.active_drops[reaction.message.channel.id]
+        DROP_EVENTS.inc(event='claimed')
         
         # Confirmación
-        await reaction.message.channel.send(f"🎉 {user.mention} reclamó a **{selected_card['member']}**!")
-        try: await drop_data['message'].delete()
-        except: pass
+        await self.bot.dispatcher.send(reaction.message.channel, priority=REPLY, content=f"🎉 {user.mention} reclamó a **{selected_card.member}**!")
+        self.bot.dispatcher.delete(drop_data['message'], priority=CLEANUP)
+        # El adjunto del grid desaparece con el mensaje
+        await self.bot.upload_cache.forget_message(drop_data['message_id'])
 
     # ... [Comandos drop, dropchannel, removedropchannel iguales] ...
 
-    @commands.command(name='drop', aliases=['spawn'])
+    @commands.hybrid_command(name='drop', aliases=['spawn'])
     async def force_drop(self, ctx):
+        """Fuerza un drop de 3 photocards en este canal"""
         if ctx.channel.id in self.active_drops: return await ctx.send("❌ Drop activo.")
         if ctx.channel.id in self.drop_cooldowns:
             time_since = (datetime.utcnow() - self.drop_cooldowns[ctx.channel.id]).total_seconds()
             if time_since < self.DROP_COOLDOWN and not ctx.author.guild_permissions.administrator:
                 remaining = int(self.DROP_COOLDOWN - time_since)
                 return await ctx.send(f"⏳ Cooldown del canal: {remaining // 60}m {remaining % 60}s")
-        await self.spawn_card(ctx.channel)
+        # Acuse inmediato mientras se renderiza el grid
+        await ctx.typing()
+        await self.spawn_card(ctx.channel, ctx)
 
-    @commands.command(name='dropchannel')
+    @commands.hybrid_command(name='dropchannel')
     @commands.has_permissions(administrator=True)
     async def set_drop_channel(self, ctx):
+        """Establece este canal para drops automáticos"""
         self.spawn_channels[ctx.channel.id] = datetime.utcnow()
         await ctx.send("✅ Canal configurado para drops.")
 
-    @commands.command(name='removedropchannel')
+    @commands.hybrid_command(name='removedropchannel')
     @commands.has_permissions(administrator=True)
     async def remove_drop_channel(self, ctx):
+        """Quita este canal de los drops automáticos"""
         if ctx.channel.id in self.spawn_channels:
             del self.spawn_channels[ctx.channel.id]
             await ctx.send("✅ Canal removido.")
         else: await ctx.send("❌ No configurado.")
 
-    @commands.command(name='cooldown', aliases=['cd'])
+    @commands.hybrid_command(name='cooldown', aliases=['cd'])
     async def check_cooldown(self, ctx):
         """Muestra cooldown de Grab (usuario) y Drop (canal)"""
         embed = discord.Embed(title="⏰ Estado de Cooldowns", color=discord.Color.orange())
@@ -5,7 +5,7 @@ class Help(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
     
-    @commands.command(name='help', aliases=['h', 'ayuda'])
+    @commands.hybrid_command(name='help', aliases=['h', 'ayuda'])
     async def help_command(self, ctx, category: str = None):
         """Muestra la ayuda del bot"""
         
@@ -35,7 +35,7 @@ class Help(commands.Cog):
                 inline=False
             )
             
-            embed.set_footer(text="Usa k!help <categoría> para más información")
+            embed.set_footer(text="Usa k!help <categoría> para más información · Todos los comandos existen también con /")
             
         elif category.lower() == 'gacha':
             embed = discord.Embed(
@@ -65,10 +65,15 @@ class Help(commands.Cog):
             )
             
             commands_list = [
-                ("k!collection (col, c) [@usuario]", "Muestra tu colección o la de otro usuario"),
+                ("k!collection (col, c) [@usuario] [filtros]", "Muestra tu colección o la de otro usuario, paginada\nFiltros: `group:` `rarity:` `era:` `dupes: yes` `sort: rarity|group|member|qty`"),
+                ("k!binder (album) [@usuario] [grupo]", "Muestra tu colección como un álbum de miniaturas\nCon un grupo muestra el set completo, con las cartas que faltan en gris"),
+                ("k!progress (sets) [@usuario] [grupo]", "Muestra cuánto te falta para completar cada grupo, era y serie"),
+                ("k!progress top <grupo|era|serie>", "Ranking de quienes están más cerca de completar un set"),
                 ("k!inventory (inv)", "Muestra un resumen de tu inventario"),
-                ("k!view (v) <búsqueda>", "Busca información de una photocard"),
-                ("k!gift <@usuario> <card_id>", "Regala una photocard a otro usuario")
+                ("k!view (v) <búsqueda>", "Busca una photocard por miembro, grupo, era o número (tolera errores de tipeo)"),
+                ("k!gift <@usuario> <card_id>", "Regala una photocard a otro usuario"),
+                ("k!trade <@usuario> [give: ids] [get: ids] [pay: monedas] [ask: monedas]", "Propone un intercambio de cartas y monedas; ambos deben aceptar con los botones\n`k!trade cancel` cancela tu intercambio pendiente"),
+                ("k!wishlist (wl) [add|remove|clear] [cartas]", "Tu wishlist en este servidor: te mencionamos cuando una de sus cartas aparece en un drop")
             ]
             
             for cmd, desc in commands_list:
@@ -84,7 +89,10 @@ class Help(commands.Cog):
                 ("k!daily", "Reclama tu recompensa diaria"),
                 ("k!balance (bal) [@usuario]", "Verifica tu balance de monedas"),
                 ("k!buy <tipo>", "Compra un pack de photocards\nTipos: basic, premium, deluxe"),
-                ("k!sell <card_id>", "Vende una photocard por monedas"),
+                ("k!sell <card_id> [card_id...]", "Vende una copia de cada photocard indicada"),
+                ("k!sell dupes [conservar]", "Vende los duplicados, conservando N copias de cada carta (1 por defecto)"),
+                ("k!sell rarity <rareza>", "Vende todas tus cartas de una rareza"),
+                ("k!sell group <grupo>", "Vende todas tus cartas de un grupo"),
                 ("k!leaderboard (lb, top) <categoría>", "Muestra el ranking\nCategorías: coins, cards, drops")
             ]
             
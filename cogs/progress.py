@@ -0,0 +1,195 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+from typing import Optional
+
+SET_KIND_TITLES = {
+    'group': "👥 Grupos",
+    'era': "💿 Eras",
+    'series': "🗂️ Series"
+}
+
+# Sets por tipo en el resumen general
+SUMMARY_LIMIT = 8
+
+def progress_bar(owned, total, width=10):
+    filled = round(width * owned / total) if total else 0
+    return '▰' * filled + '▱' * (width - filled)
+
+def progress_line(label, owned, total):
+    mark = " ✅" if owned >= total else ""
+    return f"`{progress_bar(owned, total)}` **{label}** {owned}/{total}{mark}"
+
+class Progress(commands.Cog):
+    """Progreso de colección por set, leído de las tablas que mantienen los triggers"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+    
+    def _resolve_set(self, name):
+        """(tipo, clave) del set que nombra el usuario: grupo, "grupo era", era o serie"""
+        lowered = name.strip().lower()
+        cards = self.bot.catalog.by_group(lowered)
+        if cards:
+            return 'group', cards[0].group
+        
+        eras = []
+        for card in self.bot.catalog:
+            if card.series and card.series.lower() == lowered:
+                return 'series', card.series
+            if card.era and lowered in (card.era.lower(), f"{card.group} {card.era}".lower()):
+                eras.append(card)
+        if eras:
+            # Con una era repetida en varios grupos gana la que nombra el grupo
+            card = next((c for c in eras if lowered.startswith(c.group.lower())), eras[0])
+            return 'era', f"{card.group} · {card.era}"
+        return None
+    
+    @commands.hybrid_group(name='progress', aliases=['sets'], fallback='show', invoke_without_command=True)
+    async def progress(self, ctx, user: Optional[discord.Member] = None, *, group: Optional[str] = None):
+        """Muestra cuánto te falta para completar cada set
+        
+        - k!progress - tus sets más avanzados por grupo, era y serie
+        - k!progress <grupo> - el grupo y cada una de sus eras
+        - k!progress top <grupo|era|serie> - quiénes están más cerca de completarlo
+        """
+        target = user or ctx.author
+        self.bot.names.remember(target.id, target.display_name)
+        
+        if group:
+            cards = self.bot.catalog.by_group(group)
+            if not cards:
+                return await ctx.send(f"❌ No hay photocards del grupo '{group}'.")
+            group_name = cards[0].group
+            
+            # Totales del grupo y de sus eras; el progreso de cada uno por clave primaria
+            keys = [('group', group_name)] + [
+                ('era', f"{group_name} · {era}") for era in sorted({card.era for card in cards if card.era})
+            ]
+            async with self.bot.db.execute(f'''
+                SELECT t.kind, t.set_key, t.total, COALESCE(p.owned, 0)
+                FROM set_totals t
+                LEFT JOIN user_set_progress p
+                    ON p.user_id = ? AND p.kind = t.kind AND p.set_key = t.set_key
+                WHERE (t.kind, t.set_key) IN (VALUES {', '.join(['(?, ?)'] * len(keys))})
+                ORDER BY t.kind DESC, t.set_key
+            ''', (target.id, *[value for key in keys for value in key])) as cursor:
+                rows = await cursor.fetchall()
+            
+            embed = discord.Embed(
+                title=f"📈 Progreso de {target.display_name} · {group_name}",
+                color=discord.Color.teal()
+            )
+            lines = [
+                progress_line(set_key.split(' · ', 1)[1] if kind == 'era' else set_key, owned, total)
+                for kind, set_key, total, owned in rows
+            ]
+            embed.description = "\n".join(lines) or "Sin sets para este grupo."
+            return await ctx.send(embed=embed)
+        
+        # Resumen: los sets del usuario ordenados por completitud
+        async with self.bot.db.execute('''
+            SELECT p.kind, p.set_key, p.owned, t.total
+            FROM user_set_progress p
+            JOIN set_totals t ON t.kind = p.kind AND t.set_key = p.set_key
+            WHERE p.user_id = ?
+            ORDER BY p.kind, CAST(p.owned AS REAL) / t.total DESC, t.total DESC, p.set_key
+        ''', (target.id,)) as cursor:
+            rows = await cursor.fetchall()
+        
+        if not rows:
+            return await ctx.send(f"{'Tu' if target == ctx.author else f'{target.display_name}'} no tiene photocards todavía.")
+        
+        by_kind = {}
+        for kind, set_key, owned, total in rows:
+            by_kind.setdefault(kind, []).append((set_key, owned, total))
+        
+        embed = discord.Embed(
+            title=f"📈 Progreso de {target.display_name}",
+            color=discord.Color.teal()
+        )
+        for kind, title in SET_KIND_TITLES.items():
+            sets = by_kind.get(kind)
+            if not sets:
+                continue
+            lines = [progress_line(set_key, owned, total) for set_key, owned, total in sets[:SUMMARY_LIMIT]]
+            if len(sets) > SUMMARY_LIMIT:
+                lines.append(f"… y {len(sets) - SUMMARY_LIMIT} más")
+            embed.add_field(name=title, value="\n".join(lines)[:1024], inline=False)
+        
+        completed = sum(1 for _, _, owned, total in rows if owned >= total)
+        embed.set_footer(text=f"Sets completos: {completed} · k!progress <grupo> para ver sus eras")
+        await ctx.send(embed=embed)
+    
+    @progress.command(name='top')
+    async def progress_top(self, ctx, *, name: str):
+        """Ranking de quienes están más cerca de completar un set"""
+        resolved = self._resolve_set(name)
+        if not resolved:
+            return await ctx.send(f"❌ No encontré un grupo, era o serie llamado '{name}'.")
+        kind, set_key = resolved
+        
+        async with self.bot.db.execute(
+            'SELECT total FROM set_totals WHERE kind = ? AND set_key = ?',
+            (kind, set_key)
+        ) as cursor:
+            row = await cursor.fetchone()
+        total = row[0] if row else 0
+        
+        # Recorre idx_user_set_progress_ranking de mayor a menor: sin ordenar
+        async with self.bot.db.execute('''
+            SELECT user_id, owned FROM user_set_progress
+            WHERE kind = ? AND set_key = ?
+            ORDER BY owned DESC
+            LIMIT 10
+        ''', (kind, set_key)) as cursor:
+            results = await cursor.fetchall()
+        
+        if not results or not total:
+            return await ctx.send("Nadie tiene cartas de ese set todavía.")
+        
+        embed = discord.Embed(
+            title=f"🏁 Más cerca de completar {set_key} ({total} cartas)",
+            color=discord.Color.teal()
+        )
+        
+        medals = ['🥇', '🥈', '🥉']
+        names = await self.bot.names.resolve([user_id for user_id, _ in results], ctx.guild)
+        
+        for i, (user_id, owned) in enumerate(results, 1):
+            medal = medals[i-1] if i <= 3 else f"#{i}"
+            missing = total - owned
+            embed.add_field(
+                name=f"{medal} {names[user_id]}",
+                value=f"`{progress_bar(owned, total)}` {owned}/{total}" + (" ✅" if missing <= 0 else f" · faltan {missing}"),
+                inline=False
+            )
+        
+        # Posición propia: conteo sobre el mismo índice
+        async with self.bot.db.execute('''
+            SELECT p.owned, (
+                SELECT COUNT(*) FROM user_set_progress
+                WHERE kind = p.kind AND set_key = p.set_key AND owned > p.owned
+            ) + 1
+            FROM user_set_progress p
+            WHERE p.user_id = ? AND p.kind = ? AND p.set_key = ?
+        ''', (ctx.author.id, kind, set_key)) as cursor:
+            own = await cursor.fetchone()
+        
+        if own:
+            embed.set_footer(text=f"Tu posición: #{own[1]:,} ({own[0]}/{total})")
+        else:
+            embed.set_footer(text="Todavía no tienes cartas de este set")
+        
+        await ctx.send(embed=embed)
+    
+    @progress.autocomplete('group')
+    async def progress_group_autocomplete(self, interaction, current):
+        current = current.lower()
+        return [
+            app_commands.Choice(name=group, value=group)
+            for group in self.bot.catalog.groups() if current in group.lower()
+        ][:25]
+
+async def setup(bot):
+    await bot.add_cog(Progress(bot))
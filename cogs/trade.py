@@ -0,0 +1,287 @@
+import discord
+from discord.ext import commands
+from typing import Optional
+from collections import Counter
+from datetime import datetime, timedelta
+import itertools
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from utils.db import transaction
+
+# Copias por lado en un intercambio
+MAX_TRADE_CARDS = 10
+TRADE_TIMEOUT = 120
+
+class TradeFlags(commands.FlagConverter, delimiter=':', prefix=''):
+    give: Optional[str] = None      # cartas que das (IDs, se repiten para varias copias)
+    get: Optional[str] = None       # cartas que pides
+    pay: int = 0                    # monedas que das
+    ask: int = 0                    # monedas que pides
+
+class TradeError(Exception):
+    """El intercambio ya no se puede hacer; el mensaje se muestra al usuario"""
+
+class Trade:
+    """Intercambio pendiente: filas concretas de user_cards y monedas de cada lado"""
+    
+    def __init__(self, trade_id, proposer, partner, give_rows, get_rows, pay, ask):
+        self.trade_id = trade_id
+        self.proposer = proposer
+        self.partner = partner
+        self.give_rows = give_rows      # [(id, card_id, serial)] del que propone
+        self.get_rows = get_rows        # [(id, card_id, serial)] del otro
+        self.pay = pay
+        self.ask = ask
+        self.expires_at = datetime.utcnow() + timedelta(seconds=TRADE_TIMEOUT)
+        self.view = None
+
+class TradeView(discord.ui.View):
+    """Aceptar/cancelar para las dos partes; confirma cuando aceptaron ambas"""
+    
+    def __init__(self, trade):
+        super().__init__(timeout=TRADE_TIMEOUT)
+        self.trade = trade
+        self.accepted = set()
+        self.confirmed = False
+        self.cancelled_by = None
+    
+    async def interaction_check(self, interaction):
+        return interaction.user.id in (self.trade.proposer.id, self.trade.partner.id)
+    
+    @discord.ui.button(label='Aceptar', style=discord.ButtonStyle.success)
+    async def accept(self, interaction, button):
+        self.accepted.add(interaction.user.id)
+        if len(self.accepted) == 2:
+            self.confirmed = True
+            await interaction.response.defer()
+            self.stop()
+            return
+        await interaction.response.send_message("✅ Aceptaste; falta la otra parte.", ephemeral=True)
+    
+    @discord.ui.button(label='Cancelar', style=discord.ButtonStyle.secondary)
+    async def cancel(self, interaction, button):
+        self.cancelled_by = interaction.user
+        await interaction.response.defer()
+        self.stop()
+
+class Trading(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        # Tabla en memoria de intercambios pendientes; cada usuario en uno a la vez
+        self.trades = {}            # trade_id -> Trade
+        self.user_trades = {}       # user_id -> trade_id
+        self._ids = itertools.count(1)
+    
+    def _expire(self):
+        now = datetime.utcnow()
+        for trade in [t for t in self.trades.values() if t.expires_at <= now]:
+            if trade.view:
+                trade.view.stop()
+            self._forget(trade)
+    
+    def _forget(self, trade):
+        self.trades.pop(trade.trade_id, None)
+        self._release(trade.trade_id, trade.proposer.id, trade.partner.id)
+    
+    def _release(self, trade_id, *user_ids):
+        for user_id in user_ids:
+            if self.user_trades.get(user_id) == trade_id:
+                del self.user_trades[user_id]
+    
+    def _parse_cards(self, text):
+        """Counter {card_id: copias} de una lista de IDs; None si alguno no existe"""
+        if not text:
+            return Counter()
+        try:
+            counts = Counter(int(part) for part in text.replace(',', ' ').split())
+        except ValueError:
+            return None
+        if any(self.bot.catalog.get(card_id) is None for card_id in counts):
+            return None
+        return counts
+    
+    async def _pick_rows(self, user_id, counts):
+        """Copias concretas (las obtenidas más recientemente); None si no alcanzan"""
+        if not counts:
+            return []
+        placeholders = ', '.join('?' * len(counts))
+        async with self.bot.db.execute(f'''
+            SELECT id, card_id, card_serial FROM user_cards
+            WHERE user_id = ? AND card_id IN ({placeholders})
+            ORDER BY id DESC
+        ''', (user_id, *counts)) as cursor:
+            rows = await cursor.fetchall()
+        
+        picked = []
+        remaining = Counter(counts)
+        for row in rows:
+            if remaining[row[1]] > 0:
+                picked.append(row)
+                remaining[row[1]] -= 1
+        return picked if not +remaining else None
+    
+    async def _coins(self, user_id):
+        async with self.bot.db.execute('SELECT coins FROM users WHERE user_id = ?', (user_id,)) as cursor:
+            row = await cursor.fetchone()
+        return row[0] if row else 0
+    
+    def _side_text(self, rows, coins):
+        lines = []
+        for _, card_id, serial in rows:
+            card = self.bot.catalog.get(card_id)
+            label = f"**{card.member}** ({card.group}) · `{card_id}`" if card else f"`{card_id}`"
+            lines.append(label + (f" · #{serial.split('-')[-1][-4:]}" if serial else ""))
+        if coins:
+            lines.append(f"🪙 {coins:,} monedas")
+        return "\n".join(lines) or "Nada"
+    
+    def _trade_embed(self, trade, title, color, footer=None):
+        embed = discord.Embed(title=title, color=color)
+        embed.add_field(
+            name=f"📤 {trade.proposer.display_name} da",
+            value=self._side_text(trade.give_rows, trade.pay)[:1024], inline=True
+        )
+        embed.add_field(
+            name=f"📥 {trade.partner.display_name} da",
+            value=self._side_text(trade.get_rows, trade.ask)[:1024], inline=True
+        )
+        if footer:
+            embed.set_footer(text=footer)
+        return embed
+    
+    @commands.hybrid_group(name='trade', fallback='offer', invoke_without_command=True)
+    @commands.guild_only()
+    async def trade(self, ctx, user: discord.Member, *, flags: TradeFlags):
+        """Propone un intercambio de cartas y monedas con otro usuario
+        
+        Ejemplo: k!trade @usuario give: 12 12 40 get: 7 pay: 100 ask: 0
+        Repite un ID para dar o pedir varias copias. Ambos deben aceptar.
+        """
+        if user.bot or user == ctx.author:
+            return await ctx.send("❌ Destinatario inválido.")
+        
+        give, get = self._parse_cards(flags.give), self._parse_cards(flags.get)
+        if give is None or get is None:
+            return await ctx.send("❌ Los IDs de carta deben ser números de cartas existentes.")
+        if flags.pay < 0 or flags.ask < 0:
+            return await ctx.send("❌ Las monedas no pueden ser negativas.")
+        if not (give or get or flags.pay or flags.ask):
+            return await ctx.send("❌ Usa `k!trade @usuario give: <ids> get: <ids> pay: <monedas> ask: <monedas>`")
+        if sum(give.values()) > MAX_TRADE_CARDS or sum(get.values()) > MAX_TRADE_CARDS:
+            return await ctx.send(f"❌ Como máximo {MAX_TRADE_CARDS} cartas por lado.")
+        
+        self._expire()
+        if ctx.author.id in self.user_trades or user.id in self.user_trades:
+            return await ctx.send("❌ Alguno de los dos ya tiene un intercambio pendiente.")
+        
+        # Reserva antes del primer await: dos k!trade seguidos no pasan ambos el chequeo
+        trade_id = next(self._ids)
+        self.user_trades[ctx.author.id] = self.user_trades[user.id] = trade_id
+        try:
+            trade = await self._prepare(ctx, user, trade_id, give, get, flags)
+            if trade is None:
+                return
+            
+            message = await ctx.send(
+                content=f"{user.mention}, {ctx.author.mention} te propone un intercambio:",
+                embed=self._trade_embed(
+                    trade, "🤝 Propuesta de intercambio", discord.Color.blurple(),
+                    f"Ambos deben aceptar en los próximos {TRADE_TIMEOUT // 60} minutos"
+                ),
+                view=trade.view
+            )
+            await trade.view.wait()
+        finally:
+            self.trades.pop(trade_id, None)
+            self._release(trade_id, ctx.author.id, user.id)
+        
+        if not trade.view.confirmed:
+            if trade.view.cancelled_by:
+                title = f"❌ Intercambio cancelado por {trade.view.cancelled_by.display_name}"
+            else:
+                title = "⏰ Intercambio expirado"
+            return await message.edit(
+                embed=self._trade_embed(trade, title, discord.Color.dark_gray()), view=None
+            )
+        
+        try:
+            await self._execute(trade)
+        except TradeError as e:
+            return await message.edit(
+                embed=self._trade_embed(trade, f"❌ El intercambio falló: {e}", discord.Color.red()), view=None
+            )
+        
+        await message.edit(
+            embed=self._trade_embed(trade, "✅ Intercambio realizado", discord.Color.green()), view=None
+        )
+    
+    async def _prepare(self, ctx, user, trade_id, give, get, flags):
+        """Elige las copias y valida saldos; None (ya avisado) si no alcanza"""
+        give_rows = await self._pick_rows(ctx.author.id, give)
+        if give_rows is None:
+            await ctx.send("❌ No tienes todas esas cartas (o no tantas copias).")
+            return None
+        get_rows = await self._pick_rows(user.id, get)
+        if get_rows is None:
+            await ctx.send(f"❌ {user.display_name} no tiene todas esas cartas (o no tantas copias).")
+            return None
+        if flags.pay and await self._coins(ctx.author.id) < flags.pay:
+            await ctx.send("❌ No tienes suficientes monedas.")
+            return None
+        if flags.ask and await self._coins(user.id) < flags.ask:
+            await ctx.send(f"❌ {user.display_name} no tiene suficientes monedas.")
+            return None
+        
+        trade = Trade(trade_id, ctx.author, user, give_rows, get_rows, flags.pay, flags.ask)
+        trade.view = TradeView(trade)
+        self.trades[trade_id] = trade
+        return trade
+    
+    async def _execute(self, trade):
+        """Mueve cartas y monedas en una transacción; TradeError (y rollback) si algo cambió"""
+        a, b = trade.proposer.id, trade.partner.id
+        give_ids = [row[0] for row in trade.give_rows]
+        get_ids = [row[0] for row in trade.get_rows]
+        
+        async with transaction(self.bot) as db:
+            if give_ids or get_ids:
+                # Un único UPDATE: cada fila cambia de dueño sólo si sigue siendo
+                # de quien la ofreció; las filas conservan serial y fecha
+                async with db.execute(f'''
+                    UPDATE user_cards SET user_id = CASE user_id WHEN ? THEN ? ELSE ? END
+                    WHERE (user_id = ? AND id IN ({', '.join('?' * len(give_ids)) or 'NULL'}))
+                       OR (user_id = ? AND id IN ({', '.join('?' * len(get_ids)) or 'NULL'}))
+                    RETURNING id
+                ''', (a, b, a, a, *give_ids, b, *get_ids)) as cursor:
+                    moved = await cursor.fetchall()
+                if len(moved) != len(give_ids) + len(get_ids):
+                    raise TradeError("alguna carta ya no está disponible")
+            
+            await db.execute('INSERT OR IGNORE INTO users (user_id) VALUES (?), (?)', (a, b))
+            for payer, payee, amount in ((a, b, trade.pay), (b, a, trade.ask)):
+                if not amount:
+                    continue
+                async with db.execute(
+                    'UPDATE users SET coins = coins - ? WHERE user_id = ? AND coins >= ? RETURNING coins',
+                    (amount, payer, amount)
+                ) as cursor:
+                    if await cursor.fetchone() is None:
+                        raise TradeError("monedas insuficientes")
+                await db.execute('UPDATE users SET coins = coins + ? WHERE user_id = ?', (amount, payee))
+    
+    @trade.command(name='cancel')
+    @commands.guild_only()
+    async def trade_cancel(self, ctx):
+        """Cancela tu intercambio pendiente"""
+        self._expire()
+        trade = self.trades.get(self.user_trades.get(ctx.author.id))
+        if trade is None:
+            return await ctx.send("No tienes intercambios pendientes.")
+        trade.view.cancelled_by = ctx.author
+        trade.view.stop()
+        await ctx.send("✅ Intercambio cancelado.")
+
+async def setup(bot):
+    await bot.add_cog(Trading(bot))
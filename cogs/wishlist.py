@@ -0,0 +1,124 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+RARITY_EMOJIS = {
+    'Common': '⚪', 'Uncommon': '🟢', 'Rare': '🔵',
+    'Epic': '🟣', 'Legendary': '🟡'
+}
+
+class Wishlist(commands.Cog):
+    """Cartas que cada usuario espera; el drop avisa cuando aparecen"""
+    
+    def __init__(self, bot):
+        self.bot = bot
+    
+    async def _resolve_cards(self, text):
+        """Cartas por ID o número separados por espacios o comas; si no, por búsqueda
+        
+        Devuelve (cartas, candidatas): candidatas cuando la búsqueda es ambigua.
+        """
+        cards = []
+        for token in text.replace(',', ' ').split():
+            card = self.bot.catalog.get(int(token)) if token.isdigit() else self.bot.catalog.by_number(token)
+            if card is None:
+                break
+            cards.append(card)
+        else:
+            return cards, []
+        
+        # Texto libre: una sola carta, como en k!view
+        results = await self.bot.card_search.search(text)
+        exact = [card for card in results if self.bot.card_search.is_exact(card, text)]
+        if len(results) == 1:
+            return results, []
+        if len(exact) == 1:
+            return exact, []
+        return [], results
+    
+    def _card_line(self, card):
+        return f"{RARITY_EMOJIS.get(card.rarity, '⚪')} **{card.member}** ({card.group}) · {card.era or 'N/A'} · `{card.card_id}`"
+    
+    @commands.hybrid_group(name='wishlist', aliases=['wl'], fallback='show', invoke_without_command=True)
+    @commands.guild_only()
+    async def wishlist(self, ctx):
+        """Muestra tu wishlist en este servidor
+        
+        - k!wishlist add <card_id|número|búsqueda> - te avisa cuando aparezca en un drop
+        - k!wishlist remove <card_id|número> - la quita
+        - k!wishlist clear - vacía tu wishlist
+        """
+        card_ids = sorted(self.bot.wishlist.cards(ctx.guild.id, ctx.author.id))
+        cards = [card for card in map(self.bot.catalog.get, card_ids) if card]
+        if not cards:
+            return await ctx.send("💖 Tu wishlist está vacía. Agrega cartas con `k!wishlist add <card_id>`.")
+        
+        # Copias que ya tiene de cada una, en una sola consulta
+        placeholders = ', '.join('?' * len(cards))
+        async with self.bot.db.execute(
+            f'SELECT card_id, qty FROM user_card_counts WHERE user_id = ? AND card_id IN ({placeholders})',
+            (ctx.author.id, *[card.card_id for card in cards])
+        ) as cursor:
+            owned = dict(await cursor.fetchall())
+        
+        lines = [
+            self._card_line(card) + (f" · tienes {owned[card.card_id]}" if card.card_id in owned else "")
+            for card in cards
+        ]
+        embed = discord.Embed(
+            title=f"💖 Wishlist de {ctx.author.display_name}",
+            description="\n".join(lines),
+            color=discord.Color.magenta()
+        )
+        embed.set_footer(text=f"{len(cards)}/{self.bot.wishlist.LIMIT} cartas · Te mencionamos cuando aparezcan en un drop de este servidor")
+        await ctx.send(embed=embed)
+    
+    @wishlist.command(name='add')
+    @commands.guild_only()
+    async def wishlist_add(self, ctx, *, cards: str):
+        """Agrega cartas a tu wishlist"""
+        found, candidates = await self._resolve_cards(cards)
+        if candidates:
+            lines = "\n".join(self._card_line(card) for card in candidates[:10])
+            return await ctx.send(f"🔎 Hay {len(candidates)} photocards que coinciden, usa su ID:\n{lines}")
+        if not found:
+            return await ctx.send(f"❌ No se encontraron photocards con '{cards}'")
+        
+        added = await self.bot.wishlist.add(ctx.guild.id, ctx.author.id, [card.card_id for card in found])
+        if not added:
+            if len(self.bot.wishlist.cards(ctx.guild.id, ctx.author.id)) >= self.bot.wishlist.LIMIT:
+                return await ctx.send(f"❌ Tu wishlist está llena ({self.bot.wishlist.LIMIT} cartas).")
+            return await ctx.send("Esas cartas ya estaban en tu wishlist.")
+        
+        names = ", ".join(f"**{self.bot.catalog.get(card_id).member}**" for card_id in added)
+        skipped = len(found) - len(added)
+        await ctx.send(f"💖 Agregadas a tu wishlist: {names}" + (f" ({skipped} ya estaban o no entraron)" if skipped else ""))
+    
+    @wishlist_add.autocomplete('cards')
+    async def wishlist_add_autocomplete(self, interaction, current):
+        choices = []
+        for card_id, label in self.bot.card_search.autocomplete(current):
+            card = self.bot.catalog.get(card_id)
+            if card:
+                choices.append(app_commands.Choice(name=label[:100], value=card.card_number))
+        return choices
+    
+    @wishlist.command(name='remove')
+    @commands.guild_only()
+    async def wishlist_remove(self, ctx, *, cards: str):
+        """Quita cartas de tu wishlist"""
+        found, _ = await self._resolve_cards(cards)
+        removed = await self.bot.wishlist.remove(ctx.guild.id, ctx.author.id, [card.card_id for card in found])
+        if not removed:
+            return await ctx.send("❌ Esas cartas no están en tu wishlist.")
+        await ctx.send(f"🗑️ Quitadas de tu wishlist: {len(removed)}")
+    
+    @wishlist.command(name='clear')
+    @commands.guild_only()
+    async def wishlist_clear(self, ctx):
+        """Vacía tu wishlist en este servidor"""
+        removed = await self.bot.wishlist.remove(ctx.guild.id, ctx.author.id)
+        await ctx.send(f"🗑️ Wishlist vaciada ({len(removed)} cartas)." if removed else "Tu wishlist ya estaba vacía.")
+
+async def setup(bot):
+    await bot.add_cog(Wishlist(bot))
@@ -0,0 +1,321 @@
+"""Carga el catálogo de photocards desde un manifiesto o desde las carpetas de imágenes.
+    
+    python ingest_cards.py                              # data/catalog.json
+    python ingest_cards.py nueva_temporada.csv --dry-run
+    python ingest_cards.py --scan data/photocards       # <GRUPO>/<Miembro>_<Era>[_<Rareza>].jpg
+
+El manifiesto (JSON, CSV o YAML) tiene una fila por carta con card_number,
+group, member, era, rarity, series e image (opcional: por defecto
+data/photocards/<group>/<member>_<era>.jpg).
+
+Las imágenes se validan en paralelo (existen, se decodifican, tamaño
+mínimo) y se guarda su hash; las que no cambiaron desde la última carga no
+se vuelven a decodificar. Las cartas se insertan o actualizan con un solo
+executemany dentro de una transacción (sólo se tocan las que cambiaron, así
+el bot recarga el catálogo únicamente si hace falta) y se informa qué se
+agregó, cambió o desapareció del manifiesto. Volver a correrlo sin cambios
+no modifica nada.
+"""
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import aiosqlite
+from PIL import Image
+
+from bot import KpopPhotocardBot
+
+RARITIES = ['Common', 'Uncommon', 'Rare', 'Epic', 'Legendary']
+RARITY_EMOJIS = {'Common': '⚪', 'Uncommon': '🟢', 'Rare': '🔵', 'Epic': '🟣', 'Legendary': '🟡'}
+FIELDS = ['group_name', 'member_name', 'era', 'rarity', 'image_path', 'series', 'image_hash']
+
+# El master de build_assets.py sigue valiendo mientras el original no cambie;
+# sin hash guardado (bases anteriores a image_hash) no hay con qué comparar
+# y se conserva: build_assets.py lo deja escrito en la próxima pasada
+SAME_SOURCE = (
+    'photocards.source_path = excluded.image_path '
+    'AND (photocards.image_hash IS NULL OR photocards.image_hash = excluded.image_hash)'
+)
+
+# Menor que esto se ve pixelado al recortarlo a 600x900
+MIN_WIDTH = 300
+MIN_HEIGHT = 450
+
+
+def inspect_image(path, known_hash):
+    """Valida una imagen en un proceso aparte: (hash, ancho, alto, error)
+    
+    Si el hash coincide con `known_hash` la imagen ya se validó en una
+    carga anterior y no se decodifica de nuevo.
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        return None, None, None, f"no se puede leer: {e.strerror}"
+    
+    digest = hashlib.sha256(data).hexdigest()
+    if digest == known_hash:
+        return digest, None, None, None
+    
+    try:
+        with Image.open(path) as img:
+            img.load()
+            width, height = img.size
+    except Exception as e:
+        return digest, None, None, f"no es una imagen válida: {e}"
+    
+    if width < MIN_WIDTH or height < MIN_HEIGHT:
+        return digest, width, height, f"demasiado pequeña ({width}x{height}, mínimo {MIN_WIDTH}x{MIN_HEIGHT})"
+    return digest, width, height, None
+
+
+def load_manifest(path):
+    """Filas del manifiesto como dicts con las claves del formato"""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, encoding='utf-8', newline='') as f:
+        if ext == '.csv':
+            return list(csv.DictReader(f))
+        if ext in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                sys.exit("❌ Para manifiestos YAML instala PyYAML (pip install pyyaml)")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    return data['cards'] if isinstance(data, dict) else data
+
+
+def scan_directory(root, existing):
+    """Filas a partir de <root>/<GRUPO>/<Miembro>_<Era>[_<Rareza>].<ext>
+    
+    Las imágenes ya catalogadas conservan su número; las nuevas reciben el
+    siguiente del prefijo que ya usa su grupo (o las iniciales del grupo).
+    """
+    by_image = {row['image_path']: number for number, row in existing.items()}
+    prefixes = {}
+    next_number = {}
+    for number, row in existing.items():
+        match = re.match(r'(.+)-(\d+)$', number)
+        if match:
+            prefixes.setdefault(row['group_name'], match.group(1))
+            next_number[match.group(1)] = max(next_number.get(match.group(1), 0), int(match.group(2)))
+    
+    rows = []
+    for group in sorted(os.listdir(root)):
+        group_dir = os.path.join(root, group)
+        if not os.path.isdir(group_dir):
+            continue
+        prefix = prefixes.get(group) or re.sub(r'[^A-Z0-9]', '', group.upper())[:3]
+        for filename in sorted(os.listdir(group_dir)):
+            name, ext = os.path.splitext(filename)
+            if ext.lower() not in ('.jpg', '.jpeg', '.png', '.webp'):
+                continue
+            parts = name.split('_')
+            member, era = parts[0], parts[1] if len(parts) > 1 else None
+            image = os.path.join(root, group, filename).replace(os.sep, '/')
+            
+            number = by_image.get(image)
+            if number is None:
+                next_number[prefix] = next_number.get(prefix, 0) + 1
+                number = f"{prefix}-{next_number[prefix]:03d}"
+            # Sin rareza en el nombre se conserva la del catálogo (Common si es nueva)
+            current = existing.get(number, {})
+            rows.append({
+                'card_number': number, 'group': group, 'member': member, 'era': era,
+                'rarity': parts[2] if len(parts) > 2 else current.get('rarity', 'Common'),
+                'series': current.get('series'), 'image': image
+            })
+    return rows
+
+
+def normalize(rows):
+    """Filas del manifiesto -> {card_number: fila con columnas de la base}, errores"""
+    cards, errors = {}, []
+    for i, row in enumerate(rows, 1):
+        number = (row.get('card_number') or '').strip()
+        group = (row.get('group') or '').strip()
+        member = (row.get('member') or '').strip()
+        era = (row.get('era') or '').strip() or None
+        rarity = (row.get('rarity') or '').strip().capitalize()
+        label = number or f"fila {i}"
+        
+        if not number or not group or not member:
+            errors.append(f"{label}: faltan card_number, group o member")
+            continue
+        if number in cards:
+            errors.append(f"{label}: card_number repetido en el manifiesto")
+            continue
+        if rarity not in RARITIES:
+            errors.append(f"{label}: rareza inválida '{row.get('rarity')}' (usa {', '.join(RARITIES)})")
+            continue
+        
+        cards[number] = {
+            'group_name': group,
+            'member_name': member,
+            'era': era,
+            'rarity': rarity,
+            'image_path': (row.get('image') or f"data/photocards/{group}/{member}_{era}.jpg").strip(),
+            'series': (row.get('series') or '').strip() or 'S1',
+            'image_hash': None
+        }
+    return cards, errors
+
+
+def validate_images(cards, existing, jobs):
+    """Completa image_hash de cada carta y devuelve la lista de errores"""
+    errors = []
+    paths = sorted({card['image_path'] for card in cards.values()})
+    known = {row['image_path']: row['image_hash'] for row in existing.values()}
+    
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = dict(zip(paths, pool.map(inspect_image, paths, [known.get(path) for path in paths], chunksize=8)))
+    
+    owners = {}
+    for number, card in cards.items():
+        digest, _, _, error = results[card['image_path']]
+        if error:
+            errors.append(f"{number}: {card['image_path']} {error}")
+            continue
+        card['image_hash'] = digest
+        owners.setdefault(digest, []).append(number)
+    
+    for numbers in owners.values():
+        if len(set(cards[n]['image_path'] for n in numbers)) > 1:
+            print(f"⚠️  Misma imagen en archivos distintos: {', '.join(numbers)}")
+    return errors
+
+
+async def read_existing(db):
+    # Con master de build_assets.py, el manifiesto se compara contra el original
+    columns = ['COALESCE(source_path, image_path)' if field == 'image_path' else field for field in FIELDS]
+    async with db.execute(
+        f"SELECT card_number, {', '.join(columns)} FROM photocards"
+    ) as cursor:
+        return {row[0]: dict(zip(FIELDS, row[1:])) for row in await cursor.fetchall()}
+
+
+async def owned_cards(db, numbers):
+    if not numbers:
+        return set()
+    async with db.execute(f'''
+        SELECT DISTINCT p.card_number FROM photocards p
+        JOIN user_card_counts c ON c.card_id = p.card_id
+        WHERE p.card_number IN ({', '.join('?' * len(numbers))})
+    ''', numbers) as cursor:
+        return {row[0] for row in await cursor.fetchall()}
+
+
+def print_report(added, changed, removed, kept, cards):
+    print(f"\n{'=' * 60}")
+    print(f"➕ {len(added)} nuevas · ✏️  {len(changed)} modificadas · ➖ {len(removed)} fuera del manifiesto")
+    print(f"{'=' * 60}")
+    for number in added:
+        card = cards[number]
+        print(f"  ➕ {number:12} {card['member_name']} ({card['group_name']}) - {card['rarity']}")
+    for number, fields in changed:
+        print(f"  ✏️  {number:12} {', '.join(fields)}")
+    for number in removed:
+        note = " (la tienen usuarios: se conserva)" if number in kept else ""
+        print(f"  ➖ {number}{note}")
+    
+    rarities = {}
+    for card in cards.values():
+        rarities[card['rarity']] = rarities.get(card['rarity'], 0) + 1
+    print(f"\n📈 {len(cards)} cartas en el manifiesto:")
+    for rarity in reversed(RARITIES):
+        if rarity in rarities:
+            print(f"   {RARITY_EMOJIS[rarity]} {rarity:12} : {rarities[rarity]:4}")
+
+
+async def ingest(args):
+    bot = KpopPhotocardBot(db_path=args.db)
+    bot.db = await aiosqlite.connect(args.db)
+    try:
+        # Mismo esquema que el bot (tablas, triggers del catálogo y FTS)
+        await bot.init_db()
+        db = bot.db
+        existing = await read_existing(db)
+        
+        rows = scan_directory(args.scan, existing) if args.scan else load_manifest(args.manifest)
+        cards, errors = normalize(rows)
+        errors += validate_images(cards, existing, args.jobs)
+        
+        if errors:
+            print(f"❌ {len(errors)} problemas:")
+            for error in errors:
+                print(f"  {error}")
+            if not args.skip_invalid:
+                print("\nNo se modificó la base (usa --skip-invalid para cargar el resto).")
+                return 1
+            cards = {number: card for number, card in cards.items() if card['image_hash']}
+        
+        added = [number for number in cards if number not in existing]
+        changed = [
+            (number, [field for field in FIELDS if existing[number][field] != card[field]])
+            for number, card in cards.items()
+            if number in existing and any(existing[number][field] != card[field] for field in FIELDS)
+        ]
+        removed = sorted(set(existing) - set(cards))
+        kept = await owned_cards(db, removed)
+        print_report(added, changed, removed, kept, cards)
+        
+        if args.dry_run:
+            print("\n(--dry-run: no se modificó la base)")
+            return 0
+        
+        upserts = [(number, *(cards[number][field] for field in FIELDS)) for number in added]
+        upserts += [(number, *(cards[number][field] for field in FIELDS)) for number, _ in changed]
+        pruned = [number for number in removed if number not in kept] if args.prune else []
+        
+        async with bot.db_lock:
+            try:
+                await db.executemany(f'''
+                    INSERT INTO photocards (card_number, {', '.join(FIELDS)})
+                    VALUES (?, {', '.join('?' * len(FIELDS))})
+                    ON CONFLICT(card_number) DO UPDATE SET
+                        {', '.join(f'{field} = excluded.{field}' for field in FIELDS if field != 'image_path')},
+                        image_path = CASE WHEN {SAME_SOURCE} THEN photocards.image_path ELSE excluded.image_path END,
+                        source_path = CASE WHEN {SAME_SOURCE} THEN photocards.source_path END
+                ''', upserts)
+                if pruned:
+                    await db.execute(
+                        f"DELETE FROM photocards WHERE card_number IN ({', '.join('?' * len(pruned))})", pruned
+                    )
+            except BaseException:
+                await db.rollback()
+                raise
+            await db.commit()
+        
+        print(f"\n✅ {len(upserts)} cartas escritas" + (f", {len(pruned)} eliminadas" if pruned else ""))
+        if removed and not args.prune:
+            print("   (las que no están en el manifiesto se conservan; usa --prune para borrarlas)")
+        if upserts or pruned:
+            print("   El bot recargará el catálogo en menos de un minuto.")
+        return 0
+    finally:
+        await bot.db.close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Carga el catálogo de photocards")
+    parser.add_argument('manifest', nargs='?', default='data/catalog.json', help="JSON, CSV o YAML")
+    parser.add_argument('--scan', metavar='DIR', help="en lugar del manifiesto, recorre DIR/<GRUPO>/")
+    parser.add_argument('--db', default=os.getenv('DB_PATH', 'kpop_bot.db'))
+    parser.add_argument('--dry-run', action='store_true', help="sólo muestra el informe")
+    parser.add_argument('--prune', action='store_true', help="borra las cartas que no están en el manifiesto (si nadie las tiene)")
+    parser.add_argument('--skip-invalid', action='store_true', help="carga las válidas aunque otras fallen")
+    parser.add_argument('--jobs', type=int, default=None, help="procesos para validar imágenes")
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    print("🎴 Cargando catálogo de photocards...\n")
+    sys.exit(asyncio.run(ingest(parse_args())))
@@ -1,3 +1,4 @@
 from .image_processor import PhotocardProcessor
+from .db import transaction
 
-__all__ = ['PhotocardProcessor']
\ No newline at end of file
+__all__ = ['PhotocardProcessor', 'transaction']
\ No newline at end of file
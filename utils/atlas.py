@@ -0,0 +1,129 @@
+import hashlib
+import mmap
+import os
+import struct
+
+from PIL import Image
+
+# Cabecera: magic, ancho, alto, radio de las esquinas, cantidad de fotos, inicio de los datos
+HEADER = struct.Struct('<8sIIIIQ')
+# Índice: card_id, hash del image_path con el que se generó la foto, offset
+ENTRY = struct.Struct('<q16sQ')
+MAGIC = b'KPCATL01'
+PAGE = mmap.ALLOCATIONGRANULARITY
+
+
+def path_digest(image_path):
+    return hashlib.blake2b((image_path or '').encode(), digest_size=16).digest()
+
+
+class SpriteAtlas:
+    """Fotos de las cartas ya recortadas y redondeadas, como RGBA crudo en un solo archivo.
+    
+    El archivo se mapea en memoria: `photo()` devuelve una imagen de PIL que
+    apunta directamente a las páginas mapeadas, sin decodificar ni copiar.
+    Varios procesos que abran el mismo atlas comparten esas páginas a través
+    de la caché del sistema operativo.
+    
+    Cada entrada recuerda el image_path con el que se generó; si la carta
+    cambió de imagen desde entonces, `photo()` devuelve None y el renderer
+    vuelve a cargar el archivo. build_assets.py --atlas lo regenera.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.width = self.height = self.corner_radius = 0
+        # (mapa, índice, ancho, alto): se reemplaza entero para que un render
+        # en otro hilo nunca combine el índice de un archivo con el mapa de otro
+        self._state = (None, {}, 0, 0)
+        self._stat = None
+        self._load()
+    
+    @classmethod
+    def open(cls, path):
+        """El atlas de `path`, o None si no existe o no es válido"""
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Atlas de fotos ignorado ({path}): {e}")
+            return None
+    
+    def _load(self):
+        with open(self.path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        magic, width, height, radius, count, data_offset = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC:
+            raise ValueError("formato desconocido")
+        
+        index = {}
+        for i in range(count):
+            card_id, digest, offset = ENTRY.unpack_from(mapped, HEADER.size + i * ENTRY.size)
+            index[card_id] = (digest, offset)
+        
+        # Las imágenes ya entregadas conservan una referencia al mapa anterior
+        self._state = (mapped, index, width, height)
+        self._stat = (stat.st_ino, stat.st_mtime_ns)
+        self.width, self.height, self.corner_radius = width, height, radius
+    
+    def refresh(self):
+        """Vuelve a mapear el archivo si build_assets.py lo reemplazó"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return
+        if (stat.st_ino, stat.st_mtime_ns) != self._stat:
+            try:
+                self._load()
+            except (OSError, ValueError, struct.error) as e:
+                print(f"Error recargando el atlas de fotos: {e}")
+    
+    def photo(self, card_id, image_path):
+        """Foto de la carta como imagen RGBA de sólo lectura, o None"""
+        # Corre en hilos de render: se lee el estado una sola vez
+        mapped, index, width, height = self._state
+        entry = index.get(card_id)
+        if entry is None or entry[0] != path_digest(image_path):
+            return None
+        offset = entry[1]
+        size = width * height * 4
+        return Image.frombuffer(
+            'RGBA', (width, height), memoryview(mapped)[offset:offset + size], 'raw', 'RGBA', 0, 1
+        )
+    
+    def __len__(self):
+        return len(self._state[1])
+    
+    @staticmethod
+    def write(path, width, height, corner_radius, entries, tiles):
+        """Escribe un atlas nuevo y reemplaza el anterior de forma atómica.
+        
+        `entries` es [(card_id, image_path)] y `tiles` un iterable con los
+        bytes RGBA de cada una, en el mismo orden.
+        """
+        tile_size = width * height * 4
+        index_end = HEADER.size + len(entries) * ENTRY.size
+        data_offset = (index_end + PAGE - 1) // PAGE * PAGE
+        
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, width, height, corner_radius, len(entries), data_offset))
+            for i, (card_id, image_path) in enumerate(entries):
+                f.write(ENTRY.pack(card_id, path_digest(image_path), data_offset + i * tile_size))
+            f.write(b'\0' * (data_offset - index_end))
+            
+            written = 0
+            for tile in tiles:
+                if len(tile) != tile_size:
+                    raise ValueError(f"tile de {len(tile)} bytes, se esperaban {tile_size}")
+                f.write(tile)
+                written += 1
+        
+        if written != len(entries):
+            os.remove(tmp_path)
+            raise ValueError(f"{written} tiles para {len(entries)} entradas")
+        # Los procesos con el atlas anterior mapeado siguen leyendo el archivo viejo
+        os.replace(tmp_path, path)
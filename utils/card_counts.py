@@ -0,0 +1,102 @@
+# Sets del progreso de colección: tipo -> clave a partir de una fila de
+# photocards. La era lleva su grupo porque dos grupos pueden repetir nombre
+SET_KEYS = {
+    'group': "{p}.group_name",
+    'era': "{p}.group_name || ' · ' || {p}.era",
+    'series': "{p}.series"
+}
+
+
+def set_rows_sql(row):
+    """SELECT de (kind, set_key) de una fila de un trigger (`NEW` u `OLD`)"""
+    return ' UNION ALL '.join(
+        f"SELECT '{kind}' AS kind, {expr.format(p=row)} AS set_key WHERE {expr.format(p=row)} IS NOT NULL"
+        for kind, expr in SET_KEYS.items()
+    )
+
+
+def card_sets_sql(condition='1'):
+    """SELECT de (card_id, kind, set_key) de las cartas que cumplen `condition` (alias p)"""
+    return ' UNION ALL '.join(
+        f"SELECT p.card_id, '{kind}' AS kind, {expr.format(p='p')} AS set_key "
+        f"FROM photocards p WHERE {condition} AND {expr.format(p='p')} IS NOT NULL"
+        for kind, expr in SET_KEYS.items()
+    )
+
+
+async def verify_card_counts(db, repair=False):
+    """Compara las proyecciones mantenidas por triggers con user_cards.
+    
+    Devuelve {proyección: filas con diferencias}. Con `repair=True` además
+    reconstruye las proyecciones desde user_cards; el commit queda a cargo
+    de quien llama.
+    """
+    actual = 'SELECT user_id, card_id, COUNT(*) FROM user_cards GROUP BY user_id, card_id'
+    projected = 'SELECT user_id, card_id, qty FROM user_card_counts'
+    # El progreso se compara contra user_cards, no contra user_card_counts
+    actual_progress = f'''
+        SELECT c.user_id, s.kind, s.set_key, COUNT(*)
+        FROM (SELECT DISTINCT user_id, card_id FROM user_cards) c
+        JOIN ({card_sets_sql()}) s ON s.card_id = c.card_id
+        GROUP BY c.user_id, s.kind, s.set_key
+    '''
+    projected_progress = 'SELECT user_id, kind, set_key, owned FROM user_set_progress'
+    actual_totals = f'SELECT kind, set_key, COUNT(*) FROM ({card_sets_sql()}) GROUP BY kind, set_key'
+    projected_totals = 'SELECT kind, set_key, total FROM set_totals'
+    
+    async with db.execute(f'''
+        SELECT (SELECT COUNT(*) FROM ({actual} EXCEPT {projected}))
+             + (SELECT COUNT(*) FROM ({projected} EXCEPT {actual}))
+    ''') as cursor:
+        card_counts_drift = (await cursor.fetchone())[0]
+    
+    async with db.execute('''
+        SELECT COUNT(*) FROM users u
+        WHERE card_count IS NOT (SELECT COUNT(*) FROM user_cards uc WHERE uc.user_id = u.user_id)
+    ''') as cursor:
+        users_drift = (await cursor.fetchone())[0]
+    
+    async with db.execute(f'''
+        SELECT (SELECT COUNT(*) FROM ({actual_progress} EXCEPT {projected_progress}))
+             + (SELECT COUNT(*) FROM ({projected_progress} EXCEPT {actual_progress}))
+    ''') as cursor:
+        progress_drift = (await cursor.fetchone())[0]
+    
+    async with db.execute(f'''
+        SELECT (SELECT COUNT(*) FROM ({actual_totals} EXCEPT {projected_totals}))
+             + (SELECT COUNT(*) FROM ({projected_totals} EXCEPT {actual_totals}))
+    ''') as cursor:
+        totals_drift = (await cursor.fetchone())[0]
+    
+    if repair and card_counts_drift:
+        # Sólo las filas con diferencias: cada INSERT/DELETE en user_card_counts
+        # dispara los triggers de progreso, que se reconstruye justo después
+        await db.execute(f'''
+            DELETE FROM user_card_counts
+            WHERE (user_id, card_id, qty) IN ({projected} EXCEPT {actual})
+        ''')
+        await db.execute(f'INSERT INTO user_card_counts (user_id, card_id, qty) {actual} EXCEPT {projected}')
+    
+    if repair and users_drift:
+        await db.execute('''
+            UPDATE users SET card_count = (
+                SELECT COUNT(*) FROM user_cards WHERE user_cards.user_id = users.user_id
+            )
+        ''')
+    
+    # Los triggers aplican deltas sobre un progreso que ya podía estar mal:
+    # si se tocaron los conteos se reconstruye aunque antes no difiriera
+    if repair and (progress_drift or card_counts_drift):
+        await db.execute('DELETE FROM user_set_progress')
+        await db.execute(f'INSERT INTO user_set_progress (user_id, kind, set_key, owned) {actual_progress}')
+    
+    if repair and totals_drift:
+        await db.execute('DELETE FROM set_totals')
+        await db.execute(f'INSERT INTO set_totals (kind, set_key, total) {actual_totals}')
+    
+    return {
+        'user_card_counts': card_counts_drift,
+        'users.card_count': users_drift,
+        'user_set_progress': progress_drift,
+        'set_totals': totals_drift
+    }
@@ -0,0 +1,134 @@
+import bisect
+import difflib
+import re
+
+# Peso de cada columna de photocards_fts en bm25(), en el orden de la tabla
+# (card_number, group_name, member_name, era, series): el número de carta y
+# el miembro pesan más
+SEARCH_WEIGHTS = (10.0, 2.0, 5.0, 1.0, 0.5)
+
+
+class CardSearch:
+    """Búsqueda de photocards sobre el índice FTS5 (trigram) `photocards_fts`.
+    
+    - Consultas de 3+ caracteres: cada palabra se busca como subcadena en
+      cualquier columna, ordenado por coincidencia exacta y luego bm25.
+    - Sin resultados: búsqueda difusa por trigramas sueltos (OR), re-ordenada
+      por similitud para tolerar errores de tipeo.
+    - Consultas cortas (el trigram no indexa menos de 3 caracteres) y el
+      autocompletado usan un índice de prefijos en memoria.
+    """
+    
+    def __init__(self, db, catalog):
+        self.db = db
+        self.catalog = catalog
+        self._prefix_keys = []      # claves ordenadas para bisect
+        self._prefix_cards = []     # (card_id, etiqueta) alineado con las claves
+    
+    def refresh(self):
+        """Reconstruye el índice de prefijos desde el catálogo"""
+        entries = []
+        for card in self.catalog:
+            label = f"{card.member} - {card.group} ({card.era or 'N/A'}) · {card.card_number}"
+            for key in (card.member, card.group, card.card_number,
+                        f"{card.member} {card.group}", f"{card.group} {card.member}"):
+                entries.append((self._normalize(key), card.card_id, label))
+        
+        entries.sort()
+        self._prefix_keys = [key for key, _, _ in entries]
+        self._prefix_cards = [(card_id, label) for _, card_id, label in entries]
+    
+    def autocomplete(self, prefix, limit=25):
+        """[(card_id, etiqueta)] de cartas cuyo nombre empieza por `prefix`"""
+        prefix = self._normalize(prefix)
+        start = bisect.bisect_left(self._prefix_keys, prefix)
+        
+        results = {}
+        for i in range(start, len(self._prefix_keys)):
+            if not self._prefix_keys[i].startswith(prefix) or len(results) >= limit:
+                break
+            card_id, label = self._prefix_cards[i]
+            results.setdefault(card_id, label)
+        
+        return list(results.items())
+    
+    async def search(self, query, limit=25):
+        """Cartas (Card) ordenadas de mejor a peor coincidencia"""
+        query = self._normalize(query)
+        if not query:
+            return []
+        
+        words = query.split()
+        if all(len(word) < 3 for word in words):
+            return [self.catalog.get(card_id) for card_id, _ in self.autocomplete(query, limit)]
+        
+        # Cada palabra larga como frase (subcadena); las cortas no filtran
+        match = ' AND '.join(self._quote(word) for word in words if len(word) >= 3)
+        rows = await self._match(match, query, limit)
+        if rows:
+            return rows
+        
+        return await self._fuzzy_search(query, limit)
+    
+    def is_exact(self, card, query):
+        """¿La carta coincide exactamente con la consulta (miembro o número)?"""
+        query = self._normalize(query)
+        return query in (
+            self._normalize(card.member), self._normalize(card.card_number),
+            self._normalize(f"{card.member} {card.group}"), self._normalize(f"{card.group} {card.member}")
+        )
+    
+    async def _match(self, match, query, limit):
+        weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+        async with self.db.execute(f'''
+            SELECT rowid
+            FROM photocards_fts
+            WHERE photocards_fts MATCH ?
+            ORDER BY (LOWER(member_name) = ? OR LOWER(card_number) = ?) DESC,
+                     bm25(photocards_fts, {weights})
+            LIMIT ?
+        ''', (match, query, query, limit)) as cursor:
+            rows = await cursor.fetchall()
+        
+        # Los metadatos salen del catálogo en memoria; se omiten cartas que
+        # todavía no llegaron al catálogo (recarga pendiente)
+        cards = (self.catalog.get(card_id) for card_id, in rows)
+        return [card for card in cards if card is not None]
+    
+    async def _fuzzy_search(self, query, limit):
+        trigrams = {
+            word[i:i + 3]
+            for word in query.split()
+            for i in range(len(word) - 2)
+        }
+        if not trigrams:
+            return []
+        
+        # Candidatos que comparten algún trigrama; bm25 premia a los que
+        # comparten más. Se re-ordenan por similitud y se descartan los lejanos.
+        candidates = await self._match(
+            ' OR '.join(self._quote(trigram) for trigram in sorted(trigrams)),
+            query,
+            limit * 4
+        )
+        
+        scored = []
+        for card in candidates:
+            score = max(
+                difflib.SequenceMatcher(None, query, self._normalize(text)).ratio()
+                for text in (card.member, card.group, card.card_number, card.era or '',
+                             f"{card.member} {card.group}")
+            )
+            if score >= 0.6:
+                scored.append((score, card))
+        
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [card for _, card in scored[:limit]]
+    
+    @staticmethod
+    def _normalize(text):
+        return re.sub(r'\s+', ' ', text or '').strip().lower()
+    
+    @staticmethod
+    def _quote(text):
+        return '"' + text.replace('"', '""') + '"'
@@ -0,0 +1,132 @@
+import random
+
+from discord.ext import tasks
+
+
+class Card:
+    """Fila de photocards en memoria (metadatos estáticos de una carta)"""
+    
+    __slots__ = ('card_id', 'card_number', 'group', 'member', 'era', 'rarity', 'image_path', 'series')
+    
+    def __init__(self, card_id, card_number, group, member, era, rarity, image_path, series):
+        self.card_id = card_id
+        self.card_number = card_number
+        self.group = group
+        self.member = member
+        self.era = era
+        self.rarity = rarity
+        self.image_path = image_path
+        self.series = series or 'S1'
+    
+    def render_data(self, serial=None):
+        """Datos que espera PhotocardProcessor.create_photocard"""
+        return {
+            'card_id': self.card_id,
+            'rarity': self.rarity,
+            'card_number': self.card_number,
+            'member': self.member,
+            'group': self.group,
+            'era': self.era,
+            'series': self.series,
+            'serial': serial
+        }
+    
+    def __repr__(self):
+        return f"<Card {self.card_id} {self.card_number} {self.member} ({self.group})>"
+
+
+class Catalog:
+    """Catálogo de photocards cargado una vez en memoria.
+    
+    Los metadatos de las cartas casi nunca cambian, así que los cogs los
+    consultan aquí en lugar de ir a SQLite. Los triggers de photocards
+    incrementan `catalog_meta.catalog_version`; un loop compara esa versión
+    y recarga si otro proceso (por ejemplo ingest_cards.py) modificó el
+    catálogo. `reload()` fuerza la recarga.
+    """
+    
+    def __init__(self, db):
+        self.db = db
+        self.version = None
+        self.on_reload = []     # callbacks sin argumentos tras cada recarga
+        
+        self._by_id = {}
+        self._by_number = {}
+        self._by_rarity = {}
+        self._by_group = {}
+    
+    def start(self):
+        self.watch_version.start()
+    
+    def stop(self):
+        self.watch_version.cancel()
+    
+    async def reload(self):
+        async with self.db.execute('''
+            SELECT card_id, card_number, group_name, member_name, era, rarity, image_path, series
+            FROM photocards
+            ORDER BY card_id
+        ''') as cursor:
+            rows = await cursor.fetchall()
+        
+        by_id, by_number, by_rarity, by_group = {}, {}, {}, {}
+        for row in rows:
+            card = Card(*row)
+            by_id[card.card_id] = card
+            by_number[card.card_number.lower()] = card
+            by_rarity.setdefault(card.rarity, []).append(card)
+            by_group.setdefault(card.group.lower(), []).append(card)
+        
+        self._by_id = by_id
+        self._by_number = by_number
+        self._by_rarity = {rarity: tuple(cards) for rarity, cards in by_rarity.items()}
+        self._by_group = {group: tuple(cards) for group, cards in by_group.items()}
+        self.version = await self._read_version()
+        
+        for callback in self.on_reload:
+            callback()
+    
+    async def check_version(self):
+        """Recarga si la versión guardada cambió; devuelve True si recargó"""
+        if await self._read_version() == self.version:
+            return False
+        await self.reload()
+        return True
+    
+    async def _read_version(self):
+        async with self.db.execute(
+            "SELECT value FROM catalog_meta WHERE key = 'catalog_version'"
+        ) as cursor:
+            row = await cursor.fetchone()
+        return row[0] if row else 0
+    
+    @tasks.loop(minutes=1)
+    async def watch_version(self):
+        if await self.check_version():
+            print(f"Catálogo recargado: {len(self)} cartas (versión {self.version})")
+    
+    def __len__(self):
+        return len(self._by_id)
+    
+    def __iter__(self):
+        return iter(self._by_id.values())
+    
+    def get(self, card_id):
+        return self._by_id.get(card_id)
+    
+    def by_number(self, card_number):
+        return self._by_number.get(card_number.lower())
+    
+    def by_rarity(self, rarity):
+        return self._by_rarity.get(rarity, ())
+    
+    def by_group(self, group):
+        return self._by_group.get(group.lower(), ())
+    
+    def groups(self):
+        return sorted({card.group for card in self._by_id.values()})
+    
+    def random_card(self, rarity):
+        """Carta aleatoria de una rareza, o None si no hay ninguna"""
+        cards = self._by_rarity.get(rarity)
+        return random.choice(cards) if cards else None
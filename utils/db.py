@@ -0,0 +1,134 @@
+import asyncio
+import re
+import time
+from contextlib import asynccontextmanager, nullcontext
+
+from aiosqlite.context import Result
+
+from . import metrics
+
+
+@asynccontextmanager
+async def transaction(bot):
+    """Ejecuta un bloque de escrituras como una única transacción.
+    
+    Todos los cogs comparten la misma conexión, así que un `commit()` de otro
+    comando en medio de nuestras sentencias confirmaría trabajo a medias.
+    El lock del bot serializa las transacciones de escritura; si el bloque
+    lanza una excepción se hace rollback, si no, commit.
+    """
+    async with bot.db_lock:
+        try:
+            yield bot.db
+        except BaseException:
+            await bot.db.rollback()
+            raise
+        else:
+            await bot.db.commit()
+
+
+QUERY_SECONDS = metrics.histogram(
+    'kpc_db_query_seconds', 'Duración de cada sentencia SQL', ('statement',)
+)
+
+
+def normalize_sql(sql):
+    """Forma canónica de una sentencia: espacios colapsados y listas IN (?, ?, ...) plegadas"""
+    sql = ' '.join(sql.split())
+    return re.sub(r'\?(?:\s*,\s*\?)+', '?, ...', sql)
+
+
+class QueryStats:
+    """Acumulado de una sentencia normalizada"""
+    
+    __slots__ = ('count', 'total', 'max')
+    
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def add(self, elapsed):
+        self.count += 1
+        self.total += elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+
+
+class InstrumentedConnection:
+    """Envuelve la conexión aiosqlite para medir cada sentencia.
+    
+    `execute` y `executemany` devuelven el mismo objeto que aiosqlite (se
+    puede usar con `await` o con `async with`); el resto de atributos pasan
+    directamente a la conexión original.
+    
+    Cada sentencia suma su tiempo (preparación y primer paso, que es donde
+    SQLite ordena y agrega) a las estadísticas de su SQL normalizado. Las que
+    superan `slow_threshold` segundos se registran junto con su
+    `EXPLAIN QUERY PLAN`, obtenido en segundo plano para no alargar más la
+    consulta lenta. Con `lock` (el `db_lock` del bot) el plan se pide fuera
+    de cualquier transacción abierta.
+    """
+    
+    def __init__(self, conn, slow_threshold=0.1, lock=None):
+        self._conn = conn
+        self.slow_threshold = slow_threshold
+        self.lock = lock
+        self.stats = {}             # SQL normalizado -> QueryStats
+        self._normalized = {}       # SQL original -> normalizado (las sentencias se repiten)
+        self._pending = set()       # tareas de _log_slow; el loop sólo guarda referencias débiles
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+    
+    def execute(self, sql, parameters=None):
+        return Result(self._timed(self._conn.execute(sql, parameters), sql, parameters))
+    
+    def executemany(self, sql, parameters):
+        return Result(self._timed(self._conn.executemany(sql, parameters), sql, None))
+    
+    def top(self, limit=10):
+        """[(sql, QueryStats)] ordenado por tiempo total"""
+        return sorted(self.stats.items(), key=lambda item: item[1].total, reverse=True)[:limit]
+        
+    def reset_stats(self):
+        self.stats.clear()
+    
+    async def _timed(self, operation, sql, parameters):
+        started = time.perf_counter()
+        try:
+            return await operation
+        finally:
+            elapsed = time.perf_counter() - started
+            statement = self._normalized.get(sql)
+            if statement is None:
+                statement = self._normalized[sql] = normalize_sql(sql)
+            
+            stats = self.stats.get(statement)
+            if stats is None:
+                stats = self.stats[statement] = QueryStats()
+            stats.add(elapsed)
+            QUERY_SECONDS.observe(elapsed, statement=statement)
+            
+            if elapsed >= self.slow_threshold and not sql.lstrip().upper().startswith('EXPLAIN'):
+                task = asyncio.create_task(self._log_slow(sql, parameters, statement, elapsed))
+                self._pending.add(task)
+                task.add_done_callback(self._pending.discard)
+    
+    async def close(self):
+        for task in self._pending:
+            task.cancel()
+        await self._conn.close()
+    
+    async def _log_slow(self, sql, parameters, statement, elapsed):
+        if parameters is None:
+            # executemany: el plan no depende de los valores, basta con NULLs
+            parameters = (None,) * sql.count('?')
+        try:
+            async with self.lock or nullcontext():
+                async with self._conn.execute(f'EXPLAIN QUERY PLAN {sql}', parameters) as cursor:
+                    plan = '\n'.join(f"  {row[3]}" for row in await cursor.fetchall())
+        except Exception as e:
+            plan = f"  (sin plan: {e})"
+        
+        print(f"🐢 Consulta lenta ({elapsed * 1000:.0f} ms): {statement}\n{plan}")
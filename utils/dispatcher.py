@@ -0,0 +1,305 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+
+import discord
+
+# Prioridades (menor sale antes)
+REPLY = 0           # respuestas que el usuario está esperando
+INTERACTIVE = 1     # reacciones necesarias para interactuar con un drop
+CLEANUP = 2         # limpieza cosmética: expirar drops, borrar mensajes...
+
+PRIORITY_NAMES = {REPLY: 'reply', INTERACTIVE: 'interactive', CLEANUP: 'cleanup'}
+
+# Límites por canal de Discord: (peticiones, segundos)
+BUCKET_LIMITS = {
+    'messages': (5, 5.0),
+    'reactions': (1, 0.25)
+}
+
+# Bucket que consume cada tipo de operación
+ROUTES = {
+    'send': 'messages',
+    'edit': 'messages',
+    'delete': 'messages',
+    'add_reaction': 'reactions',
+    'remove_reaction': 'reactions',
+    'clear_reactions': 'reactions'
+}
+
+# Operaciones sobre un mensaje que pierden sentido si el mensaje se borra
+SUPERSEDED_BY_DELETE = ('edit', 'add_reaction', 'remove_reaction', 'clear_reactions')
+
+
+class _Bucket:
+    """Token bucket local que imita el límite de Discord para una ruta"""
+    
+    def __init__(self, rate, per):
+        self.rate = rate
+        self.per = per
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.blocked_until = 0
+    
+    def delay(self):
+        """Segundos hasta poder hacer la siguiente petición (0 si ya se puede)"""
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.per)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) * self.per / self.rate
+    
+    def consume(self):
+        self.tokens -= 1
+    
+    def rest_in(self):
+        """Segundos hasta que el bucket vuelva a estar lleno (sin estado que recordar)"""
+        full_at = self.updated + (self.rate - self.tokens) * self.per / self.rate
+        return max(0.0, full_at - time.monotonic())
+    
+    def block(self, seconds):
+        """Vacía el bucket tras un 429 hasta que pase `retry_after`"""
+        self.blocked_until = time.monotonic() + seconds
+        self.updated = self.blocked_until
+        self.tokens = 0
+
+
+class _Operation:
+    __slots__ = ('priority', 'seq', 'kind', 'message_id', 'func', 'args', 'kwargs',
+                 'future', 'wait', 'enqueued_at')
+    
+    def __init__(self, priority, seq, kind, message_id, func, args, kwargs, wait):
+        self.priority = priority
+        self.seq = seq
+        self.kind = kind
+        self.message_id = message_id
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.future = asyncio.get_running_loop().create_future()
+        self.wait = wait
+        self.enqueued_at = time.monotonic()
+    
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class _ChannelQueue:
+    def __init__(self, channel_id):
+        self.channel_id = channel_id
+        self.heap = []
+        self.buckets = {route: _Bucket(*limits) for route, limits in BUCKET_LIMITS.items()}
+        self.worker = None
+
+
+class OutboundDispatcher:
+    """Cola de salida por canal para mensajes, ediciones y reacciones.
+    
+    Cada canal tiene su propia cola con prioridad y un worker que respeta
+    los límites de Discord con buckets locales, así las ráfagas se ordenan
+    aquí en lugar de chocar con 429 y dormir dentro de discord.py. Las
+    operaciones redundantes se fusionan: dos ediciones pendientes del mismo
+    mensaje se combinan y un borrado descarta las ediciones y reacciones
+    que aún no salieron.
+    
+    `send` se espera y devuelve el mensaje (o propaga el error); el resto,
+    incluido `post` (un envío del que no se necesita el mensaje), devuelve
+    un future que no hace falta esperar y registra sus fallos.
+    """
+    
+    LATENCY_SAMPLES = 500
+    
+    def __init__(self):
+        self._channels = {}
+        self._seq = itertools.count()
+        self._latencies = {priority: deque(maxlen=self.LATENCY_SAMPLES) for priority in PRIORITY_NAMES}
+        self.coalesced = 0
+        self.rate_limited = 0
+        self.failed = 0
+    
+    async def send(self, channel, priority=REPLY, **kwargs):
+        return await self._submit(channel.id, priority, 'send', None, channel.send, (), kwargs, wait=True)
+    
+    def post(self, channel, priority=REPLY, **kwargs):
+        return self._submit(channel.id, priority, 'send', None, channel.send, (), kwargs)
+    
+    def edit(self, message, priority=CLEANUP, **kwargs):
+        pending = self._pending(message.channel.id, message.id, ('edit',))
+        if pending:
+            # La última edición gana campo a campo
+            op = pending[0]
+            op.kwargs.update(kwargs)
+            self._raise_priority(message.channel.id, op, priority)
+            self.coalesced += 1
+            return op.future
+        return self._submit(message.channel.id, priority, 'edit', message.id, message.edit, (), kwargs)
+    
+    def delete(self, message, priority=CLEANUP):
+        pending = self._pending(message.channel.id, message.id, ('delete',))
+        if pending:
+            return pending[0].future
+        
+        for op in self._pending(message.channel.id, message.id, SUPERSEDED_BY_DELETE):
+            op.future.set_result(None)
+            self.coalesced += 1
+        return self._submit(message.channel.id, priority, 'delete', message.id, message.delete, (), {})
+    
+    def add_reactions(self, message, emojis, priority=INTERACTIVE):
+        return [
+            self._submit(message.channel.id, priority, 'add_reaction', message.id,
+                         message.add_reaction, (emoji,), {})
+            for emoji in emojis
+        ]
+    
+    def remove_reaction(self, message, emoji, member, priority=CLEANUP):
+        return self._submit(message.channel.id, priority, 'remove_reaction', message.id,
+                            message.remove_reaction, (emoji, member), {})
+    
+    def clear_reactions(self, message, priority=CLEANUP):
+        # Quitar todas las reacciones hace innecesarias las que faltaban por poner
+        for op in self._pending(message.channel.id, message.id, ('add_reaction', 'remove_reaction')):
+            op.future.set_result(None)
+            self.coalesced += 1
+        return self._submit(message.channel.id, priority, 'clear_reactions', message.id,
+                            message.clear_reactions, (), {})
+    
+    def stats(self):
+        """Profundidad de las colas y latencia (encolado -> enviado) por prioridad"""
+        depth = {name: 0 for name in PRIORITY_NAMES.values()}
+        for queue in self._channels.values():
+            for op in queue.heap:
+                if not op.future.done():
+                    depth[PRIORITY_NAMES[op.priority]] += 1
+        
+        latency = {}
+        for priority, samples in self._latencies.items():
+            ordered = sorted(samples)
+            if ordered:
+                latency[PRIORITY_NAMES[priority]] = {
+                    'p50': ordered[len(ordered) // 2],
+                    'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                    'max': ordered[-1],
+                    'samples': len(ordered)
+                }
+        
+        return {
+            'depth': depth,
+            'latency': latency,
+            'active_channels': sum(1 for queue in self._channels.values() if queue.worker),
+            'coalesced': self.coalesced,
+            'rate_limited': self.rate_limited,
+            'failed': self.failed
+        }
+    
+    async def close(self):
+        for queue in self._channels.values():
+            if queue.worker:
+                queue.worker.cancel()
+            for op in queue.heap:
+                if not op.future.done():
+                    op.future.cancel()
+        self._channels.clear()
+    
+    def _submit(self, channel_id, priority, kind, message_id, func, args, kwargs, wait=False):
+        op = _Operation(priority, next(self._seq), kind, message_id, func, args, kwargs, wait)
+        queue = self._channels.get(channel_id)
+        if queue is None:
+            queue = self._channels[channel_id] = _ChannelQueue(channel_id)
+        
+        heapq.heappush(queue.heap, op)
+        if queue.worker is None:
+            queue.worker = asyncio.create_task(self._run(queue))
+        return op.future
+    
+    def _pending(self, channel_id, message_id, kinds):
+        queue = self._channels.get(channel_id)
+        if queue is None:
+            return []
+        return [
+            op for op in queue.heap
+            if op.message_id == message_id and op.kind in kinds and not op.future.done()
+        ]
+    
+    def _raise_priority(self, channel_id, op, priority):
+        if priority < op.priority:
+            op.priority = priority
+            heapq.heapify(self._channels[channel_id].heap)
+    
+    async def _run(self, queue):
+        try:
+            while queue.heap:
+                op = heapq.heappop(queue.heap)
+                if op.future.done():
+                    continue    # fusionada o descartada mientras esperaba
+                
+                bucket = queue.buckets[ROUTES[op.kind]]
+                delay = bucket.delay()
+                if delay > 0:
+                    # Se devuelve a la cola: al despertar puede haber algo más urgente
+                    heapq.heappush(queue.heap, op)
+                    await asyncio.sleep(delay)
+                    continue
+                
+                bucket.consume()
+                try:
+                    result = await op.func(*op.args, **op.kwargs)
+                except discord.RateLimited as e:
+                    self._retry_later(queue, bucket, op, e.retry_after)
+                    continue
+                except discord.HTTPException as e:
+                    if e.status == 429:
+                        retry_after = float(e.response.headers.get('Retry-After', 1))
+                        self._retry_later(queue, bucket, op, retry_after)
+                    else:
+                        self._fail(op, e)
+                    continue
+                except Exception as e:
+                    self._fail(op, e)
+                    continue
+                
+                self._latencies[op.priority].append(time.monotonic() - op.enqueued_at)
+                if not op.future.done():
+                    op.future.set_result(result)
+        finally:
+            queue.worker = None
+            self._release_when_idle(queue)
+    
+    def _release_when_idle(self, queue):
+        """Quita la cola de un canal sin trabajo pendiente.
+        
+        Sólo cuando sus buckets se llenaron de nuevo: antes de eso una cola
+        nueva olvidaría el límite (o el 429) que el canal todavía tiene.
+        Así `_channels` no crece con cada canal que alguna vez recibió algo.
+        """
+        if queue.worker is not None or queue.heap or self._channels.get(queue.channel_id) is not queue:
+            return
+        rest = max(bucket.rest_in() for bucket in queue.buckets.values())
+        if rest > 0:
+            asyncio.get_running_loop().call_later(rest, self._release_when_idle, queue)
+            return
+        del self._channels[queue.channel_id]
+    
+    def _retry_later(self, queue, bucket, op, retry_after):
+        self.rate_limited += 1
+        bucket.block(retry_after)
+        heapq.heappush(queue.heap, op)
+    
+    def _fail(self, op, error):
+        self.failed += 1
+        if op.future.done():
+            return
+        if op.wait:
+            op.future.set_exception(error)
+            return
+        
+        # Nadie espera estas operaciones: se registran en lugar de propagarse.
+        # Que el mensaje ya no exista al limpiarlo es normal.
+        if not (isinstance(error, discord.NotFound) and op.priority == CLEANUP):
+            print(f"Error en operación '{op.kind}' (mensaje {op.message_id}): {error}")
+        op.future.set_result(None)
@@ -1,10 +1,24 @@
 from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageOps
+from collections import OrderedDict
+import hashlib
 import io
+import json
 import os
 import math
+import threading
+
+from . import metrics
+from .metrics import CACHE_REQUESTS
+
+RENDER_SECONDS = metrics.histogram(
+    'kpc_render_stage_seconds', 'Tiempo de render de una photocard por etapa', ('stage',)
+)
 
 class PhotocardProcessor:
-    def __init__(self):
+    # Incrementar al cambiar el diseño: invalida las URLs cacheadas de renders anteriores
+    RENDER_VERSION = 1
+    
+    def __init__(self, atlas=None):
         self.photo_width = 600
         self.photo_height = 900
         
@@ -25,6 +39,15 @@ class PhotocardProcessor:
         
         # Compatibilidad con versiones antiguas de Pillow
         self.resample_method = Image.Resampling.LANCZOS if hasattr(Image, 'Resampling') else Image.LANCZOS
+        
+        # Atlas mapeado en memoria con las fotos ya procesadas (opcional);
+        # sólo sirve si se generó con la misma geometría y redondeo
+        self.atlas = None
+        if atlas is not None:
+            if (atlas.width, atlas.height, atlas.corner_radius) == (self.photo_width, self.photo_height, self.corner_radius):
+                self.atlas = atlas
+            else:
+                print("Atlas de fotos ignorado: se generó con otra geometría (regenerar con build_assets.py --atlas)")
     
     def _get_font_path(self):
         """Intenta cargar una fuente personalizada primero"""
@@ -40,6 +63,17 @@ class PhotocardProcessor:
         return None
     
     def create_photocard(self, image_path, card_data):
+        canvas = self.render_card(image_path, card_data)
+        
+        # Output
+        with RENDER_SECONDS.time(stage='encode'):
+            img_bytes = io.BytesIO()
+            canvas.save(img_bytes, format='PNG', quality=95)
+            img_bytes.seek(0)
+        return img_bytes
+    
+    def render_card(self, image_path, card_data):
+        """Dibuja la carta completa y la devuelve como imagen de PIL, sin codificar"""
         rarity = card_data.get('rarity', 'Common')
         colors = self.rarity_theme.get(rarity, ('#555555', '#333333'))
         
@@ -48,62 +82,78 @@ class PhotocardProcessor:
         total_height = self.photo_height + self.border_size + self.info_height
         
         # 2. Crear Fondo con Degradado y Textura
-        canvas = self._create_textured_background(total_width, total_height, colors[0], colors[1])
-        draw = ImageDraw.Draw(canvas)
+        with RENDER_SECONDS.time(stage='background'):
+            canvas = self._create_textured_background(total_width, total_height, colors[0], colors[1])
+            draw = ImageDraw.Draw(canvas)
         
-        # 3. Procesar Imagen del Idol (Recorte + Redondeo)
-        try:
-            img = Image.open(image_path).convert("RGBA")
-            # Crop to fill
-            img_ratio = img.width / img.height
-            target_ratio = self.photo_width / self.photo_height
+        with RENDER_SECONDS.time(stage='photo'):
+            # 3. Procesar Imagen del Idol (Recorte + Redondeo), del atlas si está
+            img = None
+            if self.atlas is not None:
+                img = self.atlas.photo(card_data.get('card_id'), image_path)
+            if img is None:
+                img = self._load_photo(image_path)
             
-            if img_ratio > target_ratio:
-                new_width = int(self.photo_height * img_ratio)
-                img = img.resize((new_width, self.photo_height), self.resample_method)
-                left = (new_width - self.photo_width) // 2
-                img = img.crop((left, 0, left + self.photo_width, self.photo_height))
-            else:
-                new_height = int(self.photo_width / img_ratio)
-                img = img.resize((self.photo_width, new_height), self.resample_method)
-                top = (new_height - self.photo_height) // 2
-                img = img.crop((0, top, self.photo_width, top + self.photo_height))
+            # 4. Pegar Imagen (con sombra detrás para profundidad)
+            photo_x = self.border_size
+            photo_y = self.border_size
             
-            # Redondear esquinas de la foto
-            img = self._round_corners(img, self.corner_radius)
+            # Sombra de la foto
+            shadow = Image.new('RGBA', (self.photo_width, self.photo_height), (0,0,0,0))
+            shadow_draw = ImageDraw.Draw(shadow)
+            # Ajuste para evitar error de coordenadas en Pillow viejos
+            shadow_draw.rounded_rectangle([(0,0), (self.photo_width-1, self.photo_height-1)], radius=self.corner_radius, fill=(0,0,0,80))
+            canvas.paste(shadow, (photo_x + 10, photo_y + 10), shadow)
             
-        except Exception as e:
-            print(f"Error imagen: {e}")
-            # Fondo blanco si falla la imagen
-            img = Image.new('RGBA', (self.photo_width, self.photo_height), 'white')
-            img = self._round_corners(img, self.corner_radius)
-
-        # 4. Pegar Imagen (con sombra detrás para profundidad)
-        photo_x = self.border_size
-        photo_y = self.border_size
-        
-        # Sombra de la foto
-        shadow = Image.new('RGBA', (self.photo_width, self.photo_height), (0,0,0,0))
-        shadow_draw = ImageDraw.Draw(shadow)
-        # Ajuste para evitar error de coordenadas en Pillow viejos
-        shadow_draw.rounded_rectangle([(0,0), (self.photo_width-1, self.photo_height-1)], radius=self.corner_radius, fill=(0,0,0,80))
-        canvas.paste(shadow, (photo_x + 10, photo_y + 10), shadow)
-        
-        # Foto real
-        canvas.paste(img, (photo_x, photo_y), img)
+            # Foto real
+            canvas.paste(img, (photo_x, photo_y), img)
         
         # 5. Textos e Información
-        self._draw_stylish_text(canvas, draw, card_data, total_width, total_height, colors[1])
+        with RENDER_SECONDS.time(stage='text'):
+            self._draw_stylish_text(canvas, draw, card_data, total_width, total_height, colors[1])
         
         # 6. Overlay Brillante (Holográfico simple)
         if rarity in ['Epic', 'Legendary']:
-            self._add_shine_overlay(canvas)
+            with RENDER_SECONDS.time(stage='overlay'):
+                self._add_shine_overlay(canvas)
+        return canvas
 
-        # Output
-        img_bytes = io.BytesIO()
-        canvas.save(img_bytes, format='PNG', quality=95)
-        img_bytes.seek(0)
-        return img_bytes
+    def fit_photo(self, img):
+        """Recorta y escala una imagen para llenar exactamente el hueco de la foto"""
+        img_ratio = img.width / img.height
+        target_ratio = self.photo_width / self.photo_height
+        
+        if img_ratio > target_ratio:
+            new_width = int(self.photo_height * img_ratio)
+            img = img.resize((new_width, self.photo_height), self.resample_method)
+            left = (new_width - self.photo_width) // 2
+            return img.crop((left, 0, left + self.photo_width, self.photo_height))
+        
+        new_height = int(self.photo_width / img_ratio)
+        img = img.resize((self.photo_width, new_height), self.resample_method)
+        top = (new_height - self.photo_height) // 2
+        return img.crop((0, top, self.photo_width, top + self.photo_height))
+    
+    def _load_photo(self, image_path):
+        """Abre la foto del idol, la recorta al tamaño de la carta y redondea las esquinas"""
+        try:
+            img = Image.open(image_path)
+            # Paleta, grises, 16 bits o CMYK no admiten la máscara de las esquinas
+            if img.mode != "RGBA":
+                img = img.convert("RGBA")
+            # Los masters de build_assets.py ya tienen la geometría exacta:
+            # se usan tal cual, sin remuestreo
+            if img.size != (self.photo_width, self.photo_height):
+                img = self.fit_photo(img)
+            
+            # Redondear esquinas de la foto
+            return self._round_corners(img, self.corner_radius)
+            
+        except Exception as e:
+            print(f"Error imagen: {e}")
+            # Fondo blanco si falla la imagen
+            img = Image.new('RGBA', (self.photo_width, self.photo_height), 'white')
+            return self._round_corners(img, self.corner_radius)
 
     def _create_textured_background(self, w, h, color_start, color_end):
         """Crea un degradado vertical y añade líneas de textura"""
@@ -277,4 +327,133 @@ class PhotocardProcessor:
         grid_bytes = io.BytesIO()
         grid.save(grid_bytes, format='PNG')
         grid_bytes.seek(0)
-        return grid_bytes
\ No newline at end of file
+        return grid_bytes
+
+
+class BinderRenderer:
+    """Páginas del binder: un mosaico de miniaturas de cartas.
+    
+    Cada miniatura es el render completo de la carta reducido una sola vez
+    y guardado en memoria; las cartas que el usuario no tiene se pegan en
+    gris. La página ya codificada se guarda con una clave que resume su
+    contenido (cartas, imágenes y copias de cada una), así que sólo se
+    vuelve a componer cuando cambia alguna de sus cartas.
+    
+    Se usa desde hilos (asyncio.to_thread): las cachés van con un lock.
+    """
+    
+    # Incrementar al cambiar el diseño de la página
+    LAYOUT_VERSION = 1
+    COLS = 6
+    ROWS = 5
+    PAGE_SIZE = COLS * ROWS
+    SCALE = 5           # 700x1230 -> 140x246
+    PADDING = 12
+    
+    def __init__(self, processor, max_thumbnails=512, max_pages=32):
+        self.processor = processor
+        self.thumb_width = (processor.photo_width + processor.border_size * 2) // self.SCALE
+        self.thumb_height = (processor.photo_height + processor.border_size + processor.info_height) // self.SCALE
+        self.max_thumbnails = max_thumbnails
+        self.max_pages = max_pages
+        
+        self._thumbnails = OrderedDict()    # clave -> miniatura RGB
+        self._pages = OrderedDict()         # clave -> JPEG de la página
+        self._lock = threading.Lock()
+        
+        try:
+            self.font = ImageFont.truetype(processor.font_path, 20) if processor.font_path else ImageFont.load_default()
+        except OSError:
+            self.font = ImageFont.load_default()
+    
+    def thumbnail_key(self, image_path, card_data):
+        return self._digest(PhotocardProcessor.RENDER_VERSION, image_path, card_data)
+    
+    def page_key(self, entries):
+        return self._digest(
+            PhotocardProcessor.RENDER_VERSION, self.LAYOUT_VERSION,
+            [(self.thumbnail_key(image_path, card_data), qty) for image_path, card_data, qty in entries]
+        )
+    
+    def thumbnail(self, image_path, card_data):
+        """Miniatura de la carta (sin serial), renderizada sólo la primera vez"""
+        key = self.thumbnail_key(image_path, card_data)
+        thumb = self._get(self._thumbnails, key, 'thumbnail')
+        if thumb is None:
+            with RENDER_SECONDS.time(stage='thumbnail'):
+                card = self.processor.render_card(image_path, card_data)
+                thumb = card.resize(
+                    (self.thumb_width, self.thumb_height), self.processor.resample_method, reducing_gap=3.0
+                )
+            self._put(self._thumbnails, key, thumb, self.max_thumbnails)
+        return thumb
+    
+    def render_page(self, entries):
+        """JPEG de una página del binder.
+        
+        `entries` es [(image_path, card_data, copias)], a lo sumo PAGE_SIZE;
+        con 0 copias la carta se muestra en gris.
+        """
+        key = self.page_key(entries)
+        page = self._get(self._pages, key, 'binder_page')
+        if page is None:
+            thumbs = [self.thumbnail(image_path, card_data) for image_path, card_data, _ in entries]
+            with RENDER_SECONDS.time(stage='binder'):
+                page = self._compose(thumbs, [qty for _, _, qty in entries])
+            self._put(self._pages, key, page, self.max_pages)
+        return io.BytesIO(page)
+    
+    def _compose(self, thumbs, quantities):
+        w, h, pad = self.thumb_width, self.thumb_height, self.PADDING
+        cols = min(self.COLS, len(thumbs)) or 1
+        rows = (len(thumbs) + cols - 1) // cols or 1
+        
+        page = Image.new('RGB', (cols * w + (cols + 1) * pad, rows * h + (rows + 1) * pad), '#121212')
+        draw = ImageDraw.Draw(page)
+        
+        for idx, (thumb, qty) in enumerate(zip(thumbs, quantities)):
+            x = pad + (idx % cols) * (w + pad)
+            y = pad + (idx // cols) * (h + pad)
+            
+            if qty:
+                page.paste(thumb, (x, y))
+            else:
+                # Carta del set que falta: gris y apagada
+                page.paste(ImageOps.grayscale(thumb).point(lambda v: 40 + v // 3), (x, y))
+            
+            if qty > 1:
+                label = f"x{qty}"
+                if hasattr(draw, 'textbbox'):
+                    bbox = draw.textbbox((0, 0), label, font=self.font)
+                    tw, th = bbox[2] - bbox[0], bbox[3] - bbox[1]
+                else:
+                    tw, th = 30, 20
+                draw.rounded_rectangle(
+                    [x + w - tw - 16, y + 6, x + w - 6, y + th + 16], radius=8, fill='#121212'
+                )
+                draw.text((x + w - tw - 11, y + 8), label, font=self.font, fill='white')
+        
+        out = io.BytesIO()
+        # JPEG: codificar un mosaico así en PNG cuesta ~20 veces más y pesa ~5 veces más
+        page.save(out, format='JPEG', quality=90)
+        return out.getvalue()
+    
+    def _get(self, cache, key, name):
+        with self._lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+        CACHE_REQUESTS.inc(cache=name, result='hit' if value is not None else 'miss')
+        return value
+    
+    def _put(self, cache, key, value, limit):
+        with self._lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > limit:
+                cache.popitem(last=False)
+    
+    @staticmethod
+    def _digest(*parts):
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()
@@ -0,0 +1,168 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import discord
+from discord.ext import tasks
+
+from .db import transaction
+from .metrics import CACHE_REQUESTS
+
+
+class NameResolver:
+    """Resuelve nombres visibles de usuarios en lote, sin llamadas por fila.
+    
+    Orden de búsqueda: memoria (con TTL) -> miembros del servidor (caché y
+    una única consulta de chunk al gateway) -> caché de usuarios del bot ->
+    tabla `display_names`. Los ids que no se encuentran, o cuyo nombre
+    guardado es viejo, se refrescan por REST en segundo plano.
+    """
+    
+    def __init__(self, bot, ttl=3600, db_ttl=timedelta(days=7), refresh_batch=20):
+        self.bot = bot
+        self.ttl = ttl
+        self.db_ttl = db_ttl
+        self.refresh_batch = refresh_batch
+        
+        self._cache = {}        # user_id -> (nombre, expira_en)
+        self._dirty = {}        # user_id -> nombre pendiente de guardar
+        self._stale = set()     # ids a refrescar por REST
+        self._confirmed = {}    # user_id -> cuándo se marcó para guardar (monotonic)
+    
+    def start(self):
+        self.background_refresh.start()
+    
+    def stop(self):
+        self.background_refresh.cancel()
+    
+    def remember(self, user_id, name):
+        """Registra un nombre conocido (por ejemplo, el autor de un comando)"""
+        now = time.monotonic()
+        cached = self._cache.get(user_id)
+        confirmed = self._confirmed.get(user_id)
+        # También se guarda un nombre que no cambió si hace tiempo que no se
+        # confirma: así updated_at avanza y el id no vuelve a quedar viejo
+        if not cached or cached[0] != name or confirmed is None or now - confirmed > self.db_ttl.total_seconds() / 2:
+            self._dirty[user_id] = name
+            self._confirmed[user_id] = now
+        self._cache[user_id] = (name, now + self.ttl)
+        self._stale.discard(user_id)
+    
+    async def resolve(self, user_ids, guild=None):
+        """Devuelve {user_id: nombre} para todos los ids pedidos"""
+        now = time.monotonic()
+        names = {}
+        missing = []
+        
+        for user_id in dict.fromkeys(user_ids):
+            cached = self._cache.get(user_id)
+            if cached and cached[1] > now:
+                names[user_id] = cached[0]
+            else:
+                missing.append(user_id)
+        
+        CACHE_REQUESTS.inc(len(names), cache='names', result='hit')
+        CACHE_REQUESTS.inc(len(missing), cache='names', result='miss')
+        
+        if missing and guild is not None:
+            missing = await self._resolve_from_guild(guild, missing, names)
+        
+        if missing:
+            still_missing = []
+            for user_id in missing:
+                user = self.bot.get_user(user_id)
+                if user:
+                    self.remember(user_id, user.display_name)
+                    names[user_id] = user.display_name
+                else:
+                    still_missing.append(user_id)
+            missing = still_missing
+        
+        if missing:
+            missing = await self._resolve_from_db(missing, names)
+        
+        for user_id in missing:
+            names[user_id] = f"Usuario {user_id}"
+            self._stale.add(user_id)
+        
+        return names
+    
+    async def _resolve_from_guild(self, guild, user_ids, names):
+        missing = []
+        for user_id in user_ids:
+            member = guild.get_member(user_id)
+            if member:
+                self.remember(user_id, member.display_name)
+                names[user_id] = member.display_name
+            else:
+                missing.append(user_id)
+        
+        # Una sola petición de chunk por lote (máximo 100 ids por petición)
+        if missing and not guild.chunked and self.bot.intents.members:
+            try:
+                members = await guild.query_members(user_ids=missing[:100], cache=False)
+            except (asyncio.TimeoutError, discord.ClientException) as e:
+                print(f"Error consultando miembros: {e}")
+                members = []
+            
+            for member in members:
+                self.remember(member.id, member.display_name)
+                names[member.id] = member.display_name
+        
+        return [user_id for user_id in missing if user_id not in names]
+    
+    async def _resolve_from_db(self, user_ids, names):
+        placeholders = ', '.join('?' * len(user_ids))
+        async with self.bot.db.execute(
+            f'SELECT user_id, display_name, updated_at FROM display_names WHERE user_id IN ({placeholders})',
+            user_ids
+        ) as cursor:
+            rows = await cursor.fetchall()
+        
+        expires_at = time.monotonic() + self.ttl
+        oldest_valid = datetime.utcnow() - self.db_ttl
+        
+        for user_id, name, updated_at in rows:
+            names[user_id] = name
+            self._cache[user_id] = (name, expires_at)
+            if datetime.fromisoformat(updated_at) < oldest_valid:
+                self._stale.add(user_id)
+        
+        return [user_id for user_id in user_ids if user_id not in names]
+    
+    @tasks.loop(minutes=1)
+    async def background_refresh(self):
+        # Refresca por REST un lote acotado de nombres desconocidos o viejos
+        for user_id in list(self._stale)[:self.refresh_batch]:
+            self._stale.discard(user_id)
+            try:
+                user = await self.bot.fetch_user(user_id)
+            except discord.NotFound:
+                continue
+            except Exception as e:
+                print(f"Error refrescando nombre de {user_id}: {e}")
+                continue
+            self.remember(user_id, user.display_name)
+        
+        # Persistir los nombres nuevos, cambiados o reconfirmados en un solo lote
+        if self._dirty:
+            dirty, self._dirty = self._dirty, {}
+            now = datetime.utcnow().isoformat()
+            async with transaction(self.bot) as db:
+                await db.executemany(
+                    '''INSERT INTO display_names (user_id, display_name, updated_at) VALUES (?, ?, ?)
+                       ON CONFLICT(user_id) DO UPDATE SET
+                       display_name = excluded.display_name,
+                       updated_at = excluded.updated_at''',
+                    [(user_id, name, now) for user_id, name in dirty.items()]
+                )
+        
+        # Eviction por TTL de la caché en memoria
+        now = time.monotonic()
+        for user_id in [uid for uid, (_, expires_at) in self._cache.items() if expires_at <= now]:
+            del self._cache[user_id]
+            self._confirmed.pop(user_id, None)
+    
+    @background_refresh.before_loop
+    async def before_background_refresh(self):
+        await self.bot.wait_until_ready()
@@ -0,0 +1,110 @@
+import asyncio
+import cProfile
+import collections.abc
+import io
+import pstats
+import time
+import traceback
+import tracemalloc
+
+
+class ProfiledCoroutine(collections.abc.Coroutine):
+    """Envuelve una corrutina y activa el profiler sólo mientras ella corre.
+    
+    El event loop avanza la tarea con `send`/`throw`; entre un paso y el
+    siguiente corren las demás tareas del bot sin el profiler encendido, así
+    que sólo se mide (y sólo se frena) el comando perfilado.
+    """
+    
+    def __init__(self, coro, profiler):
+        self._coro = coro
+        self._profiler = profiler
+    
+    def send(self, value):
+        self._profiler.enable()
+        try:
+            return self._coro.send(value)
+        finally:
+            self._profiler.disable()
+    
+    def throw(self, typ, val=None, tb=None):
+        self._profiler.enable()
+        try:
+            if val is None:
+                return self._coro.throw(typ)
+            if tb is None:
+                return self._coro.throw(typ, val)
+            return self._coro.throw(typ, val, tb)
+        finally:
+            self._profiler.disable()
+    
+    def close(self):
+        return self._coro.close()
+    
+    def __await__(self):
+        # Pensado para asyncio.create_task; awaited directamente no se perfila
+        return self._coro.__await__()
+
+
+class ProfileReport:
+    def __init__(self, wall_time, profiler, snapshot, peak_memory, error):
+        self.wall_time = wall_time
+        self.profiler = profiler
+        self.snapshot = snapshot
+        self.peak_memory = peak_memory
+        self.error = error
+    
+    def render(self, functions=30, allocations=15):
+        """Informe de texto: funciones por tiempo acumulado y mayores asignaciones"""
+        out = io.StringIO()
+        out.write(f"Tiempo total: {self.wall_time * 1000:.1f} ms\n")
+        if self.peak_memory is not None:
+            out.write(f"Pico de memoria trazada: {self.peak_memory / 1024:.1f} KiB\n")
+        if self.error:
+            out.write("\nEl comando terminó con error:\n")
+            out.write(''.join(traceback.format_exception(self.error)))
+        
+        out.write(f"\n=== cProfile: top {functions} por tiempo acumulado ===\n")
+        stats = pstats.Stats(self.profiler, stream=out)
+        stats.strip_dirs().sort_stats('cumulative').print_stats(functions)
+        
+        if self.snapshot is not None:
+            out.write(f"\n=== tracemalloc: top {allocations} asignaciones vivas al terminar ===\n")
+            for stat in self.snapshot.statistics('lineno')[:allocations]:
+                out.write(f"{stat}\n")
+        
+        return out.getvalue()
+
+
+async def profile(coro):
+    """Ejecuta `coro` con cProfile (sólo en sus pasos) y tracemalloc.
+    
+    tracemalloc es global al proceso: se enciende al empezar y se apaga al
+    terminar (salvo que ya estuviera activo), así que sólo cuesta durante
+    la invocación. Devuelve un ProfileReport; los errores del comando
+    quedan en `report.error` en lugar de propagarse.
+    """
+    profiler = cProfile.Profile()
+    owns_tracemalloc = not tracemalloc.is_tracing()
+    if owns_tracemalloc:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    
+    started = time.perf_counter()
+    error = None
+    try:
+        await asyncio.create_task(ProfiledCoroutine(coro, profiler))
+    except Exception as e:
+        error = e
+    wall_time = time.perf_counter() - started
+    
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    ))
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    if owns_tracemalloc:
+        tracemalloc.stop()
+    
+    return ProfileReport(wall_time, profiler, snapshot, peak_memory, error)
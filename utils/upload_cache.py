@@ -0,0 +1,121 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+
+from .db import transaction
+from .metrics import CACHE_REQUESTS
+
+
+class UploadCache:
+    """Recuerda la URL de CDN de cada imagen ya subida a Discord.
+    
+    Un render sin serial de una carta (o una cuadrícula de cartas) siempre
+    produce la misma imagen, así que tras la primera subida se reutiliza la
+    URL con `embed.set_image(url=...)` en lugar de volver a renderizar y subir.
+    Las entradas caducan con la firma `ex` de la URL de Discord y se
+    descartan si se borra el mensaje que contiene el adjunto.
+    """
+    
+    # Margen antes de la expiración firmada para no servir URLs a punto de morir
+    EXPIRY_MARGIN = timedelta(hours=1)
+    # Vida útil cuando la URL no trae parámetro `ex`
+    DEFAULT_TTL = timedelta(hours=12)
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self._entries = {}      # clave -> (url, message_id, expires_at)
+    
+    async def load(self):
+        async with self.bot.db.execute(
+            'SELECT cache_key, url, message_id, expires_at FROM upload_cache WHERE expires_at > ?',
+            (datetime.utcnow().isoformat(),)
+        ) as cursor:
+            rows = await cursor.fetchall()
+        
+        self._entries = {
+            key: (url, message_id, datetime.fromisoformat(expires_at))
+            for key, url, message_id, expires_at in rows
+        }
+    
+    @staticmethod
+    def card_key(card, render_version):
+        """Clave de un render sin serial; cambia si cambian los datos o el renderer"""
+        return 'card:' + UploadCache._digest(render_version, card.image_path, card.render_data())
+    
+    @staticmethod
+    def grid_key(cards, render_version):
+        return 'grid:' + UploadCache._digest(
+            render_version, [(card.image_path, card.render_data()) for card in cards]
+        )
+    
+    def get(self, key):
+        """URL vigente para la clave, o None si hay que subir la imagen"""
+        entry = self._entries.get(key)
+        if entry and entry[2] - self.EXPIRY_MARGIN <= datetime.utcnow():
+            del self._entries[key]
+            entry = None
+        
+        CACHE_REQUESTS.inc(cache='upload', result='hit' if entry else 'miss')
+        return entry[0] if entry else None
+    
+    async def store(self, key, message):
+        """Guarda la URL del adjunto de un mensaje recién enviado"""
+        url = self._attachment_url(message)
+        if not url:
+            return None
+        
+        expires_at = self._expiry(url)
+        self._entries[key] = (url, message.id, expires_at)
+        
+        async with transaction(self.bot) as db:
+            await db.execute(
+                '''INSERT INTO upload_cache (cache_key, url, message_id, expires_at) VALUES (?, ?, ?, ?)
+                   ON CONFLICT(cache_key) DO UPDATE SET
+                   url = excluded.url,
+                   message_id = excluded.message_id,
+                   expires_at = excluded.expires_at''',
+                (key, url, message.id, expires_at.isoformat())
+            )
+        return url
+    
+    async def forget(self, key):
+        self._entries.pop(key, None)
+        async with transaction(self.bot) as db:
+            await db.execute('DELETE FROM upload_cache WHERE cache_key = ?', (key,))
+    
+    async def forget_message(self, message_id):
+        """Invalida las URLs de un mensaje borrado (sus adjuntos dejan de existir)"""
+        keys = [key for key, (_, msg_id, _) in self._entries.items() if msg_id == message_id]
+        if not keys:
+            return
+        
+        for key in keys:
+            del self._entries[key]
+        async with transaction(self.bot) as db:
+            await db.execute('DELETE FROM upload_cache WHERE message_id = ?', (message_id,))
+    
+    @staticmethod
+    def _attachment_url(message):
+        # Las imágenes referenciadas con attachment:// quedan en la imagen del embed
+        for embed in message.embeds:
+            if embed.image and embed.image.url and embed.image.url.startswith('http'):
+                return embed.image.url
+        if message.attachments:
+            return message.attachments[0].url
+        return None
+    
+    def _expiry(self, url):
+        # Las URLs firmadas del CDN traen la expiración como timestamp hex en `ex`
+        expires = parse_qs(urlparse(url).query).get('ex')
+        if expires:
+            try:
+                return datetime.utcfromtimestamp(int(expires[0], 16))
+            except ValueError:
+                pass
+        return datetime.utcnow() + self.DEFAULT_TTL
+    
+    @staticmethod
+    def _digest(*parts):
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode()).hexdigest()
@@ -0,0 +1,131 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+
+from . import metrics
+
+LOOP_LAG = metrics.histogram(
+    'kpc_loop_lag_seconds', 'Retraso del event loop respecto al latido esperado',
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+LOOP_LAG_QUANTILES = metrics.gauge(
+    'kpc_loop_lag_quantile_seconds', 'Percentiles del retraso del event loop (ventana reciente)', ('quantile',)
+)
+LOOP_STALLS = metrics.counter('kpc_loop_stalls_total', 'Bloqueos del event loop por encima del umbral')
+
+
+class LoopWatchdog:
+    """Mide continuamente el retraso del event loop y delata al que lo bloquea.
+    
+    Una tarea late cada `interval` segundos y registra cuánto tarde despertó.
+    Un hilo auxiliar vigila ese latido: si el loop lleva más de `threshold`
+    segundos sin latir, es que algo síncrono (PIL, SQLite fuera de
+    aiosqlite...) está bloqueando el hilo principal, así que toma su pila con
+    `sys._current_frames()` y la registra junto al comando en ejecución.
+    """
+    
+    SAMPLES = 600       # ventana para los percentiles (~1 minuto con interval=0.1)
+    STACK_DEPTH = 15
+    
+    def __init__(self, interval=0.1, threshold=0.25):
+        self.interval = interval
+        self.threshold = threshold
+        self.samples = deque(maxlen=self.SAMPLES)
+        self.last_stall = None      # (duración, descripción, pila) del último bloqueo
+        
+        self._loop = None
+        self._main_thread_id = None
+        self._last_beat = time.monotonic()
+        self._commands = weakref.WeakKeyDictionary()    # tarea -> contexto del comando
+        self._heartbeat = None
+        self._thread = None
+        self._stop = threading.Event()
+    
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._main_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._heartbeat = asyncio.create_task(self._beat())
+        self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        if self._heartbeat:
+            self._heartbeat.cancel()
+    
+    def track(self, ctx):
+        """Asocia la tarea actual al comando que está ejecutando"""
+        task = asyncio.current_task()
+        if task is not None:
+            self._commands[task] = ctx
+    
+    def percentiles(self):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {}
+        
+        def pick(q):
+            return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+        
+        return {'p50': pick(0.5), 'p95': pick(0.95), 'p99': pick(0.99), 'max': ordered[-1]}
+    
+    async def _beat(self):
+        loop = asyncio.get_running_loop()
+        beats = 0
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self._last_beat = time.monotonic()
+            
+            self.samples.append(lag)
+            LOOP_LAG.observe(lag)
+            
+            beats += 1
+            if beats % 10 == 0 and metrics.REGISTRY.enabled:
+                for name, value in self.percentiles().items():
+                    LOOP_LAG_QUANTILES.set(value, quantile=name)
+    
+    def _watch(self):
+        reported = False
+        while not self._stop.wait(self.interval / 2):
+            stalled_for = time.monotonic() - self._last_beat - self.interval
+            if stalled_for < self.threshold:
+                reported = False
+                continue
+            
+            # Una sola muestra por bloqueo, tomada mientras sigue bloqueado
+            if not reported:
+                reported = True
+                self._report(stalled_for)
+    
+    def _report(self, stalled_for):
+        frame = sys._current_frames().get(self._main_thread_id)
+        stack = ''.join(traceback.format_stack(frame, limit=self.STACK_DEPTH)) if frame else ''
+        running = self._describe_running()
+        
+        self.last_stall = (stalled_for, running, stack)
+        LOOP_STALLS.inc()
+        print(
+            f"⚠️ Event loop bloqueado {stalled_for:.2f}s (umbral {self.threshold:.2f}s) en {running}\n"
+            f"{stack}"
+        )
+    
+    def _describe_running(self):
+        # Lectura desde otro hilo: sólo consulta qué tarea tiene el loop ahora
+        task = asyncio.current_task(self._loop)
+        if task is None:
+            return "un callback fuera de cualquier tarea"
+        
+        ctx = self._commands.get(task)
+        if ctx is not None and ctx.command:
+            return f"el comando {ctx.command.qualified_name} de {ctx.author} (#{getattr(ctx.channel, 'name', ctx.channel.id)})"
+        
+        coro = task.get_coro()
+        return f"la tarea {task.get_name()} ({getattr(coro, '__qualname__', coro)})"
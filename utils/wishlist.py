@@ -0,0 +1,90 @@
+from .db import transaction
+
+
+class Wishlist:
+    """Wishlists de cartas por servidor, con índice invertido en memoria.
+    
+    La tabla `wishlist` es la fuente persistente; al arrancar se carga en
+    dos diccionarios: (guild_id, card_id) -> usuarios que la esperan, para
+    avisar en un drop, y (guild_id, user_id) -> cartas, para listar y
+    aplicar el límite. `watchers()` hace una búsqueda por carta sorteada:
+    su costo no depende de cuántas wishlists existan.
+    """
+    
+    # Cartas por usuario en cada servidor
+    LIMIT = 25
+    
+    def __init__(self, bot):
+        self.bot = bot
+        self._watchers = {}     # (guild_id, card_id) -> {user_id}
+        self._wishes = {}       # (guild_id, user_id) -> {card_id}
+    
+    async def load(self):
+        async with self.bot.db.execute('SELECT guild_id, card_id, user_id FROM wishlist') as cursor:
+            rows = await cursor.fetchall()
+        
+        watchers, wishes = {}, {}
+        for guild_id, card_id, user_id in rows:
+            watchers.setdefault((guild_id, card_id), set()).add(user_id)
+            wishes.setdefault((guild_id, user_id), set()).add(card_id)
+        self._watchers = watchers
+        self._wishes = wishes
+    
+    def cards(self, guild_id, user_id):
+        """IDs de las cartas en la wishlist del usuario en ese servidor"""
+        return self._wishes.get((guild_id, user_id), set())
+    
+    def watchers(self, guild_id, card_ids):
+        """{user_id: [card_id, ...]} de quienes esperan alguna de esas cartas en el servidor"""
+        found = {}
+        for card_id in card_ids:
+            for user_id in self._watchers.get((guild_id, card_id), ()):
+                found.setdefault(user_id, []).append(card_id)
+        return found
+    
+    async def add(self, guild_id, user_id, card_ids):
+        """Agrega cartas respetando LIMIT; devuelve las que se agregaron"""
+        # Se calcula con el lock tomado: dos add simultáneos del mismo usuario
+        # ven la lista que dejó el otro y no pasan juntos del límite
+        async with transaction(self.bot) as db:
+            current = self.cards(guild_id, user_id)
+            added = [card_id for card_id in dict.fromkeys(card_ids) if card_id not in current]
+            added = added[:max(0, self.LIMIT - len(current))]
+            if added:
+                await db.executemany(
+                    'INSERT OR IGNORE INTO wishlist (guild_id, card_id, user_id) VALUES (?, ?, ?)',
+                    [(guild_id, card_id, user_id) for card_id in added]
+                )
+        if not added:
+            return []
+        
+        # El índice se actualiza después del commit (sin awaits en medio, antes
+        # de que otro add tome el lock): nunca apunta a filas sin guardar
+        self._wishes.setdefault((guild_id, user_id), set()).update(added)
+        for card_id in added:
+            self._watchers.setdefault((guild_id, card_id), set()).add(user_id)
+        return added
+    
+    async def remove(self, guild_id, user_id, card_ids=None):
+        """Quita esas cartas (o todas, sin `card_ids`); devuelve las que se quitaron"""
+        current = self.cards(guild_id, user_id)
+        removed = list(current) if card_ids is None else [card_id for card_id in dict.fromkeys(card_ids) if card_id in current]
+        if not removed:
+            return []
+        
+        async with transaction(self.bot) as db:
+            await db.executemany(
+                'DELETE FROM wishlist WHERE guild_id = ? AND card_id = ? AND user_id = ?',
+                [(guild_id, card_id, user_id) for card_id in removed]
+            )
+        
+        current.difference_update(removed)
+        if not current:
+            self._wishes.pop((guild_id, user_id), None)
+        for card_id in removed:
+            users = self._watchers.get((guild_id, card_id))
+            if users is not None:
+                users.discard(user_id)
+                if not users:
+                    del self._watchers[(guild_id, card_id)]
+        return removed